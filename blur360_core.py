@@ -0,0 +1,841 @@
+# Fælles billed- og videofunktioner til 360blur: wrap-around til detektion, sløring,
+# efterbehandling af detektioner, YOLO-input og video-I/O. Bruges både af webappens egen
+# behandling (blur360_webapp.py) og af worker-processen (blur360_worker.py), så
+# optimeringerne kun findes ét sted.
+
+import os
+import sys
+import shutil
+import hashlib
+import logging
+import subprocess
+from pathlib import Path
+
+import cv2
+import numpy as np
+import orjson
+
+logger = logging.getLogger('blur360_core')
+
+# Forsøg at importere Ultralytics YOLO
+try:
+    from ultralytics import YOLO
+    ULTRALYTICS_AVAILABLE = True
+    print("Ultralytics YOLO detected and available.")
+except ImportError:
+    ULTRALYTICS_AVAILABLE = False
+    print("Ultralytics YOLO not available. Will use OpenCV DNN if possible.")
+
+# torch følger med ultralytics - bruges kun til at afgøre om YOLO kan køre på GPU
+try:
+    import torch
+    CUDA_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    CUDA_AVAILABLE = False
+
+# Numba er valgfri - kompilerer sammenlægningen af overlappende detektioner til native kode
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# OpenCV's SIMD-optimerede kodestier (8-bit SSE/AVX i filtrene) skal altid være slået til
+cv2.setUseOptimized(True)
+
+# OpenCV bygget med CUDA - store ROI'er sløres så på GPU'en (se blur_roi)
+try:
+    OPENCV_CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    OPENCV_CUDA_AVAILABLE = False
+
+# Under eventlet (webappen) er subprocess monkey-patchet, men FFmpegWriter skrives fra en
+# rigtig OS-tråd - så der bruges altid det upatchede modul og en almindelig blokerende pipe
+if 'eventlet' in sys.modules:
+    import eventlet.patcher
+    _os_subprocess = eventlet.patcher.original('subprocess')
+else:
+    _os_subprocess = subprocess
+
+# Genbrugte buffere til wrap'ede frames, pr. (højde, bredde, kanaler, dtype)
+_wrap_buffers = {}
+
+# Funktion til at håndtere wrap-around detektion for 360° billeder
+def wrap_frame_for_detection(frame: np.ndarray, out: np.ndarray = None) -> tuple:
+    """
+    Tilføjer wrap-around-padding i siderne af et equirectangular 360°-billede.
+    Dette forbedrer detektion nær venstre og højre kant.
+
+    Resultatet skrives i en genbrugt buffer (eller i `out`), så der ikke allokeres
+    et nyt billede pr. frame. Bufferen overskrives ved næste kald - kaldere der
+    skal beholde flere wrap'ede frames ad gangen må give deres egen `out`.
+    """
+    height, width = frame.shape[:2]
+    pad_w = width // 4  # 25% padding
+
+    shape = (height, width + 2 * pad_w) + frame.shape[2:]
+    if out is None:
+        key = shape + (frame.dtype.str,)
+        out = _wrap_buffers.get(key)
+        if out is None:
+            out = np.empty(shape, dtype=frame.dtype)
+            _wrap_buffers[key] = out
+
+    out[:, :pad_w] = frame[:, -pad_w:]                # Sidste 25%
+    out[:, pad_w:pad_w + width] = frame
+    out[:, pad_w + width:] = frame[:, :pad_w]         # Første 25%
+
+    return out, pad_w
+
+# Genbrugte buffere til en opgaves wrap'ede frames, pr. (antal, højde, bredde, kanaler, dtype)
+_wrap_batch_buffers = {}
+
+def wrap_frames_for_detection(frames: list) -> tuple:
+    """
+    wrap_frame_for_detection for alle frames i en opgave. De wrap'ede frames skrives i én
+    genbrugt buffer med en plads pr. frame, så de kan bruges samtidig uden at allokere nye
+    billeder for hver opgave. Bufferen overskrives ved næste kald.
+    """
+    height, width = frames[0].shape[:2]
+    pad_w = width // 4
+    shape = (len(frames), height, width + 2 * pad_w) + frames[0].shape[2:]
+    key = shape + (frames[0].dtype.str,)
+    out = _wrap_batch_buffers.get(key)
+    if out is None:
+        out = _wrap_batch_buffers[key] = np.empty(shape, dtype=frames[0].dtype)
+    for frame, slot in zip(frames, out):
+        wrap_frame_for_detection(frame, slot)
+    return list(out), pad_w
+
+
+# Genbrugte blob- og skaleringsbuffere til DNN-detektoren, pr. (antal billeder, højde, bredde)
+_blob_buffers = {}
+
+def dnn_blob(images: list, size: tuple = (300, 300), mean: tuple = (104.0, 177.0, 123.0)) -> np.ndarray:
+    """
+    Som cv2.dnn.blobFromImages(images, 1.0, size, mean, swapRB=False), men skrevet i en
+    genbrugt (N, 3, H, W) float32-buffer i stedet for en ny allokering pr. kald.
+
+    Bufferen overskrives ved næste kald med samme antal billeder - den skal være brugt
+    (net.setInput + forward) inden da.
+    """
+    width, height = size
+    key = (len(images), height, width)
+    buffers = _blob_buffers.get(key)
+    if buffers is None:
+        buffers = (np.empty((len(images), 3, height, width), dtype=np.float32),
+                   np.empty((height, width, 3), dtype=np.uint8))
+        _blob_buffers[key] = buffers
+    blob, resized = buffers
+
+    mean = np.asarray(mean, dtype=np.float32)[:, None, None]
+    for k, image in enumerate(images):
+        cv2.resize(image, size, dst=resized)
+        np.subtract(resized.transpose(2, 0, 1), mean, out=blob[k])
+    return blob
+
+
+def adjust_coords_for_wrapped_detections(detections, pad_w: int, original_width: int) -> np.ndarray:
+    """
+    Justerer koordinater fra wrap'et billede tilbage til originalt koordinatsystem.
+    Filtrerer samtidig dem der falder helt uden for det oprindelige billede.
+
+    Args:
+        detections: (N,4) array eller liste af (x, y, w, h). Ekstra kolonner efter
+                    de fire første (fx confidence) følger med uændret.
+        pad_w: Bredden af wrap-paddingen i venstre side
+        original_width: Bredden af det originale billede
+
+    Returns:
+        ndarray med de detektioner der overlapper det originale billede
+    """
+    dets = np.asarray(detections)
+    if dets.size == 0:
+        return np.empty((0, dets.shape[1] if dets.ndim == 2 else 4), dtype=np.int32)
+
+    x = dets[:, 0] - pad_w  # Justér X-koordinat
+    w = dets[:, 2]
+    keep = (x + w >= 0) & (x <= original_width)  # Uden for billedet sorteres fra
+
+    adjusted = dets[keep]
+    adjusted[:, 0] = np.maximum(0, x[keep])
+    adjusted[:, 2] = np.minimum(original_width - adjusted[:, 0], w[keep])
+    return adjusted
+
+
+# ROI'er skaleres så mange gange ned før sløring (se blur_roi)
+BLUR_DOWNSCALE = 8
+
+# Den nedskalerede ROI er højst så stor på den længste side, så sløringen af store
+# ROI'er koster det samme uanset størrelse
+BLUR_MAX_SMALL_SIZE = 64
+
+# ROI'er med mindst så mange pixels sløres på GPU'en når OpenCV har CUDA - for mindre
+# ROI'er koster upload/download mere end selve sløringen
+GPU_BLUR_MIN_AREA = 256 * 256
+
+# Genbrugte GpuMats (ét pr. trin), CUDA-stream og Gaussian-filtre pr. (kernestørrelse, sigma)
+# til blur_roi - GpuMats genallokeres kun når ROI-størrelsen ændrer sig
+_cuda_blur_state = {}
+_cuda_gaussian_filters = {}
+
+# Separable Gaussian-kerner til CPU-udgaven af blur_roi pr. (kernestørrelse, sigma).
+# sepFilter2D med færdige kerner er markant hurtigere end GaussianBlur for de store kerner
+# blur_roi bruger (ca. 10x for kerne 51 på 64x64), og resultatet afviger højst 1-2 niveauer
+_gaussian_kernels = {}
+
+def _blur_roi_cuda(roi: np.ndarray, kernel_size: int, factor: int, dst: np.ndarray = None) -> np.ndarray:
+    """
+    GPU-udgaven af blur_roi: samme nedskalering, Gaussian og opskalering med cv2.cuda.
+    CUDA-filtrene understøtter ikke 3 kanaler, så der arbejdes i BGRA, og kernen er
+    højst 31 (rigeligt til sigma i den lille skala).
+    """
+    if not _cuda_blur_state:
+        for step in ('src', 'bgra', 'small', 'blurred', 'large', 'bgr'):
+            _cuda_blur_state[step] = cv2.cuda_GpuMat()
+        _cuda_blur_state['stream'] = cv2.cuda_Stream()
+    gpu, stream = _cuda_blur_state, _cuda_blur_state['stream']
+
+    h, w = roi.shape[:2]
+    small_size = (max(1, w // factor), max(1, h // factor))
+    kernel_size = min(31, kernel_size)
+    sigma = 30 / factor
+    key = (kernel_size, sigma)
+    gaussian = _cuda_gaussian_filters.get(key)
+    if gaussian is None:
+        gaussian = _cuda_gaussian_filters[key] = cv2.cuda.createGaussianFilter(
+            cv2.CV_8UC4, cv2.CV_8UC4, (kernel_size, kernel_size), sigma)
+
+    gpu['src'].upload(roi, stream)
+    cv2.cuda.cvtColor(gpu['src'], cv2.COLOR_BGR2BGRA, dst=gpu['bgra'], stream=stream)
+    cv2.cuda.resize(gpu['bgra'], small_size, dst=gpu['small'], interpolation=cv2.INTER_AREA, stream=stream)
+    gaussian.apply(gpu['small'], dst=gpu['blurred'], stream=stream)
+    cv2.cuda.resize(gpu['blurred'], (w, h), dst=gpu['large'], interpolation=cv2.INTER_LINEAR, stream=stream)
+    cv2.cuda.cvtColor(gpu['large'], cv2.COLOR_BGRA2BGR, dst=gpu['bgr'], stream=stream)
+    blurred = gpu['bgr'].download(stream=stream) if dst is None else gpu['bgr'].download(stream=stream, dst=dst)
+    stream.waitForCompletion()
+    return blurred
+
+def blur_roi(roi: np.ndarray, reference_size: int = None, dst: np.ndarray = None) -> np.ndarray:
+    """
+    Slører en ROI kraftigt til anonymisering.
+
+    ROI'en skaleres BLUR_DOWNSCALE gange ned (store ROI'er mere, så den lille udgave
+    højst er BLUR_MAX_SMALL_SIZE på den længste side), Gaussian-sløres i den lille
+    størrelse og skaleres op igen med INTER_LINEAR. Resultatet svarer visuelt til den store Gaussian-
+    kerne på fuld opløsning, men koster O(areal) i stedet for O(areal * kerne²).
+    Store ROI'er sløres på GPU'en når OpenCV er bygget med CUDA.
+    Kernen følger ROI'ens mindste side, eller reference_size hvis den er givet.
+    Er dst givet (samme form som roi), skrives resultatet direkte i den.
+    """
+    h, w = roi.shape[:2]
+    # Samme kernestørrelse og sigma som på fuld opløsning, omregnet til den lille skala
+    factor = max(BLUR_DOWNSCALE, -(-(reference_size or max(w, h)) // BLUR_MAX_SMALL_SIZE))
+    kernel_size = max(51, int((reference_size or min(w, h)) * 0.8)) // factor | 1
+    if roi.dtype != np.uint8:
+        # Filtrenes hurtige 8-bit stier - frames fra VideoCapture er altid uint8
+        roi = roi.astype(np.uint8)
+    if OPENCV_CUDA_AVAILABLE and w * h >= GPU_BLUR_MIN_AREA:
+        try:
+            return _blur_roi_cuda(roi, kernel_size, factor, dst)
+        except cv2.error as e:
+            logger.debug("CUDA blur failed, using CPU: %s", e)
+
+    small = cv2.resize(roi, (max(1, w // factor), max(1, h // factor)),
+                       interpolation=cv2.INTER_AREA)
+    key = (kernel_size, 30 / factor)
+    kernel = _gaussian_kernels.get(key)
+    if kernel is None:
+        kernel = _gaussian_kernels[key] = cv2.getGaussianKernel(*key)
+    small = cv2.sepFilter2D(small, -1, kernel, kernel, borderType=cv2.BORDER_REPLICATE)
+    return cv2.resize(small, (w, h), dst=dst, interpolation=cv2.INTER_LINEAR)
+
+def pad_detections(detections, width: int, height: int) -> np.ndarray:
+    """
+    Udvider alle detektioner (x, y, w, h) med 10 % padding og klipper dem til framen på én gang.
+    Ugyldige bokse, og bokse der er tomme efter klipning, sorteres fra.
+
+    Returns:
+        (N,5) int-array med (index, x, y, w, h), hvor index er detektionens plads i listen
+    """
+    boxes = np.asarray(detections, dtype=np.int64).reshape(-1, 4)
+    x, y, w, h = boxes.T
+    pad = (w * 0.1).astype(np.int64)  # 10% padding
+    x_padded = np.maximum(0, x - pad)
+    y_padded = np.maximum(0, y - pad)
+    w_padded = np.minimum(width - x_padded, w + 2 * pad)
+    h_padded = np.minimum(height - y_padded, h + 2 * pad)
+    valid = (x >= 0) & (y >= 0) & (w > 0) & (h > 0) & (w_padded > 0) & (h_padded > 0)
+    return np.column_stack([np.flatnonzero(valid), x_padded[valid], y_padded[valid],
+                            w_padded[valid], h_padded[valid]])
+
+# Dækker regionerne tilsammen mindst denne andel af framen, sløres hele framen én gang, og
+# regionerne kopieres ind gennem én maske i stedet for at blive sløret og skrevet hver for sig.
+# Sløringen koster O(areal), så det kun betaler sig når regionerne dækker det meste af framen
+FULL_FRAME_BLUR_MIN_COVERAGE = 0.5
+
+def use_composite_blur(frame_shape: tuple, regions: list) -> bool:
+    """Om regionerne (x, y, w, h) dækker nok af framen til at composite_blur betaler sig."""
+    covered = sum(w * h for _, _, w, h in regions)
+    return covered >= FULL_FRAME_BLUR_MIN_COVERAGE * frame_shape[0] * frame_shape[1]
+
+# Genbrugte buffere til den slørede frame i composite_blur pr. frameform
+_composite_buffers = {}
+
+def composite_blur(frame: np.ndarray, regions: list) -> None:
+    """
+    Slører alle regioner (x, y, w, h) i frame med én sløring af hele framen og én maskeret
+    skrivning. Kernen vælges efter den typiske (median) regionstørrelse.
+    """
+    mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+    for x, y, w, h in regions:
+        mask[y:y+h, x:x+w] = 1
+    reference_size = int(np.median([min(w, h) for _, _, w, h in regions]))
+    # Den slørede frame skrives i en genbrugt buffer pr. frameform
+    blurred = _composite_buffers.get(frame.shape)
+    if blurred is None:
+        blurred = _composite_buffers[frame.shape] = np.empty_like(frame)
+    blur_roi(frame, reference_size, dst=blurred)
+    # cv2.copyTo skriver direkte i frame (langt hurtigere end np.copyto med where=)
+    cv2.copyTo(blurred, mask, frame)
+
+def parse_dnn_detections(detections: np.ndarray, width: int, height: int, threshold: float = 0.4,
+                         scale: float = 1.0, clip_size: tuple = None) -> tuple:
+    """
+    Omsætter OpenCV DNN-face-detektorens output (1, 1, N, 7) til bokse og confidence.
+    Hele outputtet behandles vektoriseret med NumPy i stedet for én kandidat ad gangen.
+
+    Args:
+        detections: Output fra net.forward()
+        width, height: Billedstørrelsen de normaliserede koordinater ganges op til
+        threshold: Minimum confidence
+        scale: Skala billedet blev ændret med før detektion - koordinaterne skaleres tilbage
+        clip_size: (bredde, højde) der klippes til; tomme bokse efter klipning sorteres fra
+
+    Returns:
+        (boxes, confs): (N,4) int32-array med (x, y, w, h) og (N,) confidence
+    """
+    dets = detections[0, 0]
+    dets = dets[dets[:, 2] > threshold]
+    boxes = (dets[:, 3:7] * np.array([width, height, width, height])).astype(np.int32)
+    if scale != 1.0:
+        boxes = (boxes / scale).astype(np.int32)
+    confs = dets[:, 2]
+
+    if clip_size is not None:
+        boxes[:, 0::2] = np.clip(boxes[:, 0::2], 0, clip_size[0])
+        boxes[:, 1::2] = np.clip(boxes[:, 1::2], 0, clip_size[1])
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        boxes, confs = boxes[valid], confs[valid]
+
+    boxes[:, 2:] -= boxes[:, :2]  # (x1, y1, x2, y2) -> (x, y, w, h)
+    return boxes, confs
+
+
+# Inputstørrelse for YOLO-modellerne (Ultralytics' standard imgsz)
+YOLO_IMGSZ = 640
+
+def yolo_input(image: np.ndarray, imgsz: int = YOLO_IMGSZ) -> tuple:
+    """
+    Skalerer billedet ned så den længste side er imgsz, inden det sendes til YOLO.
+    YOLO letterboxer alligevel til imgsz, men så kopieres kun det lille billede til GPU'en
+    i stedet for hele (op til 8K) framen.
+
+    Returns:
+        (small, scale): Det nedskalerede billede og faktoren koordinaterne skal ganges med
+    """
+    height, width = image.shape[:2]
+    longest = max(width, height)
+    if longest <= imgsz:
+        return image, 1.0
+    factor = imgsz / longest
+    small = cv2.resize(image, (max(1, round(width * factor)), max(1, round(height * factor))),
+                       interpolation=cv2.INTER_AREA)
+    return small, width / small.shape[1]
+
+# Genbrugte pinned host-buffere til YOLO-input pr. (N, H, W) og den faste kopi-stream (se yolo_source)
+_pinned_buffers = {}
+_cuda_copy_stream = None
+
+def yolo_source(model, images: list):
+    """
+    Samler de (nedskalerede) billeder til ét BCHW-tensor på GPU'en via en genbrugt pinned
+    host-buffer, så H2D-kopien bliver én asynkron DMA-overførsel på en fast kopi-stream
+    i stedet for Ultralytics' synkrone kopi fra almindelig hukommelse.
+
+    Kun for vægtfiler kørt på CUDA (FP16, se load_yolo_model) - TensorRT-engines har en fast
+    inputstørrelse og får billedlisten, som Ultralytics selv letterboxer. Billederne paddes
+    nederst/til højre til et multiplum af 32, så boksenes koordinater passer direkte til
+    billederne og dermed til skalaen fra yolo_input.
+    """
+    global _cuda_copy_stream
+    if not CUDA_AVAILABLE or not model.overrides.get('half'):
+        return images
+    height = -(-max(image.shape[0] for image in images) // 32) * 32
+    width = -(-max(image.shape[1] for image in images) // 32) * 32
+    key = (len(images), height, width)
+    pinned = _pinned_buffers.get(key)
+    if pinned is None:
+        pinned = _pinned_buffers[key] = torch.empty(key + (3,), dtype=torch.uint8).pin_memory()
+    buffer = pinned.numpy()
+    buffer.fill(114)  # Samme gråtone som Ultralytics' letterbox
+    for target, image in zip(buffer, images):
+        target[:image.shape[0], :image.shape[1]] = image
+
+    if _cuda_copy_stream is None:
+        _cuda_copy_stream = torch.cuda.Stream()
+    with torch.cuda.stream(_cuda_copy_stream):
+        gpu = pinned.to('cuda', non_blocking=True)
+    compute_stream = torch.cuda.current_stream()
+    compute_stream.wait_stream(_cuda_copy_stream)
+    gpu.record_stream(compute_stream)
+    # BGR -> RGB, NHWC -> NCHW og værdier i 0-1 som Ultralytics forventer af tensor-input
+    return gpu.flip(-1).permute(0, 3, 1, 2).contiguous().float().div_(255)
+
+def yolo_boxes_xywh(result, scale: float = 1.0) -> tuple:
+    """
+    Henter boksene fra et Ultralytics Results-objekt som (N,4) int32 (x, y, w, h) og (N,) confidence.
+    Der laves præcis to kopier fra GPU til host pr. Results, og ingen konvertering pr. boks.
+    scale er faktoren fra yolo_input, så boksene passer til det oprindelige billede.
+    """
+    xyxy = result.boxes.xyxy.cpu().numpy()
+    if scale != 1.0:
+        xyxy = xyxy * scale
+    confs = result.boxes.conf.cpu().numpy()
+    boxes = np.empty((len(xyxy), 4), dtype=np.int32)
+    boxes[:, :2] = xyxy[:, :2]
+    boxes[:, 2:] = xyxy[:, 2:4] - xyxy[:, :2]
+    return boxes, confs
+
+def box_iou_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """IoU mellem alle par af (x, y, w, h)-bokse i boxes_a (N) og boxes_b (M), som et (N, M) array."""
+    a = np.asarray(boxes_a, dtype=np.int64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.int64).reshape(-1, 4)
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+    # Fællesmængde for alle par - bokse der kun rører hinanden giver 0
+    inter_w = np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, 0, None], b[None, :, 0])
+    inter_h = np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, 1, None], b[None, :, 1])
+    intersection = np.where((inter_w >= 0) & (inter_h >= 0), inter_w * inter_h, 0)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros(union.shape), where=union > 0)
+
+
+# Detektionstyper (5. kolonne i detektionerne). Ved sammenlægning vinder den laveste, så en
+# boks der dækker både et ansigt og en nummerplade regnes som ansigt
+DETECTION_FACE = 0
+DETECTION_PLATE = 1
+# Debug-farve (BGR) pr. detektionstype: rød for ansigter, blå for nummerplader
+DETECTION_COLORS = ((0, 0, 255), (255, 0, 0))
+
+
+def label_detections(boxes, type_id: int) -> np.ndarray:
+    """
+    Tilføjer detektionstypen som 5. kolonne: boksene (x, y, w, h) bliver et (N,5) int64-array
+    med (x, y, w, h, type_id), fyldt direkte fra boks-arrayet uden tupler pr. boks.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    labelled = np.empty((len(boxes), 5), dtype=np.int64)
+    labelled[:, :4] = boxes
+    labelled[:, 4] = type_id
+    return labelled
+
+
+def _merge_boxes_kernel(boxes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Samme sammenlægning som merge_overlapping_detections, men som rene løkker over et
+    (N,5) int64-array, så Numba kan kompilere den. Returnerer (M,5) int64 (x, y, w, h, type_id).
+    """
+    n = boxes.shape[0]
+    merged = np.empty((n, 5), dtype=np.int64)
+    used = np.zeros(n, dtype=np.bool_)
+    count = 0
+    for i in range(n):
+        if used[i]:
+            continue
+        used[i] = True
+        ix1, iy1 = boxes[i, 0], boxes[i, 1]
+        ix2, iy2 = ix1 + boxes[i, 2], iy1 + boxes[i, 3]
+        area_i = boxes[i, 2] * boxes[i, 3]
+        mx1, my1, mx2, my2 = ix1, iy1, ix2, iy2
+        type_id = boxes[i, 4]
+        # Alle tidligere bokse er allerede brugt af deres egen eller en anden gruppe
+        for j in range(i + 1, n):
+            if used[j]:
+                continue
+            jx1, jy1 = boxes[j, 0], boxes[j, 1]
+            jx2, jy2 = jx1 + boxes[j, 2], jy1 + boxes[j, 3]
+            inter_w = min(ix2, jx2) - max(ix1, jx1)
+            inter_h = min(iy2, jy2) - max(iy1, jy1)
+            intersection = inter_w * inter_h if inter_w >= 0 and inter_h >= 0 else 0
+            union = area_i + boxes[j, 2] * boxes[j, 3] - intersection
+            if union > 0 and intersection / union > iou_threshold:
+                used[j] = True
+                mx1, my1 = min(mx1, jx1), min(my1, jy1)
+                mx2, my2 = max(mx2, jx2), max(my2, jy2)
+                type_id = min(type_id, boxes[j, 4])
+        merged[count, 0] = mx1
+        merged[count, 1] = my1
+        merged[count, 2] = mx2 - mx1
+        merged[count, 3] = my2 - my1
+        merged[count, 4] = type_id
+        count += 1
+    return merged[:count]
+
+if NUMBA_AVAILABLE:
+    _merge_boxes_kernel = njit(cache=True, fastmath=True)(_merge_boxes_kernel)
+    # Kompilér (eller indlæs fra cachen) ved import, så første frame ikke venter på JIT
+    _merge_boxes_kernel(np.zeros((4, 5), dtype=np.int64), 0.3)
+
+def merge_overlapping_detections(detections, iou_threshold: float = 0.3) -> np.ndarray:
+    """
+    Slår overlappende detektioner sammen til én boks der dækker dem alle.
+    IoU for alle par beregnes på én gang (se box_iou_matrix) i stedet for
+    et Python-kald pr. par.
+
+    Args:
+        detections: (N,5)-array eller liste af (N,5)-arrays med (x, y, w, h, type_id) - se label_detections
+        iou_threshold: Overlap (IoU) over hvilket to bokse slås sammen
+
+    Returns:
+        (M,5) int64-array med de sammenslåede (x, y, w, h, type_id), udfyldt i én forhåndsallokeret buffer
+    """
+    if len(detections) == 0:
+        return np.empty((0, 5), dtype=np.int64)
+
+    # Alle kilders arrays samles med én kopi
+    boxes = np.concatenate(detections) if isinstance(detections, list) else np.asarray(detections, dtype=np.int64)
+    if len(boxes) == 0:
+        return np.empty((0, 5), dtype=np.int64)
+    if NUMBA_AVAILABLE:
+        return _merge_boxes_kernel(np.ascontiguousarray(boxes), iou_threshold)
+
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    overlaps = box_iou_matrix(boxes[:, :4], boxes[:, :4]) > iou_threshold
+
+    merged = np.empty_like(boxes)
+    count = 0
+    used = np.zeros(len(boxes), dtype=bool)
+    for i in range(len(boxes)):
+        if used[i]:
+            continue
+        # Boksen dækker i og alle endnu ubrugte detektioner der overlapper den
+        group = overlaps[i] & ~used
+        group[i] = True
+        used |= group
+        mx, my = x1[group].min(), y1[group].min()
+        merged[count] = (mx, my, x2[group].max() - mx, y2[group].max() - my, boxes[group, 4].min())
+        count += 1
+    return merged[:count]
+
+# Antal dummy-inferenser en YOLO-model køres med på CUDA inden den første rigtige frame
+YOLO_WARMUP_RUNS = 3
+
+def warm_up_yolo_model(model) -> None:
+    """
+    Kører modellen på et par grå dummy-billeder i videoens 2:1-format, så CUDA-kontekst,
+    cuDNN-/TensorRT-initialisering, Ultralytics' predictor og kopi-streamen (se yolo_source)
+    er sat op inden første frame i stedet for at forsinke den.
+    """
+    dummy = np.full((YOLO_IMGSZ // 2, YOLO_IMGSZ, 3), 114, dtype=np.uint8)
+    try:
+        for _ in range(YOLO_WARMUP_RUNS):
+            model(yolo_source(model, [dummy]), imgsz=YOLO_IMGSZ, verbose=False)
+    except Exception as e:
+        logger.warning("YOLO warm-up failed: %s", e)
+
+def load_yolo_model(weights_path: Path):
+    """
+    Indlæser en YOLO-model. På CUDA bruges en eksporteret TensorRT-engine hvis den findes
+    og er nyere end vægtfilen - INT8 (<navn>_int8.engine) før FP16 (<navn>.engine), se
+    download_models.py. Ellers køres vægtfilen i FP16. Modellen varmes op på CUDA
+    (se warm_up_yolo_model).
+    """
+    for engine_path in (weights_path.with_name(f"{weights_path.stem}_int8.engine"), weights_path.with_suffix('.engine')):
+        if CUDA_AVAILABLE and engine_path.exists() and engine_path.stat().st_mtime >= weights_path.stat().st_mtime:
+            logger.info("Using TensorRT engine %s", engine_path)
+            model = YOLO(str(engine_path), task='detect')
+            break
+    else:
+        model = YOLO(str(weights_path))
+        if CUDA_AVAILABLE:
+            # Halv præcision på GPU - samme vægte, ca. halvdelen af hukommelsesbåndbredden
+            model.overrides['half'] = True
+            logger.info("Running %s in FP16 on CUDA", weights_path.name)
+
+    if CUDA_AVAILABLE:
+        warm_up_yolo_model(model)
+    return model
+
+# ffmpeg enkoder outputvideoen direkte fra rå frames på stdin, hvis det er installeret
+FFMPEG_PATH = shutil.which("ffmpeg")
+
+# ffmpeg-enkodere i prioriteret rækkefølge med deres indstillinger (se ffmpeg_encoder)
+FFMPEG_ENCODERS = {
+    'h264_nvenc': ["-preset", "p4"],
+    'h264_videotoolbox': ["-b:v", "8M"],
+    'libx264': ["-preset", "veryfast", "-crf", "18"],
+    'mpeg4': ["-q:v", "3"],
+}
+
+# Valgt ffmpeg-enkoder og OpenCV-codec gemmes på disken, så de ikke skal findes igen i hver
+# worker-proces. Nøglerne er ffmpeg-binæren og OpenCV-buildet, så en opdatering giver et nyt valg
+VIDEO_WRITER_CACHE_FILE = Path("models") / "video_writer.json"
+
+# Indholdet af VIDEO_WRITER_CACHE_FILE i denne proces (se video_writer_cache)
+_video_writer_cache = None
+
+def video_writer_cache() -> dict:
+    """Returnerer de gemte valg {'ffmpeg': {...}, 'opencv': {...}} og læser filen kun første gang."""
+    global _video_writer_cache
+    if _video_writer_cache is None:
+        try:
+            _video_writer_cache = orjson.loads(VIDEO_WRITER_CACHE_FILE.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            _video_writer_cache = {}
+        _video_writer_cache.setdefault('ffmpeg', {})
+        _video_writer_cache.setdefault('opencv', {})
+    return _video_writer_cache
+
+def save_video_writer_cache() -> None:
+    """Skriver video_writer_cache til disken atomisk (midlertidig fil og os.replace)."""
+    tmp_file = VIDEO_WRITER_CACHE_FILE.with_name(f"{VIDEO_WRITER_CACHE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        VIDEO_WRITER_CACHE_FILE.parent.mkdir(exist_ok=True)
+        tmp_file.write_bytes(orjson.dumps(video_writer_cache()))
+        os.replace(tmp_file, VIDEO_WRITER_CACHE_FILE)
+    except OSError as e:
+        logger.debug("Could not save video writer choice: %s", e)
+
+def _ffmpeg_cache_key() -> str:
+    # Stien og ændringstiden for binæren - og om NVENC overhovedet kan vælges
+    try:
+        mtime = os.stat(FFMPEG_PATH).st_mtime_ns
+    except OSError:
+        mtime = 0
+    return f"{FFMPEG_PATH}|{mtime}|cuda={int(CUDA_AVAILABLE)}"
+
+def _opencv_cache_key() -> str:
+    build = hashlib.blake2b(cv2.getBuildInformation().encode(), digest_size=8).hexdigest()
+    return f"{cv2.__version__}|{build}"
+
+# Størrelse på den sorte frame en enkoder test-enkodes med inden den vælges (se probe_ffmpeg_encoder)
+FFMPEG_PROBE_SIZE = (256, 128)
+
+def ffmpeg_encoder_candidates() -> list:
+    """
+    Enkoderne fra FFMPEG_ENCODERS som ffmpeg er bygget med, i prioriteret rækkefølge -
+    NVENC kun når der er en CUDA-GPU og VideoToolbox kun på macOS. Tom liste hvis ffmpeg
+    ikke kan spørges.
+    """
+    try:
+        result = _os_subprocess.run([FFMPEG_PATH, "-hide_banner", "-encoders"],
+                                    capture_output=True, text=True, timeout=30, check=True)
+    except (OSError, _os_subprocess.SubprocessError) as e:
+        logger.debug("ffmpeg could not list encoders: %s", e)
+        return []
+    available = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+    candidates = []
+    for encoder in FFMPEG_ENCODERS:
+        if encoder == 'h264_nvenc' and not CUDA_AVAILABLE:
+            continue
+        if encoder == 'h264_videotoolbox' and sys.platform != 'darwin':
+            continue
+        if encoder in available:
+            candidates.append(encoder)
+    return candidates
+
+def probe_ffmpeg_encoder(encoder: str) -> bool:
+    """
+    Test-enkoder én sort frame med encoder til ffmpeg's null-output. At en enkoder står i
+    `ffmpeg -encoders` betyder ikke at den kan åbnes (fx NVENC uden driver eller ledig
+    session) - så fejler den her i stedet for midt i et job.
+    """
+    width, height = FFMPEG_PROBE_SIZE
+    try:
+        result = _os_subprocess.run(
+            [FFMPEG_PATH, "-hide_banner", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", "1", "-i", "-",
+             "-c:v", encoder, *FFMPEG_ENCODERS[encoder], "-pix_fmt", "yuv420p", "-f", "null", "-"],
+            input=bytes(width * height * 3), capture_output=True, timeout=60
+        )
+    except (OSError, _os_subprocess.SubprocessError) as e:
+        logger.info("ffmpeg encoder %s could not be tested: %s", encoder, e)
+        return False
+    if result.returncode != 0:
+        logger.info("ffmpeg encoder %s failed a test encode: %s", encoder,
+                    result.stderr.decode(errors='replace').strip())
+        return False
+    return True
+
+def ffmpeg_encoder(exclude: tuple = ()):
+    """
+    Vælger den første enkoder fra ffmpeg_encoder_candidates (undtagen dem i exclude) der
+    kan test-enkode en frame (se probe_ffmpeg_encoder). Returnerer None hvis ingen kan.
+    Kun en enkoder der har bestået testen gemmes i VIDEO_WRITER_CACHE_FILE, så ffmpeg
+    kun spørges én gang pr. installation.
+    """
+    encoders = video_writer_cache()['ffmpeg']
+    key = _ffmpeg_cache_key()
+    if encoders.get(key) is not None and encoders[key] not in exclude:
+        return encoders[key]
+    choice = next((encoder for encoder in ffmpeg_encoder_candidates()
+                   if encoder not in exclude and probe_ffmpeg_encoder(encoder)), None)
+    if choice is not None:
+        encoders[key] = choice
+        save_video_writer_cache()
+    return choice
+
+def forget_ffmpeg_encoder(encoder: str) -> None:
+    """Fjerner encoder fra VIDEO_WRITER_CACHE_FILE efter en fejl, så næste job vælger forfra."""
+    encoders = video_writer_cache()['ffmpeg']
+    key = _ffmpeg_cache_key()
+    if encoders.get(key) == encoder:
+        del encoders[key]
+        save_video_writer_cache()
+
+# Antal første frames FFmpegWriter gemmer en kopi af, så de kan skrives igen med næste enkoder
+# hvis ffmpeg stopper i starten (en enkoder der ikke kan åbnes, fejler ved første frame)
+FFMPEG_REPLAY_FRAMES = 4
+
+class FFmpegWriter:
+    """
+    Skriver rå BGR-frames til en ffmpeg-process via stdin. Har samme write, isOpened og
+    release som cv2.VideoWriter, så open_video_writer kan returnere begge. Pipen er en
+    almindelig blokerende OS-pipe, også under eventlet (se _os_subprocess).
+
+    Stopper ffmpeg inden for de første FFMPEG_REPLAY_FRAMES frames (brudt pipe eller
+    fejlkode), skiftes til næste enkoder - eller cv2.VideoWriter - og de gemte frames
+    skrives igen. Senere fejl giver IOError, så jobbet ikke ender med en afkortet video.
+    """
+
+    def __init__(self, output_path: str, fps: float, size: tuple, encoder: str, exclude: tuple = ()):
+        self.output_path = output_path
+        self.fps = fps
+        self.size = size
+        self.encoder = encoder
+        self.exclude = exclude
+        self._replay = []
+        self._fallback = None
+        width, height = size
+        self.proc = _os_subprocess.Popen(
+            [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps:.6g}", "-i", "-",
+             "-c:v", encoder, *FFMPEG_ENCODERS[encoder], "-pix_fmt", "yuv420p", output_path],
+            stdin=_os_subprocess.PIPE
+        )
+
+    def isOpened(self) -> bool:
+        if self._fallback is not None:
+            return self._fallback.isOpened()
+        return self.proc.poll() is None
+
+    def write(self, frame: np.ndarray) -> None:
+        if self._fallback is not None:
+            self._fallback.write(frame)
+            return
+        if self._replay is not None:
+            # Kopi - kalderen genbruger sine frame-buffere
+            self._replay.append(frame.copy())
+            if len(self._replay) > FFMPEG_REPLAY_FRAMES:
+                self._replay = None
+        try:
+            # Frames fra VideoCapture er sammenhængende uint8 BGR - skrives uden kopi som bytes
+            self.proc.stdin.write(memoryview(np.ascontiguousarray(frame)).cast('B'))
+        except (BrokenPipeError, ValueError) as e:
+            self._fall_back(f"pipe closed ({e})")
+
+    def release(self) -> None:
+        if self._fallback is not None:
+            self._fallback.release()
+            return
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        if self.proc.wait() != 0:
+            self._fall_back(f"exit code {self.proc.returncode}")
+            self._fallback.release()
+
+    def _fall_back(self, reason: str) -> None:
+        """Skifter til næste writer og skriver de gemte frames igen - eller giver IOError."""
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+        self.proc.wait()
+        logger.warning("ffmpeg encoder %s stopped: %s", self.encoder, reason)
+        forget_ffmpeg_encoder(self.encoder)
+        if self._replay is None:
+            raise IOError(f"ffmpeg encoder {self.encoder} stopped after the first "
+                          f"{FFMPEG_REPLAY_FRAMES} frames: {reason}")
+        replay, self._replay = self._replay, None
+        self._fallback = open_video_writer(self.output_path, self.fps, self.size,
+                                           exclude=self.exclude + (self.encoder,))
+        for frame in replay:
+            self._fallback.write(frame)
+
+# Codecs der prøves i rækkefølge når outputvideoen oprettes med OpenCV (se open_video_writer)
+VIDEO_WRITER_CODECS = ('avc1', 'mp4v')
+
+def open_video_writer(output_path: str, fps: float, size: tuple, exclude: tuple = ()):
+    """
+    Opretter writer til outputvideoen.
+
+    Er ffmpeg installeret, pipes de rå frames direkte til den (se FFmpegWriter) med
+    NVENC, VideoToolbox (macOS) eller libx264, som bruger alle kerner - den første der kan
+    test-enkode, undtagen enkoderne i exclude (se ffmpeg_encoder). Ellers bruges
+    cv2.VideoWriter: H.264 (avc1) prøves først og ellers mp4v. Via OpenCV's FFmpeg-backend
+    bedes om hardware-enkodning (NVENC/VAAPI/QSV) med software som fallback, så enkodningen
+    flyttes fra CPU'en hvor det er muligt.
+    """
+    encoder = ffmpeg_encoder(exclude) if FFMPEG_PATH else None
+    if encoder is not None:
+        try:
+            out = FFmpegWriter(output_path, fps, size, encoder, exclude)
+            logger.info("Writing output video with ffmpeg encoder %s", encoder)
+            return out
+        except OSError as e:
+            logger.warning("Could not start ffmpeg, using OpenCV VideoWriter: %s", e)
+
+    hw_params = None
+    if hasattr(cv2, 'VIDEOWRITER_PROP_HW_ACCELERATION'):
+        hw_params = [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    choices = [(codec, use_hw) for codec in VIDEO_WRITER_CODECS
+               for use_hw in ((True, False) if hw_params is not None else (False,))]
+    # (codec, hardware-enkodning) som cv2.VideoWriter sidst kunne åbne prøves først, så de
+    # kombinationer der ikke findes ikke prøves (og logger fejl) ved hvert job
+    codecs = video_writer_cache()['opencv']
+    key = _opencv_cache_key()
+    last_choice = tuple(codecs.get(key, ()))
+    if last_choice in choices:
+        choices.remove(last_choice)
+        choices.insert(0, last_choice)
+    for codec, use_hw in choices:
+        fourcc = cv2.VideoWriter_fourcc(*codec)
+        if use_hw:
+            out = cv2.VideoWriter(output_path, cv2.CAP_FFMPEG, fourcc, fps, size, hw_params)
+        else:
+            out = cv2.VideoWriter(output_path, fourcc, fps, size)
+        if out.isOpened():
+            if (codec, use_hw) != last_choice:
+                codecs[key] = [codec, use_hw]
+                save_video_writer_cache()
+            logger.info("Writing output video with codec %s", codec)
+            return out
+    return out
+
+def open_video_capture(input_path: str) -> cv2.VideoCapture:
+    """
+    Åbner inputvideoen til dekodning. Via OpenCV's FFmpeg-backend bedes om hardware-
+    dekodning (NVDEC/VAAPI/QSV) med software som fallback. Framesne er stadig almindelige
+    BGR-arrays i RAM, så resten af pipelinen er uændret.
+    """
+    if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        cap = cv2.VideoCapture(input_path, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            return cap
+    return cv2.VideoCapture(input_path)
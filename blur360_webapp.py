@@ -1,7 +1,22 @@
 # Flask-baseret webtjeneste til upload og automatisk behandling af 360°-videoer
 # inkl. splitting, ansigts-/nummerpladegenkendelse og sløring
 
-from flask import Flask, request, send_file, render_template_string, jsonify, session, Response
+# eventlet (eller gevent) skal monkey-patche standardbiblioteket inden noget andet importeres,
+# så Socket.IO, baggrundsopgaver og subprocess-pipes kører kooperativt på én hub i stedet
+# for en tråd pr. forbindelse
+try:
+    import eventlet
+    eventlet.monkey_patch()
+    ASYNC_MODE = 'eventlet'
+except ImportError:
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        ASYNC_MODE = 'gevent'
+    except ImportError:
+        ASYNC_MODE = 'threading'
+
+from flask import Flask, Request, request, send_from_directory, render_template, jsonify, session, Response, url_for
 import os
 import sys
 import uuid
@@ -12,15 +27,27 @@ import socket
 import numpy as np
 import time
 import threading
-import json
+import orjson
+import bisect
 import datetime
 import inspect
 import re
 import configparser
+import secrets
+import signal
+import selectors
+import tempfile
+import hashlib
 from pathlib import Path
-from flask_socketio import SocketIO
+from typing import Optional
+from urllib.parse import quote
+from werkzeug.exceptions import NotFound
+from dataclasses import dataclass, field
+from jinja2 import FileSystemBytecodeCache
+from flask_socketio import SocketIO, join_room, emit
 from flask_babel import Babel
 from flask_babel import gettext as _
+from download_assets import VENDOR_ASSETS
 
 # Setup logging
 logging.basicConfig(
@@ -29,13 +56,34 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 logger = logging.getLogger('blur360_webapp')
+
+# Detektion, sløring og video-I/O deles med worker-processen
+from blur360_core import (
+    OPENCV_CUDA_AVAILABLE, ULTRALYTICS_AVAILABLE, YOLO_IMGSZ,
+    DETECTION_FACE, DETECTION_PLATE, DETECTION_COLORS,
+    wrap_frame_for_detection, dnn_blob, adjust_coords_for_wrapped_detections,
+    blur_roi, pad_detections, use_composite_blur, composite_blur,
+    parse_dnn_detections, yolo_input, yolo_source, yolo_boxes_xywh, box_iou_matrix,
+    label_detections, merge_overlapping_detections, load_yolo_model,
+    open_video_writer, open_video_capture,
+)
+
+# watchdog bruges til at få besked om ændringer i status-filer i stedet for polling
 try:
-    from ultralytics import YOLO
-    ULTRALYTICS_AVAILABLE = True
-    print("Ultralytics YOLO detected and available.")
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
 except ImportError:
-    ULTRALYTICS_AVAILABLE = False
-    print("Ultralytics YOLO not available. Will use OpenCV DNN if possible.")
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+    logger.info("watchdog not available - status files will be polled")
+
+# psutil bruges til at bekræfte at en annulleret worker-proces er afsluttet
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
 
 # Load configuration from config.ini if it exists
 config = configparser.ConfigParser()
@@ -64,12 +112,78 @@ else:
         config.write(f)
     logger.info(f"Created default configuration file at {config_file}")
 
+@dataclass(frozen=True)
+class Settings:
+    """Indstillinger fra config.ini, læst og typekonverteret én gang ved opstart."""
+    host: str
+    port: int
+    debug: bool
+    secret_key: Optional[str]
+    use_x_sendfile: bool
+    x_accel_redirect: Optional[str]
+    language: str
+    verbose_logging: bool
+    cloudflare_enabled: bool
+    cloudflare_hostname: Optional[str]
+
+SETTINGS = Settings(
+    host=config.get('server', 'host', fallback='127.0.0.1'),
+    port=config.getint('server', 'port', fallback=5000),
+    debug=config.getboolean('server', 'debug', fallback=False),
+    secret_key=config.get('server', 'secret_key', fallback=None),
+    use_x_sendfile=config.getboolean('server', 'use_x_sendfile', fallback=False),
+    x_accel_redirect=config.get('server', 'x_accel_redirect', fallback=None),
+    language=config.get('processing', 'language', fallback='da'),
+    verbose_logging=config.getboolean('processing', 'verbose_logging', fallback=False),
+    cloudflare_enabled=config.getboolean('cloudflare', 'enabled', fallback=False),
+    cloudflare_hostname=config.get('cloudflare', 'hostname', fallback=None),
+)
+
+# Genereret SECRET_KEY gemmes uden for git (se .gitignore), så sessioner overlever genstart
+SECRET_KEY_FILE = Path("instance") / "secret_key"
+
+def _load_or_create_secret_key() -> str:
+    """
+    Returnerer SECRET_KEY fra SECRET_KEY_FILE og genererer en ny første gang.
+    Filen oprettes kun læsbar for ejeren.
+    """
+    try:
+        return SECRET_KEY_FILE.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        pass
+    secret_key = secrets.token_hex(32)
+    try:
+        SECRET_KEY_FILE.parent.mkdir(exist_ok=True)
+        fd = os.open(SECRET_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(secret_key)
+        logger.info(f"Generated a new secret key and saved it to {SECRET_KEY_FILE}")
+    except FileExistsError:
+        # En anden proces nåede at oprette den samtidig
+        return SECRET_KEY_FILE.read_text(encoding='utf-8').strip()
+    except OSError as e:
+        logger.warning(f"Could not save secret key to {SECRET_KEY_FILE} - sessions will not survive a restart: {e}")
+    return secret_key
+
 # Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.urandom(24)
+app = Flask(__name__, template_folder='templates')
+# Kompilerede templates gemmes mellem genstarter
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+# Templates tjekkes kun for ændringer i debug-tilstand - ellers bruges den kompilerede udgave
+app.config['TEMPLATES_AUTO_RELOAD'] = SETTINGS.debug
+app.jinja_env.auto_reload = SETTINGS.debug
+# Kompilér sidens template ved opstart, så første request ikke skal vente på det
+app.jinja_env.get_template('base.html')
+app.config['SECRET_KEY'] = (
+    os.environ.get('SECRET_KEY')
+    or SETTINGS.secret_key
+    or _load_or_create_secret_key()
+)
 app.config['UPLOAD_FOLDER'] = "uploads"
 app.config['PROCESSED_FOLDER'] = "processed"
-app.config['BABEL_DEFAULT_LOCALE'] = config.get('processing', 'language', fallback='da')
+# Bag Apache (mod_xsendfile) eller lighttpd kan webserveren selv sende de færdige videoer
+app.config['USE_X_SENDFILE'] = SETTINGS.use_x_sendfile
+app.config['BABEL_DEFAULT_LOCALE'] = SETTINGS.language
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
 app.config['SUPPORTED_LANGUAGES'] = {
     'da': 'Dansk',
@@ -81,9 +195,9 @@ app.config['SUPPORTED_LANGUAGES'] = {
 }
 
 # Server configuration
-app.config['HOST'] = config.get('server', 'host', fallback='127.0.0.1')
-app.config['PORT'] = config.getint('server', 'port', fallback=5000)
-app.config['DEBUG'] = config.getboolean('server', 'debug', fallback=False)
+app.config['HOST'] = SETTINGS.host
+app.config['PORT'] = SETTINGS.port
+app.config['DEBUG'] = SETTINGS.debug
 
 UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
 PROCESSED_FOLDER = app.config['PROCESSED_FOLDER']
@@ -98,130 +212,676 @@ os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 os.makedirs(MODEL_FOLDER, exist_ok=True)
 os.makedirs(STATUS_FOLDER, exist_ok=True)
 
+# Suffiks for uploads der stadig er ved at blive modtaget (se UploadRequest)
+UPLOAD_PART_SUFFIX = ".part"
+
+
+class UploadRequest(Request):
+    """
+    Request der skriver filer fra multipart-uploads direkte ind i UPLOAD_FOLDER.
+
+    Werkzeug lægger ellers filen i en midlertidig fil i systemets temp-mappe, som
+    derefter skulle kopieres - herfra kan den i stedet omdøbes på plads (se save_upload).
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_FOLDER, prefix='.upload-',
+                                           suffix=UPLOAD_PART_SUFFIX, delete=False)
+
+    def close(self):
+        """Lukker filerne og fjerner uploads der ikke blev gemt (fx afviste filtyper)."""
+        files = self.__dict__.get('files')
+        super().close()
+        for _key, upload in (files.items(multi=True) if files else ()):
+            name = getattr(upload.stream, 'name', None)
+            if isinstance(name, str) and name.endswith(UPLOAD_PART_SUFFIX):
+                try:
+                    os.remove(name)
+                except FileNotFoundError:
+                    pass
+
+
+app.request_class = UploadRequest
+
+
+def save_upload(upload, filepath):
+    """Flytter en modtaget upload til filepath - uden kopiering når den allerede ligger i UPLOAD_FOLDER."""
+    name = getattr(upload.stream, 'name', None)
+    if isinstance(name, str) and name.endswith(UPLOAD_PART_SUFFIX):
+        upload.stream.close()
+        os.replace(name, filepath)
+    else:
+        upload.save(filepath)
+
 # Initialiser Socket.IO for realtids-kommunikation
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', logger=True, engineio_logger=True)
+logger.info(f"Socket.IO async_mode: {ASYNC_MODE}")
+# Pakke-logning (hver emit, poll og heartbeat) kun i debug mode
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+                    logger=SETTINGS.debug, engineio_logger=SETTINGS.debug)
+if not SETTINGS.debug:
+    logging.getLogger('socketio').setLevel(logging.WARNING)
+    logging.getLogger('engineio').setLevel(logging.WARNING)
 
 # Initialiser Babel for internationalisering
 babel = Babel(app)
 
-# Job status dict for behandlingsstatus
+# Frontend-biblioteker der findes lokalt under static/vendor (hentes med download_assets.py).
+# Mangler en fil, bruges CDN-adressen i stedet.
+LOCAL_VENDOR_ASSETS = {
+    path for path in VENDOR_ASSETS
+    if os.path.exists(os.path.join(app.static_folder, path))
+}
+if len(LOCAL_VENDOR_ASSETS) < len(VENDOR_ASSETS):
+    logger.info("Frontend assets are loaded from CDN - run download_assets.py to serve them locally")
+
+def vendor_url(path):
+    """Returnerer URL til et frontend-bibliotek - lokalt hvis det er hentet, ellers CDN."""
+    if path in LOCAL_VENDOR_ASSETS:
+        return url_for('static', filename=path)
+    return VENDOR_ASSETS[path]
+
+# Indholds-hash for appens egne filer under static/ (se asset_url)
+_asset_versions = {}
+
+def asset_url(filename):
+    """
+    Returnerer URL til en af appens egne filer under static/ med en hash af indholdet
+    (?v=...), så browseren kan cache filen permanent og henter en ny ved ændringer.
+    """
+    version = _asset_versions.get(filename)
+    if version is None:
+        with open(os.path.join(app.static_folder, filename), 'rb') as f:
+            version = hashlib.md5(f.read()).hexdigest()[:10]
+        # I debug mode beregnes hashen igen ved hver side, så ændringer slår igennem
+        if not SETTINGS.debug:
+            _asset_versions[filename] = version
+    return url_for('static', filename=filename, v=version)
+
+@app.context_processor
+def inject_vendor_url():
+    return {'vendor_url': vendor_url, 'asset_url': asset_url}
+
+@app.after_request
+def cache_vendor_assets(response):
+    """
+    Versionerede filer under static/vendor ændrer sig aldrig og kan caches permanent.
+    Det samme gælder appens egne filer når de hentes med indholds-hash (asset_url).
+    """
+    if response.status_code == 200 and (
+            request.path.startswith('/static/vendor/') or
+            (request.path.startswith('/static/') and 'v' in request.args)):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@dataclass
+class JobState:
+    """
+    Tilstand for et behandlingsjob.
+
+    Dette er jobbets eneste gældende tilstand mens webappen kører: hver status fra
+    worker (stdout eller status-fil) skrives hertil, og routes læser kun herfra.
+    Status-filen bruges kun til at genoptage jobs efter en genstart.
+
+    Opdateres fra baggrundsopgaverne mens request-handlerne læser den, så felter
+    der hører sammen skrives og læses under `lock` (se update og snapshot).
+    """
+    input_path: str
+    output_path: str
+    debug_mode: bool = False
+    use_dnn: bool = True
+    start_time: float = field(default_factory=time.time)
+    end_time: float = 0.0
+    status: str = 'uploading'
+    progress: int = 0
+    message: str = ''
+    details: dict = field(default_factory=dict)  # Seneste nøgletal (STATUS_DETAIL_FIELDS)
+    worker_pid: int = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def update(self, **fields):
+        """Sætter flere felter på én gang, så læsere ikke ser en halv opdatering."""
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def snapshot(self):
+        """Returnerer status, progress, message og nøgletal som ét sammenhængende dict."""
+        with self.lock:
+            return {'status': self.status, 'progress': self.progress, 'message': self.message,
+                    **self.details}
+
+# Job status dict for behandlingsstatus: job_id -> JobState
 processing_jobs = {}
 
-def monitor_worker_status(job_id):
+# Statuslinjer som worker skriver på stdout har dette præfiks (se blur360_worker.py)
+STATUS_LINE_PREFIX = "@@STATUS "
+
+# Mønstre for CPU- og FPS-linjer i worker'ens output - kompileres én gang, da de prøves på hver linje
+WORKER_CPU_RE = re.compile(r"Running with (\d+) parallel processes \(of (\d+) available cores\)")
+WORKER_FPS_RE = re.compile(r"Processing rate: ([0-9.]+) FPS \(batch\), ([0-9.]+) FPS \(avg\), ([0-9.]+) FPS \(weighted\)")
+
+# Jobs der aktuelt overvåges: job_id -> Event der sættes når jobbet er afsluttet,
+# samt seneste udsendte status så vi undgår duplicate beskeder
+monitored_jobs = {}
+
+# Én fælles filsystem-observer for hele STATUS_FOLDER (oprettes ved første behov)
+_status_observer = None
+_status_observer_lock = threading.Lock()
+
+# Nøgletal fra worker (se blur360_worker.py) der sendes med i progress_update
+STATUS_DETAIL_FIELDS = ('fps', 'batch', 'frames', 'time')
+
+# Trin i brugerfladen som (aktuel, forrige) step for progress under hver tærskel
+PROGRESS_STEP_THRESHOLDS = (15, 50, 95)
+PROGRESS_STEPS = (
+    ('step-analyze', 'step-upload-status'),
+    ('step-detect', 'step-analyze'),
+    ('step-blur', 'step-detect'),
+    ('step-finalize', 'step-blur'),
+)
+
+# Progress-opdateringer samles pr. job og sendes højst hvert PROGRESS_FLUSH_INTERVAL sekund,
+# så kun den seneste tilstand når frem til klienten
+PROGRESS_FLUSH_INTERVAL = 0.15
+pending_updates = {}
+_pending_updates_lock = threading.Lock()
+_progress_flusher_started = False
+
+# Senest sendte felter pr. job - progress_update indeholder kun felter der har ændret sig,
+# ud over dem i PROGRESS_ALWAYS_SENT (så en klient der kobler på midt i et job får trin og procent)
+sent_progress = {}
+PROGRESS_ALWAYS_SENT = ('job_id', 'progress', 'step', 'prev_step')
+
+
+def _progress_delta(job_id, payload):
+    """Returnerer de felter i payload der skal sendes, og husker dem som sendt."""
+    sent = sent_progress.setdefault(job_id, {})
+    delta = {}
+    for key, value in payload.items():
+        if key in PROGRESS_ALWAYS_SENT or sent.get(key) != value:
+            delta[key] = value
+            sent[key] = value
+    return delta
+
+
+def flush_progress_updates(job_id: str = None) -> None:
     """
-    Overvåger job status fra worker processen og sender Socket.IO opdateringer til klienten.
-    
+    Sender ventende progress_update beskeder - kun med de felter der er ændret (se _progress_delta).
+
     Args:
-        job_id: ID for jobbet der skal overvåges
+        job_id: Send kun for dette job (None = alle jobs)
     """
-    if job_id not in processing_jobs:
-        logger.error(f"Cannot monitor job {job_id} - not found in processing_jobs")
-        return
-        
-    status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
-    
-    # Seneste status info for at undgå at sende duplicate beskeder
-    last_progress = 0
-    last_message = ""
-    running = True
-    check_interval = 0.5  # Check hvert halve sekund
-    
-    while running and job_id in processing_jobs:
+    with _pending_updates_lock:
+        if job_id is None:
+            updates = [_progress_delta(job, update) for job, update in pending_updates.items()]
+            pending_updates.clear()
+        else:
+            update = pending_updates.pop(job_id, None)
+            updates = [_progress_delta(job_id, update)] if update else []
+
+    for payload in updates:
+        socketio.emit('progress_update', payload, to=payload['job_id'])
+
+
+def _progress_flush_loop():
+    """Baggrundsopgave der løbende sender de samlede progress-opdateringer."""
+    while True:
+        socketio.sleep(PROGRESS_FLUSH_INTERVAL)
         try:
-            # Tjek om status-filen findes
-            if os.path.exists(status_file):
-                with open(status_file, 'r') as f:
-                    try:
-                        status_data = json.load(f)
-                        
-                        # Hent status
-                        progress = status_data.get('progress', 0)
-                        message = status_data.get('message', '')
-                        status = status_data.get('status', 'processing')
-                        
-                        # Opdater job info
-                        processing_jobs[job_id]['status'] = status
-                        processing_jobs[job_id]['progress'] = progress
-                        processing_jobs[job_id]['message'] = message
-                        
-                        # Send socket.io besked hvis status har ændret sig betydeligt
-                        # (undgå for mange beskeder)
-                        if (abs(progress - last_progress) >= 1 or 
-                            message != last_message or
-                            status in ['completed', 'error']):
-                            
-                            # Bestem aktuel og forrige step baseret på fremskridt
-                            current_step = None
-                            prev_step = None
-                            
-                            if progress < 15:
-                                current_step = 'step-analyze'
-                                prev_step = 'step-upload-status'
-                            elif progress < 50:
-                                current_step = 'step-detect'
-                                prev_step = 'step-analyze'
-                            elif progress < 95:
-                                current_step = 'step-blur'
-                                prev_step = 'step-detect'
-                            else:
-                                current_step = 'step-finalize'
-                                prev_step = 'step-blur'
-                            
-                            # Emit progress update event
-                            socketio.emit('progress_update', {
-                                'job_id': job_id,
-                                'progress': progress,
-                                'message': message,
-                                'step': current_step,
-                                'prev_step': prev_step
-                            })
-                            
-                            last_progress = progress
-                            last_message = message
-                            
-                            logger.info(f"Job {job_id}: {progress}% - {message}")
-                            
-                            # Hvis jobbet er færdigt eller fejlet, emit completion event
-                            if status == 'completed':
-                                logger.info(f"Job {job_id} completed")
-                                processing_jobs[job_id]['end_time'] = time.time()
-                                processing_time = processing_jobs[job_id]['end_time'] - processing_jobs[job_id]['start_time']
-                                
-                                socketio.emit('job_complete', {
-                                    'job_id': job_id,
-                                    'download_url': f'/download/{job_id}',
-                                    'processing_time': processing_time
-                                })
-                                running = False
-                                
-                            elif status == 'error':
-                                logger.error(f"Job {job_id} failed: {message}")
-                                socketio.emit('job_error', {
-                                    'job_id': job_id,
-                                    'error': message
-                                })
-                                running = False
-                                
-                    except json.JSONDecodeError:
-                        logger.error(f"Invalid JSON in status file for job {job_id}")
-                
-            # Vent før næste tjek
-            time.sleep(check_interval)
-            
+            flush_progress_updates()
         except Exception as e:
-            logger.error(f"Error monitoring job {job_id}: {e}")
-            # Fortsæt overvågning selvom der er en fejl
-            time.sleep(check_interval)
-    
+            logger.error(f"Error sending progress updates: {e}")
+
+
+def queue_progress_update(job_id: str, payload: dict) -> None:
+    """
+    Lægger en progress_update i kø til næste flush. Felter fra flere opdateringer
+    i samme interval flettes, så fx FPS og progress ikke overskriver hinanden.
+    """
+    global _progress_flusher_started
+    with _pending_updates_lock:
+        pending = pending_updates.get(job_id)
+        if pending is None:
+            pending_updates[job_id] = dict(payload)
+        else:
+            pending.update(payload)
+
+        if not _progress_flusher_started:
+            _progress_flusher_started = True
+            socketio.start_background_task(_progress_flush_loop)
+
+
+def _handle_status_update(job_id: str, status_data: dict) -> bool:
+    """
+    Opdaterer job info og sender Socket.IO beskeder for en ny status fra worker processen.
+
+    Args:
+        job_id: ID for jobbet
+        status_data: Dict med status, progress og message fra worker
+
+    Returns:
+        True hvis jobbet er afsluttet (completed, error eller cancelled)
+    """
+    monitor = monitored_jobs.get(job_id)
+    job = processing_jobs.get(job_id)
+    if monitor is None or job is None:
+        return False
+
+    # Hent status
+    progress = status_data.get('progress', 0)
+    message = status_data.get('message', '')
+    status = status_data.get('status', 'processing')
+
+    # Opdater job info - nøgletallene erstattes ligesom i status-filen
+    details = {field: status_data[field] for field in STATUS_DETAIL_FIELDS if field in status_data}
+    job.update(status=status, progress=progress, message=message, details=details)
+
+    # Send socket.io besked hvis status har ændret sig betydeligt
+    # (undgå for mange beskeder)
+    if not (abs(progress - monitor['last_progress']) >= 1 or
+            message != monitor['last_message'] or
+            status in ['completed', 'error', 'cancelled']):
+        return False
+
+    # Bestem aktuel og forrige step baseret på fremskridt
+    current_step, prev_step = PROGRESS_STEPS[bisect.bisect_right(PROGRESS_STEP_THRESHOLDS, progress)]
+
+    # Emit progress update event - samles med andre opdateringer, medmindre jobbet er afsluttet
+    payload = {
+        'job_id': job_id,
+        'progress': progress,
+        'message': message,
+        'step': current_step,
+        'prev_step': prev_step
+    }
+    for detail in STATUS_DETAIL_FIELDS:
+        if detail in status_data:
+            payload[detail] = status_data[detail]
+    queue_progress_update(job_id, payload)
+    if status in ['completed', 'error', 'cancelled']:
+        flush_progress_updates(job_id)
+
+    monitor['last_progress'] = progress
+    monitor['last_message'] = message
+
+    logger.info(f"Job {job_id}: {progress}% - {message}")
+
+    # Hvis jobbet er færdigt eller fejlet, emit completion event
+    if status == 'completed':
+        logger.info(f"Job {job_id} completed")
+        with job.lock:
+            job.end_time = time.time()
+            processing_time = job.end_time - job.start_time
+
+        socketio.emit('job_complete', {
+            'job_id': job_id,
+            'download_url': f'/download/{job_id}',
+            'processing_time': processing_time
+        }, to=job_id)
+        return True
+
+    elif status == 'error':
+        logger.error(f"Job {job_id} failed: {message}")
+        socketio.emit('job_error', {
+            'job_id': job_id,
+            'error': message
+        }, to=job_id)
+        return True
+
+    return status == 'cancelled'
+
+
+def _register_monitor(job_id: str, channel: bool = False) -> dict:
+    """
+    Registrerer et job til overvågning.
+
+    Args:
+        job_id: ID for jobbet
+        channel: True hvis status leveres direkte fra worker'ens stdout,
+                 False hvis den skal læses fra status-filen
+    """
+    monitor = {
+        'done': threading.Event(),
+        'last_progress': 0,
+        'last_message': '',
+        'channel': channel
+    }
+    monitored_jobs[job_id] = monitor
+    return monitor
+
+
+def publish_status(job_id: str, status_data: dict) -> None:
+    """Leverer en ny status til overvågningen af et job og afslutter den ved slutstatus."""
+    monitor = monitored_jobs.get(job_id)
+    if monitor is None or monitor['done'].is_set():
+        return
+    if _handle_status_update(job_id, status_data):
+        monitor['done'].set()
+        _finish_monitor(job_id)
+
+
+def _finish_monitor(job_id: str) -> None:
+    """Afslutter overvågningen af et job og rydder op i dets status-fil."""
+    monitored_jobs.pop(job_id, None)
+    sent_progress.pop(job_id, None)
+    _status_cache.pop(job_id, None)
+    _status_polls.pop(job_id, None)
     logger.info(f"Monitoring finished for job {job_id}")
-    
+
     # Når jobbet er færdigt, ryd op i status-filen
     try:
-        if os.path.exists(status_file):
-            os.remove(status_file)
+        os.remove(os.path.join(STATUS_FOLDER, f"{job_id}.json"))
+    except FileNotFoundError:
+        pass
     except Exception as e:
         logger.error(f"Error removing status file: {e}")
 
+
+# Senest læste status-fil pr. job: job_id -> ((mtime_ns, size), status_data).
+# Filen ændres kun når worker (eller en annullering) skriver den, så den parses kun igen da
+_status_cache = {}
+
+
+def load_status_file(job_id: str) -> dict:
+    """
+    Returnerer indholdet af status-filen for et job, parset én gang pr. ændring af filen.
+
+    Det returnerede dict deles mellem kaldene og må ikke ændres.
+
+    Returns:
+        Status fra filen, eller None hvis jobbet ikke har en status-fil
+    """
+    status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
+    try:
+        st = os.stat(status_file)
+    except FileNotFoundError:
+        _status_cache.pop(job_id, None)
+        return None
+
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _status_cache.get(job_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    status_data = orjson.loads(Path(status_file).read_bytes())
+    _status_cache[job_id] = (version, status_data)
+    return status_data
+
+
+def _read_status_file(job_id: str) -> None:
+    """Læser status-filen for et overvåget job og behandler indholdet."""
+    if job_id not in monitored_jobs:
+        return
+
+    try:
+        status_data = load_status_file(job_id)
+        # None: worker har ikke skrevet status endnu
+        if status_data is not None:
+            publish_status(job_id, status_data)
+    except FileNotFoundError:
+        # Filen blev fjernet mellem stat og læsning
+        pass
+    except orjson.JSONDecodeError:
+        # Worker er midt i at skrive filen - næste ændrings-event giver den fulde status
+        logger.debug(f"Incomplete JSON in status file for job {job_id}")
+    except Exception as e:
+        logger.error(f"Error monitoring job {job_id}: {e}")
+
+
+class StatusFileHandler(FileSystemEventHandler):
+    """Sender filændringer i STATUS_FOLDER videre til det job, filen tilhører."""
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ('created', 'modified', 'moved', 'closed'):
+            return
+        # Ved atomisk omdøbning (os.replace) er det destinationen der er status-filen
+        path = getattr(event, 'dest_path', '') or event.src_path
+        filename = os.path.basename(path)
+        if filename.endswith('.json'):
+            job_id = filename[:-len('.json')]
+            monitor = monitored_jobs.get(job_id)
+            # Jobs med en direkte statuskanal fra worker behøver ikke filen
+            if monitor is not None and not monitor['channel']:
+                _read_status_file(job_id)
+
+
+def _ensure_status_observer():
+    """
+    Starter den fælles observer for STATUS_FOLDER første gang den skal bruges.
+
+    Returns:
+        True hvis filændringer kan overvåges via OS-events
+    """
+    global _status_observer
+    if not WATCHDOG_AVAILABLE:
+        return False
+
+    with _status_observer_lock:
+        if _status_observer is None:
+            try:
+                observer = Observer()
+                observer.schedule(StatusFileHandler(), STATUS_FOLDER, recursive=False)
+                observer.daemon = True
+                observer.start()
+                _status_observer = observer
+                logger.info(f"Watching {STATUS_FOLDER} for status changes")
+            except Exception as e:
+                logger.error(f"Could not start status file observer, falling back to polling: {e}")
+                return False
+    return True
+
+
+# Uden watchdog tjekker én fælles baggrundsopgave status-filerne for alle genoptagne jobs:
+# job_id -> {'due': tidspunkt for næste tjek, 'delay': nuværende interval, 'version': (mtime_ns, size)}
+STATUS_POLL_MIN_INTERVAL = 0.5
+STATUS_POLL_MAX_INTERVAL = 5.0
+_status_polls = {}
+_status_poller_started = False
+_status_poller_lock = threading.Lock()
+
+
+def monitor_worker_status(job_id: str) -> None:
+    """
+    Starter overvågningen af job status fra worker processen. Returnerer med det samme.
+
+    Jobs startet af denne webapp får status direkte fra worker'ens stdout
+    (se publish_status). For jobs genoptaget efter en genstart læses status-filen
+    når worker rent faktisk skriver den (via watchdog). Uden watchdog tjekkes filen
+    af den fælles _status_poll_loop. Overvågningen afsluttes af _finish_monitor,
+    når jobbet når en slutstatus.
+
+    Args:
+        job_id: ID for jobbet der skal overvåges
+    """
+    global _status_poller_started
+    if job_id not in processing_jobs:
+        logger.error(f"Cannot monitor job {job_id} - not found in processing_jobs")
+        return
+
+    monitor = monitored_jobs.get(job_id) or _register_monitor(job_id)
+    if monitor['channel']:
+        return
+
+    if _ensure_status_observer():
+        # Worker kan have skrevet filen inden observeren så den - læs den én gang nu
+        _read_status_file(job_id)
+        return
+
+    _status_polls[job_id] = {'due': 0.0, 'delay': STATUS_POLL_MIN_INTERVAL, 'version': None}
+    with _status_poller_lock:
+        if not _status_poller_started:
+            _status_poller_started = True
+            socketio.start_background_task(_status_poll_loop)
+
+
+def _status_poll_loop() -> None:
+    """
+    Baggrundsopgave der tjekker status-filerne for alle jobs i _status_polls.
+
+    Intervallet for et job vokser (x1.5) op til STATUS_POLL_MAX_INTERVAL mens filen ikke
+    ændres, og nulstilles når worker skriver en ny status.
+    """
+    while True:
+        socketio.sleep(STATUS_POLL_MIN_INTERVAL / 2)
+        now = time.monotonic()
+        for job_id, poll in list(_status_polls.items()):
+            if poll['due'] > now:
+                continue
+            if job_id not in processing_jobs:
+                _status_polls.pop(job_id, None)
+                continue
+            try:
+                st = os.stat(os.path.join(STATUS_FOLDER, f"{job_id}.json"))
+                version = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                version = None
+            if version is not None and version != poll['version']:
+                poll['version'] = version
+                poll['delay'] = STATUS_POLL_MIN_INTERVAL
+                _read_status_file(job_id)
+            else:
+                poll['delay'] = min(poll['delay'] * 1.5, STATUS_POLL_MAX_INTERVAL)
+            poll['due'] = now + poll['delay']
+
+
+def handle_worker_line(job_id: str, line: str) -> None:
+    """Behandler én linje fra worker'ens output: statuslinjer, CPU- og FPS-info logges og sendes videre."""
+    line = line.strip()
+    if line.startswith(STATUS_LINE_PREFIX):
+        # Struktureret status fra worker
+        try:
+            publish_status(job_id, orjson.loads(line[len(STATUS_LINE_PREFIX):]))
+        except orjson.JSONDecodeError:
+            logger.error(f"Invalid status line from worker: {line}")
+    elif "CPU UTILIZATION" in line or "Running with" in line:
+        # Fremhæv CPU-information
+        logger.info(f"WORKER CPU INFO: {line}")
+        print(f"\n\033[1;32m>>> {line} <<<\033[0m\n")  # Grøn fed tekst i terminal
+
+        # Find CPU-informationen og send til klienten via Socket.IO
+        if "Running with" in line:
+            # Udtræk CPU-info
+            cpu_match = WORKER_CPU_RE.search(line)
+            if cpu_match:
+                used_cores = cpu_match.group(1)
+                total_cores = cpu_match.group(2)
+
+                # Send til klienten
+                socketio.emit('worker_cpu_info', {
+                    'job_id': job_id,
+                    'used_cores': used_cores,
+                    'total_cores': total_cores,
+                    'percentage': f"{int(int(used_cores) / int(total_cores) * 100)}%"
+                }, to=job_id)
+    elif "Processing rate:" in line:
+        # Fremhæv FPS-information
+        logger.info(f"WORKER SPEED INFO: {line}")
+
+        # Udtræk FPS-info
+        fps_match = WORKER_FPS_RE.search(line)
+        if fps_match:
+            batch_fps = fps_match.group(1)
+            avg_fps = fps_match.group(2)
+            weighted_fps = fps_match.group(3)
+
+            # Flettes ind i næste samlede progress_update (se queue_progress_update)
+            queue_progress_update(job_id, {
+                'job_id': job_id,
+                'fps': {
+                    'batch': batch_fps,
+                    'avg': avg_fps,
+                    'weighted': weighted_fps
+                }
+            })
+    elif "ERROR" in line.upper() or line.startswith("Traceback"):
+        # Log fejl - stderr er flettet ind i stdout, så fejl genkendes på indholdet
+        logger.error(f"WORKER: {line}")
+    else:
+        # Log almindelige beskeder
+        logger.info(f"WORKER: {line}")
+
+
+def _worker_exited(job_id: str, process: subprocess.Popen) -> None:
+    """Kaldes når worker-pipen er lukket - melder fejl hvis worker ikke sendte en slutstatus."""
+    process.wait()
+    monitor = monitored_jobs.get(job_id)
+    # Worker er afsluttet uden at melde en slutstatus (fx et nedbrud)
+    if monitor is not None and not monitor['done'].is_set():
+        publish_status(job_id, {
+            'progress': 0,
+            'message': f"Worker process exited unexpectedly (code {process.returncode})",
+            'status': 'error'
+        })
+
+
+# Alle workers' output læses af én fælles baggrundsopgave via en selector,
+# i stedet for en tråd pr. job. stderr er flettet ind i stdout, så der kun er én pipe
+# pr. worker, og den læses løbende så en fuld pipe-buffer aldrig blokerer worker'en
+_pipe_selector = selectors.DefaultSelector()
+_pipe_reader_started = False
+_pipe_reader_lock = threading.Lock()
+
+
+def watch_worker_pipes(job_id: str, process: subprocess.Popen) -> None:
+    """Registrerer en worker's output-pipe hos den fælles pipe-læser."""
+    global _pipe_reader_started
+    stream = process.stdout
+    os.set_blocking(stream.fileno(), False)
+    _pipe_selector.register(stream.fileno(), selectors.EVENT_READ,
+                            {'job_id': job_id, 'process': process, 'stream': stream, 'partial': b''})
+
+    with _pipe_reader_lock:
+        if not _pipe_reader_started:
+            _pipe_reader_started = True
+            socketio.start_background_task(_pipe_reader_loop)
+
+
+def _pipe_reader_loop() -> None:
+    """Baggrundsopgave der læser fra alle registrerede worker-pipes."""
+    while True:
+        if not _pipe_selector.get_map():
+            socketio.sleep(0.1)
+            continue
+        try:
+            for key, _events in _pipe_selector.select(timeout=0.5):
+                _read_worker_pipe(key.fd, key.data)
+        except Exception as e:
+            logger.error(f"Error reading worker output: {e}")
+
+
+def _read_worker_pipe(fd: int, pipe: dict) -> None:
+    """Læser det der er klar på en worker-pipe og behandler de hele linjer."""
+    try:
+        chunk = os.read(fd, 65536)
+    except BlockingIOError:
+        return
+    except OSError:
+        chunk = b''
+
+    data = pipe['partial'] + chunk
+    if chunk:
+        # Sidste stykke er en ufærdig linje - gemmes til næste læsning
+        *lines, pipe['partial'] = data.split(b'\n')
+    else:
+        lines = [data] if data else []
+
+    job_id = pipe['job_id']
+    for raw in lines:
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            continue
+        try:
+            handle_worker_line(job_id, line)
+        except Exception as e:
+            logger.error(f"Error handling worker output for job {job_id}: {e}")
+
+    if not chunk:
+        # Pipen er lukket - worker'en er færdig
+        _pipe_selector.unregister(fd)
+        pipe['stream'].close()
+        socketio.start_background_task(_worker_exited, job_id, pipe['process'])
+
+
 # Locale selector for Babel
 def get_locale():
     # 1. Brug request parameter (fx ?lang=en)
@@ -241,1108 +901,102 @@ def get_locale():
 # Register the locale selector function with Babel
 babel.init_app(app, locale_selector=get_locale)
 
-# Funktion til at håndtere wrap-around detektion for 360° billeder
-def wrap_frame_for_detection(frame):
+
+# Tracker-typer i prioriteret rækkefølge - KCF og CSRT er de hurtigste pr. frame,
+# MIL er langsom, og Nano/GOTURN/Vit kræver ekstra modelfiler
+TRACKER_CANDIDATES = ['KCF', 'CSRT', 'MIL', 'Nano', 'GOTURN', 'Vit']
+
+def _probe_tracker_factory():
     """
-    Tilføjer wrap-around-padding i siderne af et equirectangular 360°-billede.
-    Dette forbedrer detektion nær venstre og højre kant.
+    Finder den første tracker-type der kan oprettes i denne OpenCV-installation.
+    Køres én gang ved import, så create_tracker ikke skal gentage søgningen.
+
+    Returns:
+        (navn, factory) eller (None, None) hvis tracking ikke understøttes
     """
-    height, width = frame.shape[:2]
-    pad_w = width // 4  # 25% padding
+    print(f"Checking tracking capabilities in OpenCV {cv2.__version__}")
+    for name in TRACKER_CANDIDATES:
+        factory = getattr(cv2, f'Tracker{name}_create', None)
+        if factory is None:
+            continue
+        try:
+            factory()
+        except Exception as e:
+            print(f"Error creating {name} tracker: {e}")
+            continue
+        print(f"Using cv2.Tracker{name}_create")
+        return name, factory
 
-    left = frame[:, -pad_w:]   # Sidste 25%
-    right = frame[:, :pad_w]   # Første 25%
-    wrapped = np.hstack([left, frame, right])
+    print("WARNING: No suitable tracking implementation found in this OpenCV version")
+    print("For best tracking support, try: pip install opencv-contrib-python==4.5.5.64")
+    return None, None
 
-    return wrapped, pad_w
+TRACKER_TYPE, _TRACKER_FACTORY = _probe_tracker_factory()
 
+# Trackerne kører på en nedskaleret kopi af framen, da deres feature-beregninger skalerer
+# med billedarealet. Kun frames der er mindst TRACKER_MIN_WIDTH brede skaleres ned
+TRACKER_SCALE = 0.5
+TRACKER_MIN_WIDTH = 1920
 
-def adjust_coords_for_wrapped_detections(detections, pad_w, original_width):
-    """
-    Justerer koordinater fra wrap'et billede tilbage til originalt koordinatsystem.
-    Filtrerer samtidig dem der falder helt uden for det oprindelige billede.
-    """
-    adjusted = []
-    for (x, y, w, h) in detections:
-        x -= pad_w  # Justér X-koordinat
-        if x + w < 0 or x > original_width:
-            continue  # Uden for billedet
-        x = max(0, x)
-        w = min(original_width - x, w)
-        adjusted.append((x, y, w, h))
-    return adjusted
+def tracker_input(frame: np.ndarray, scale: float) -> np.ndarray:
+    """Returnerer framen skaleret med `scale` til trackerne (uændret ved scale 1.0)."""
+    if scale == 1.0:
+        return frame
+    return cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
 def create_tracker():
     """
     Helper function to create a tracker based on available OpenCV capabilities.
     Returns None if tracking is not supported.
     """
-    try:
-        # Print out available tracking modules
-        print(f"Checking tracking capabilities in OpenCV {cv2.__version__}")
-        
-        # Try to use available trackers in your installation
-        available_trackers = []
-        
-        # MIL tracker (detected in your installation)
-        if hasattr(cv2, 'TrackerMIL_create'):
-            print("Using cv2.TrackerMIL_create")
-            try:
-                tracker = cv2.TrackerMIL_create()
-                available_trackers.append("MIL")
-                return tracker
-            except Exception as e:
-                print(f"Error creating MIL tracker: {e}")
-        
-        # NANO tracker (detected in your installation)
-        if hasattr(cv2, 'TrackerNano_create'):
-            print("Using cv2.TrackerNano_create")
-            try:
-                tracker = cv2.TrackerNano_create()
-                available_trackers.append("Nano")
-                return tracker
-            except Exception as e:
-                print(f"Error creating Nano tracker: {e}")
-        
-        # GOTURN tracker (detected in your installation but may need models)
-        if hasattr(cv2, 'TrackerGOTURN_create'):
-            print("Using cv2.TrackerGOTURN_create")
-            try:
-                tracker = cv2.TrackerGOTURN_create()
-                available_trackers.append("GOTURN")
-                return tracker
-            except Exception as e:
-                print(f"Error creating GOTURN tracker: {e}")
-                
-        # VIT tracker (detected in your installation)
-        if hasattr(cv2, 'TrackerVit_create'):
-            print("Using cv2.TrackerVit_create")
-            try:
-                tracker = cv2.TrackerVit_create()
-                available_trackers.append("Vit")
-                return tracker
-            except Exception as e:
-                print(f"Error creating VIT tracker: {e}")
-        
-        # DaSiamRPN has model dependency issues
-        # Try all the old standby trackers too
-        if hasattr(cv2, 'TrackerCSRT_create'):
-            print("Using cv2.TrackerCSRT_create")
-            try:
-                tracker = cv2.TrackerCSRT_create()
-                available_trackers.append("CSRT")
-                return tracker
-            except Exception as e:
-                print(f"Error creating CSRT tracker: {e}")
-        
-        if hasattr(cv2, 'TrackerKCF_create'):
-            print("Using cv2.TrackerKCF_create")
-            try:
-                tracker = cv2.TrackerKCF_create()
-                available_trackers.append("KCF")
-                return tracker
-            except Exception as e:
-                print(f"Error creating KCF tracker: {e}")
-                
-        # Summary of available trackers
-        if available_trackers:
-            print(f"Available trackers: {', '.join(available_trackers)}")
-        else:
-            print("WARNING: No suitable tracking implementation found in this OpenCV version")
-            print("For best tracking support, try: pip install opencv-contrib-python==4.5.5.64")
-        
-        # Just disable tracking for now - need the proper models and environment
-        print("Tracking temporarily disabled - try reinstalling opencv-contrib-python")
+    if _TRACKER_FACTORY is None:
         return None
+    try:
+        return _TRACKER_FACTORY()
     except Exception as e:
         print(f"Error creating tracker: {e}")
-        print(f"OpenCV version: {cv2.__version__}")
-        print("Disabling tracking for compatibility")
         return None
 
-# Base HTML template med Bootstrap og Socket.IO
-BASE_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="{{ lang }}">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{ _('360° Video Blur') }}</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/bootstrap-icons.css">
-    <script src="https://cdn.socket.io/4.6.0/socket.io.min.js"></script>
-    <style>
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background-color: #f8f9fa;
-            color: #333;
-            padding-top: 20px;
-        }
-        .container {
-            max-width: 900px;
-            margin: 0 auto;
-        }
-        .card {
-            border-radius: 15px;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-            margin-bottom: 20px;
-            border: none;
-        }
-        .card-header {
-            background-color: #4a6cf7;
-            color: white;
-            border-radius: 15px 15px 0 0 !important;
-            font-weight: bold;
-            padding: 15px 20px;
-        }
-        .card-body {
-            padding: 25px;
-        }
-        .btn-primary {
-            background-color: #4a6cf7;
-            border-color: #4a6cf7;
-            padding: 8px 20px;
-            border-radius: 8px;
-            font-weight: 500;
-        }
-        .btn-primary:hover {
-            background-color: #3a5ce4;
-            border-color: #3a5ce4;
-        }
-        .form-label {
-            font-weight: 500;
-            margin-bottom: 8px;
-        }
-        .progress {
-            height: 25px;
-            border-radius: 8px;
-            margin: 15px 0;
-        }
-        .video-info {
-            background-color: #f1f3f9;
-            padding: 15px;
-            border-radius: 8px;
-            margin-top: 15px;
-        }
-        .video-info-item {
-            margin-bottom: 5px;
-            display: flex;
-        }
-        .video-info-label {
-            font-weight: 500;
-            width: 180px;
-        }
-        .lang-selector {
-            float: right;
-        }
-        .loading-spinner {
-            display: none;
-            color: #4a6cf7;
-            text-align: center;
-            padding: 20px;
-        }
-        #preview-container {
-            margin-top: 20px;
-            text-align: center;
-        }
-        #video-preview {
-            max-width: 100%;
-            border-radius: 8px;
-            display: none;
-        }
-        .status-step {
-            margin: 5px 0;
-            padding: 10px;
-            border-radius: 8px;
-            background-color: #f1f3f9;
-        }
-        .status-step.active {
-            background-color: #e0e7ff;
-            border-left: 4px solid #4a6cf7;
-        }
-        .status-step.completed {
-            background-color: #e6ffee;
-            border-left: 4px solid #28a745;
-        }
-        .time-estimate {
-            font-size: 14px;
-            font-style: italic;
-            margin-top: 10px;
-        }
-        .settings-section {
-            margin-top: 15px;
-            padding-top: 15px;
-            border-top: 1px solid #dee2e6;
-        }
-        .error-message {
-            color: #dc3545;
-            background-color: #f8d7da;
-            padding: 15px;
-            border-radius: 8px;
-            margin-top: 15px;
-            display: none;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="card">
-            <div class="card-header d-flex justify-content-between align-items-center">
-                <span>{{ _('360° Video Blur Tool') }}</span>
-                <div class="dropdown lang-selector">
-                    <button class="btn btn-sm btn-light dropdown-toggle" type="button" id="langDropdown" data-bs-toggle="dropdown" aria-expanded="false">
-                        {{ current_language_name }}
-                    </button>
-                    <ul class="dropdown-menu" aria-labelledby="langDropdown">
-                        {% for code, name in supported_languages.items() %}
-                            <li><a class="dropdown-item" href="?lang={{ code }}">{{ name }}</a></li>
-                        {% endfor %}
-                    </ul>
-                </div>
-            </div>
-            <div class="card-body">
-                <div id="step-upload">
-                    <h5 class="card-title">{{ _('Upload a 360° video for automatic face and license plate blurring') }}</h5>
-                    <p class="card-text">{{ _('Select a video file (MP4 format) to process. The tool will automatically detect and blur faces and license plates.') }}</p>
-                    
-                    <form id="upload-form" method="post" enctype="multipart/form-data">
-                        <div class="mb-3">
-                            <label for="video" class="form-label">{{ _('Video file') }} (MP4)</label>
-                            <input class="form-control" type="file" id="video" name="video" accept="video/mp4">
-                        </div>
-                        
-                        <div id="preview-container">
-                            <video id="video-preview" controls></video>
-                            <div class="video-info" id="video-info" style="display:none;">
-                                <h6>{{ _('Video Information') }}</h6>
-                                <div class="video-info-item">
-                                    <span class="video-info-label">{{ _('Duration') }}:</span>
-                                    <span id="video-duration">-</span>
-                                </div>
-                                <div class="video-info-item">
-                                    <span class="video-info-label">{{ _('Resolution') }}:</span>
-                                    <span id="video-resolution">-</span>
-                                </div>
-                                <div class="video-info-item">
-                                    <span class="video-info-label">{{ _('File size') }}:</span>
-                                    <span id="video-size">-</span>
-                                </div>
-                                <div class="video-info-item">
-                                    <span class="video-info-label">{{ _('Format') }}:</span>
-                                    <span id="video-format">-</span>
-                                </div>
-                                <div class="time-estimate">
-                                    {{ _('Estimated processing time') }}: <span id="time-estimate">-</span>
-                                </div>
-                            </div>
-                        </div>
-                        
-                        <div class="settings-section">
-                            <h6>{{ _('Processing options') }}</h6>
-                            <div class="form-check mb-2">
-                                <input class="form-check-input" type="checkbox" id="debug_mode" name="debug_mode" value="1">
-                                <label class="form-check-label" for="debug_mode">
-                                    {{ _('Show detections (debug mode)') }}
-                                </label>
-                            </div>
-                            <div class="form-check mb-2">
-                                <input class="form-check-input" type="checkbox" id="use_dnn" name="use_dnn" value="1" checked>
-                                <label class="form-check-label" for="use_dnn">
-                                    {{ _('Use DNN for better detection (recommended)') }}
-                                </label>
-                            </div>
-                        </div>
-                        
-                        <div class="mt-4">
-                            <button type="submit" class="btn btn-primary" id="upload-btn">
-                                <i class="bi bi-cloud-arrow-up"></i> {{ _('Upload and process') }}
-                            </button>
-                        </div>
-                    </form>
-                </div>
-                
-                <div id="step-processing" style="display:none;">
-                    <h5 class="card-title">{{ _('Processing your video') }}...</h5>
-                    
-                    <div class="progress">
-                        <div class="progress-bar progress-bar-striped progress-bar-animated" id="progress-bar" role="progressbar" style="width: 0%"></div>
-                    </div>
-                    
-                    <div id="progress-text" class="text-center mb-3">{{ _('Starting processing') }}...</div>
-                    
-                    <div id="estimated-time-container" class="alert alert-info text-center mb-3" style="display: none;">
-                        <i class="bi bi-clock-history"></i> <strong>{{ _('Estimated time remaining') }}:</strong> <span id="estimated-time-remaining" class="fs-5">-</span>
-                        <div class="small mt-1">{{ _('This estimate is updated continuously based on processing speed') }}</div>
-                    </div>
-                    
-                    <!-- Detaljeret behandlingsinformation -->
-                    <div id="processing-details-container" class="card mt-3 mb-3" style="display: none;">
-                        <div class="card-header bg-light">
-                            <div class="d-flex justify-content-between align-items-center">
-                                <strong>{{ _('Processing Details') }}</strong>
-                                <button class="btn btn-sm btn-outline-secondary" onclick="toggleProcessingDetails()">
-                                    <i class="bi bi-arrows-expand" id="details-toggle-icon"></i>
-                                </button>
-                            </div>
-                        </div>
-                        <div id="processing-details-content" class="card-body bg-light" style="display: none; max-height: 300px; overflow-y: auto;">
-                            <div class="row mb-2">
-                                <div class="col-md-4">
-                                    <div class="card">
-                                        <div class="card-header py-1 bg-primary text-white">{{ _('CPU Utilization') }}</div>
-                                        <div class="card-body py-2" id="cpu-info">-</div>
-                                    </div>
-                                </div>
-                                <div class="col-md-4">
-                                    <div class="card">
-                                        <div class="card-header py-1 bg-primary text-white">{{ _('Processing Speed') }}</div>
-                                        <div class="card-body py-2" id="processing-speed">-</div>
-                                    </div>
-                                </div>
-                                <div class="col-md-4">
-                                    <div class="card">
-                                        <div class="card-header py-1 bg-primary text-white">{{ _('Current Batch') }}</div>
-                                        <div class="card-body py-2" id="batch-info">-</div>
-                                    </div>
-                                </div>
-                            </div>
-                            <div>
-                                <h6 class="border-bottom pb-1">{{ _('Processing Log') }}:</h6>
-                                <div id="processing-log" class="small" style="font-family: monospace; height: 160px; overflow-y: auto;"></div>
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <div class="status-steps">
-                        <div class="status-step" id="step-upload-status">
-                            <i class="bi bi-check-circle"></i> {{ _('Uploading video') }}
-                        </div>
-                        <div class="status-step" id="step-analyze">
-                            <i class="bi bi-hourglass"></i> {{ _('Analyzing video and loading detection models') }}
-                        </div>
-                        <div class="status-step" id="step-detect">
-                            <i class="bi bi-eye"></i> {{ _('Detecting faces and license plates') }}
-                        </div>
-                        <div class="status-step" id="step-blur">
-                            <i class="bi bi-person-bounding-box"></i> {{ _('Applying blur to detected objects') }}
-                        </div>
-                        <div class="status-step" id="step-finalize">
-                            <i class="bi bi-file-earmark-check"></i> {{ _('Finalizing output video') }}
-                        </div>
-                    </div>
-                    
-                    <div class="text-center mt-4 mb-4">
-                        <div class="loading-spinner" id="loading-spinner">
-                            <div class="spinner-border" role="status">
-                                <span class="visually-hidden">{{ _('Loading') }}...</span>
-                            </div>
-                            <p>{{ _('This can take several minutes depending on video length and complexity') }}</p>
-                        </div>
-                    </div>
-                    
-                    <div class="text-center">
-                        <button id="cancel-btn" class="btn btn-danger">
-                            <i class="bi bi-x-circle"></i> {{ _('Cancel processing') }}
-                        </button>
-                    </div>
-                </div>
-                
-                <div id="step-download" style="display:none;">
-                    <h5 class="card-title">{{ _('Processing complete!') }}</h5>
-                    <p class="card-text">{{ _('Your video has been processed successfully. You can now download the result.') }}</p>
-                    
-                    <div class="text-center mb-4">
-                        <div class="alert alert-success">
-                            <i class="bi bi-check-circle-fill"></i> {{ _('All detected faces and license plates have been blurred') }}
-                        </div>
-                    </div>
-                    
-                    <div class="text-center">
-                        <a id="download-link" href="#" class="btn btn-primary">
-                            <i class="bi bi-download"></i> {{ _('Download processed video') }}
-                        </a>
-                        
-                        <button id="restart-btn" class="btn btn-outline-secondary ms-2">
-                            <i class="bi bi-arrow-repeat"></i> {{ _('Process another video') }}
-                        </button>
-                    </div>
-                </div>
-                
-                <div class="error-message" id="error-message">
-                    <i class="bi bi-exclamation-triangle-fill"></i> <span id="error-text"></span>
-                </div>
-            </div>
-        </div>
-        
-        <div class="text-center text-muted mt-4">
-            <small>
-                &copy; 2025 {{ _('360° Video Blur Tool') }} | {{ _('Privacy focused video processing') }}
-            </small>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-    <script>
-        // Socket.IO setup
-        const socket = io({
-            transports: ['websocket', 'polling']
-        });
-        let jobId = {% if job_id %}"{{ job_id }}"{% else %}null{% endif %};
-        
-        // Funktion til at skifte mellem vising/skjul af detaljer
-        function toggleProcessingDetails() {
-            const detailsContent = document.getElementById('processing-details-content');
-            const detailsIcon = document.getElementById('details-toggle-icon');
-            
-            if (detailsContent.style.display === 'none') {
-                detailsContent.style.display = 'block';
-                detailsIcon.classList.remove('bi-arrows-expand');
-                detailsIcon.classList.add('bi-arrows-collapse');
-            } else {
-                detailsContent.style.display = 'none';
-                detailsIcon.classList.remove('bi-arrows-collapse');
-                detailsIcon.classList.add('bi-arrows-expand');
-            }
-        }
-        
-        // Funktion til at tilføje en log-linje til processing-log
-        function addProcessingLogEntry(message) {
-            const logElement = document.getElementById('processing-log');
-            if (logElement) {
-                const timestamp = new Date().toLocaleTimeString();
-                const logLine = document.createElement('div');
-                logLine.textContent = `[${timestamp}] ${message}`;
-                logElement.appendChild(logLine);
-                
-                // Auto-scroll til bunden
-                logElement.scrollTop = logElement.scrollHeight;
-            }
-        }
-        
-        // Hvis der er et aktivt job, vis processeringsskærmen
-        document.addEventListener('DOMContentLoaded', function() {
-            if (jobId) {
-                // Vis korrekt UI baseret på job status
-                const jobStatus = "{{ job_status }}";
-                
-                if (jobStatus === 'processing' || jobStatus === 'uploading') {
-                    document.getElementById('step-upload').style.display = 'none';
-                    document.getElementById('step-processing').style.display = 'block';
-                    document.getElementById('loading-spinner').style.display = 'block';
-                    
-                    // Gem job ID i skjult input
-                    const jobIdInput = document.createElement('input');
-                    jobIdInput.type = 'hidden';
-                    jobIdInput.id = 'job-id-input';
-                    jobIdInput.value = jobId;
-                    document.body.appendChild(jobIdInput);
-                    
-                    // Opret permalink sektion
-                    const permalinkSection = document.createElement('div');
-                    permalinkSection.id = 'permalink-section';
-                    permalinkSection.className = 'alert alert-info mt-3';
-                    permalinkSection.innerHTML = `
-                        <strong>{{ _('Permanent link to this job') }}:</strong>
-                        <div class="input-group mt-2">
-                            <input type="text" class="form-control" id="permalink-input" value="${window.location.href}" readonly>
-                            <button class="btn btn-outline-secondary" type="button" onclick="copyPermalink()">
-                                <i class="bi bi-clipboard"></i> {{ _('Copy') }}
-                            </button>
-                        </div>
-                        <small class="text-muted">{{ _('Save this link to check job status later') }}</small>
-                    `;
-                    
-                    // Tilføj til DOM efter progress bar
-                    const progressContainer = document.querySelector('.progress').parentNode;
-                    progressContainer.appendChild(permalinkSection);
-                    
-                    // Tilføj copy funktion
-                    window.copyPermalink = function() {
-                        const permalinkInput = document.getElementById('permalink-input');
-                        permalinkInput.select();
-                        document.execCommand('copy');
-                        alert('{{ _("Link copied to clipboard!") }}');
-                    };
-                    
-                    // Start at lytte efter opdateringer for dette job
-                    setupJobListeners();
-                    
-                    // Anmod om den aktuelle status
-                    fetch('/status/' + jobId)
-                        .then(response => response.json())
-                        .then(data => {
-                            console.log("INITIAL STATUS DATA:", JSON.stringify(data));
-                            updateProgress(data.progress, data.message);
-                            
-                            // Consistent approach for FPS handling
-                            if (data.fps) {
-                                console.log("INITIAL FPS DATA FOUND!", data.fps);
-                                
-                                // Validate FPS data has the expected structure
-                                if (data.fps.batch && data.fps.avg) {
-                                    document.querySelectorAll('#processing-speed').forEach(function(element) {
-                                        element.innerHTML = `${data.fps.batch} FPS (current)<br>${data.fps.avg} FPS (average)`;
-                                        console.log("INITIAL FPS UPDATE COMPLETE!");
-                                    });
-                                    
-                                    addProcessingLogEntry(`Initial processing rate: ${data.fps.batch} FPS`);
-                                } else {
-                                    console.error("Initial FPS data structure is invalid:", data.fps);
-                                }
-                            } else {
-                                console.log("No initial FPS data available yet");
-                                document.querySelectorAll('#processing-speed').forEach(function(element) {
-                                    element.innerText = "Calculating...";
-                                });
-                            }
-                            
-                            if (data.batch) {
-                                const batchInfo = document.getElementById('batch-info');
-                                if (batchInfo) {
-                                    batchInfo.innerHTML = `Batch <strong>${data.batch.current}</strong> of ${data.batch.total}<br>Size: ${data.batch.size} frames`;
-                                }
-                            }
-                            
-                            // Vis CPU info hvis tilgængelig (kommer fra en anden kilde, men tjek alligevel)
-                            const cpuInfo = document.getElementById('cpu-info');
-                            if (cpuInfo && cpuInfo.textContent === '-') {
-                                // Hvis CPU info ikke er sat endnu, tilføj en placeholder
-                                cpuInfo.innerHTML = 'Detecting cores...';
-                            }
-                            
-                            // Vis processing details container og sørg for det er åbent
-                            document.getElementById('processing-details-container').style.display = 'block';
-                            document.getElementById('processing-details-content').style.display = 'block';
-                            
-                            // Skift ikon til collapse
-                            const icon = document.getElementById('details-toggle-icon');
-                            if (icon) {
-                                icon.classList.remove('bi-arrows-expand');
-                                icon.classList.add('bi-arrows-collapse');
-                            }
-                        })
-                        .catch(error => {
-                            console.error('Error fetching status:', error);
-                        });
-                } else if (jobStatus === 'completed') {
-                    document.getElementById('step-upload').style.display = 'none';
-                    document.getElementById('step-processing').style.display = 'none';
-                    document.getElementById('step-download').style.display = 'block';
-                    
-                    const downloadLink = document.getElementById('download-link');
-                    downloadLink.href = '/download/' + jobId;
-                } else if (jobStatus === 'error' || jobStatus === 'cancelled') {
-                    document.getElementById('error-text').textContent = "{{ _('This job has been cancelled or encountered an error') }}";
-                    document.getElementById('error-message').style.display = 'block';
-                }
-            }
-        });
-        
-        // Funktion til at opsætte lyttere til Socket.IO-events
-        function setupJobListeners() {
-            // Lokal variabel til at holde styr på vores status interval
-            let statusUpdateInterval = null;
-            
-            // Listen for progress updates
-            socket.on('progress_update', function(data) {
-                if (data.job_id !== jobId) return;
-                
-                updateProgress(data.progress, data.message);
-                updateStepStatus(data.step, 'active');
-                
-                if (data.prev_step) {
-                    updateStepStatus(data.prev_step, 'completed');
-                }
-                
-                // Handle FPS update directly in the progress_update event
-                if (data.fps || data.fps_update) {
-                    console.log("FPS UPDATE DETECTED IN PROGRESS EVENT:", data.fps);
-                    
-                    // Ensure FPS data is properly structured before updating
-                    if (data.fps && data.fps.batch && data.fps.avg) {
-                        document.querySelectorAll('#processing-speed').forEach(function(element) {
-                            element.innerHTML = `${data.fps.batch} FPS (current)<br>${data.fps.avg} FPS (average)`;
-                            console.log("FPS DISPLAY UPDATED FROM PROGRESS EVENT");
-                        });
-                        addProcessingLogEntry(`Processing rate updated: ${data.fps.batch} FPS (current batch)`);
-                    } else {
-                        console.error("FPS update event received but data structure is invalid:", data.fps);
-                    }
-                }
-                
-                // Hvis vi ikke har en status-interval endnu, opret en
-                if (!statusUpdateInterval) {
-                    // Opdater detaljeret status hvert 3. sekund
-                    statusUpdateInterval = setInterval(function() {
-                        // Hent opdateret status fra server
-                        fetch('/status/' + jobId)
-                            .then(response => response.json())
-                            .then(data => {
-                                console.log("Status update received:", data);
-                                
-                                // SUPER ENKEL DIREKTE OPDATERING - Rydde alt andet væk
-                                console.log("RAW STATUS DATA:", JSON.stringify(data));
-                                
-                                // Simplified direct update approach
-                                if (data.fps) {
-                                    console.log("FPS DATA FOUND IN POLL!", data.fps);
-                                    
-                                    // Validate FPS data has the expected structure
-                                    if (data.fps.batch && data.fps.avg) {
-                                        // Directly update all processing-speed elements
-                                        document.querySelectorAll('#processing-speed').forEach(function(element) {
-                                            element.innerHTML = `${data.fps.batch} FPS (current)<br>${data.fps.avg} FPS (average)`;
-                                            console.log("FPS DISPLAY UPDATED FROM STATUS POLL");
-                                        });
-                                        
-                                        // Log til debugkonsollet
-                                        addProcessingLogEntry(`Processing rate: ${data.fps.batch} FPS (current batch)`);
-                                    } else {
-                                        console.error("FPS data structure from poll is invalid:", data.fps);
-                                    }
-                                } else {
-                                    console.log("No FPS data in status poll");
-                                    // We'll wait for a proper FPS update instead of trying to extract it
-                                }
-                                
-                                if (data.batch) {
-                                    const batchInfo = document.getElementById('batch-info');
-                                    if (batchInfo) {
-                                        batchInfo.innerHTML = `Batch <strong>${data.batch.current}</strong> of ${data.batch.total}<br>Size: ${data.batch.size} frames`;
-                                    }
-                                }
-                                
-                                // Opdater også tid-estimat
-                                if (data.time && data.time.message) {
-                                    const estimatedTimeElement = document.getElementById('estimated-time-remaining');
-                                    if (estimatedTimeElement) {
-                                        // Udtræk tid fra meddelelsen
-                                        if (data.time.message.includes("min")) {
-                                            const match = data.time.message.match(/(\\d+) min (\\d+) sec/);
-                                            if (match) {
-                                                estimatedTimeElement.textContent = `${match[1]} min ${match[2]} sec`;
-                                            }
-                                        } else {
-                                            const match = data.time.message.match(/(\\d+) sec/);
-                                            if (match) {
-                                                estimatedTimeElement.textContent = `${match[1]} sec`;
-                                            }
-                                        }
-                                        
-                                        // Sørg for at containeren er synlig
-                                        document.getElementById('estimated-time-container').style.display = 'block';
-                                    }
-                                }
-                            })
-                            .catch(error => {
-                                console.error('Error fetching status update:', error);
-                            });
-                    }, 3000);
-                }
-            });
-            
-            // Lyt efter CPU info
-            socket.on('worker_cpu_info', function(data) {
-                if (data.job_id !== jobId) return;
-                
-                console.log("CPU info received:", data);
-                try {
-                    // Sikre os at DOM-elementet eksisterer
-                    const cpuInfo = document.getElementById('cpu-info');
-                    console.log("CPU info element:", cpuInfo);
-                    
-                    if (cpuInfo) {
-                        // Simpel test af DOM-opdatering
-                        cpuInfo.textContent = "Testing update...";
-                        console.log("Test update of CPU info successful");
-                        
-                        // Opdater med de reelle data
-                        cpuInfo.innerHTML = `<strong>${data.used_cores}</strong> of ${data.total_cores} cores (${data.percentage})`;
-                        addProcessingLogEntry(`CPU utilization: ${data.used_cores} of ${data.total_cores} cores (${data.percentage})`);
-                        
-                        // Log til konsol for at bekræfte
-                        console.log("Updated CPU info to:", cpuInfo.innerHTML);
-                    } else {
-                        console.error("CPU info element not found in DOM!");
-                        
-                        // Forsøg at finde overordnet element og oprette det
-                        setTimeout(function() {
-                            const container = document.querySelector('.card-body');
-                            if (container) {
-                                console.log("Found container, recreating CPU info element");
-                                const newCpuInfo = document.createElement('div');
-                                newCpuInfo.id = 'cpu-info';
-                                newCpuInfo.innerHTML = `<strong>${data.used_cores}</strong> of ${data.total_cores} cores (${data.percentage})`;
-                                container.appendChild(newCpuInfo);
-                            }
-                        }, 500);
-                    }
-                } catch (error) {
-                    console.error("Error updating CPU info:", error);
-                }
-                
-                // Sørg for at processing details container er synlig
-                document.getElementById('processing-details-container').style.display = 'block';
-                
-                // Vis også detaljernes indhold automatisk
-                const detailsContent = document.getElementById('processing-details-content');
-                const detailsIcon = document.getElementById('details-toggle-icon');
-                if (detailsContent && detailsContent.style.display === 'none') {
-                    detailsContent.style.display = 'block';
-                    if (detailsIcon) {
-                        detailsIcon.classList.remove('bi-arrows-expand');
-                        detailsIcon.classList.add('bi-arrows-collapse');
-                    }
-                }
-            });
-            
-            // Vi bruger ikke længere denne metode til at opdatere FPS info,
-            // da vi i stedet bruger status-polling
-            
-            // Listen for job completion
-            socket.on('job_complete', function(data) {
-                if (data.job_id !== jobId) return;
-                
-                // Stop status update interval hvis den kører
-                if (statusUpdateInterval) {
-                    clearInterval(statusUpdateInterval);
-                    statusUpdateInterval = null;
-                }
-                
-                document.getElementById('step-processing').style.display = 'none';
-                document.getElementById('step-download').style.display = 'block';
-                
-                const downloadLink = document.getElementById('download-link');
-                downloadLink.href = data.download_url;
-                
-                // Tilføj den endelige tid til loggen
-                if (data.processing_time) {
-                    const totalSeconds = Math.round(data.processing_time);
-                    const minutes = Math.floor(totalSeconds / 60);
-                    const seconds = totalSeconds % 60;
-                    const timeMessage = minutes > 0 ? 
-                        `${minutes} min ${seconds} sec` : `${seconds} sec`;
-                    
-                    addProcessingLogEntry(`Processing completed in ${timeMessage}`);
-                }
-            });
-            
-            // Handle errors
-            socket.on('job_error', function(data) {
-                if (data.job_id !== jobId) return;
-                showError(data.error);
-            });
-        }
-        
-        // File input change handler
-        document.getElementById('video').addEventListener('change', function(e) {
-            const file = e.target.files[0];
-            if (!file) return;
-            
-            // Show preview
-            const video = document.getElementById('video-preview');
-            video.src = URL.createObjectURL(file);
-            video.style.display = 'block';
-            
-            // Load video metadata
-            video.onloadedmetadata = function() {
-                document.getElementById('video-info').style.display = 'block';
-                
-                // Show video information
-                document.getElementById('video-duration').textContent = formatTime(video.duration);
-                document.getElementById('video-resolution').textContent = `${video.videoWidth} × ${video.videoHeight}`;
-                document.getElementById('video-size').textContent = formatSize(file.size);
-                document.getElementById('video-format').textContent = file.type;
-                
-                // Calculate estimated processing time
-                const estimatedSeconds = Math.round(video.duration * 1.5); // Rough estimate: 1.5x real-time
-                document.getElementById('time-estimate').textContent = formatTime(estimatedSeconds);
-            };
-        });
-        
-        // Form submission
-        document.getElementById('upload-form').addEventListener('submit', function(e) {
-            e.preventDefault();
-            
-            const videoFile = document.getElementById('video').files[0];
-            if (!videoFile) {
-                showError("{{ _('Please select a video file') }}");
-                return;
-            }
-            
-            // Create FormData
-            const formData = new FormData();
-            formData.append('video', videoFile);
-            
-            // Add options
-            if (document.getElementById('debug_mode').checked) {
-                formData.append('debug_mode', '1');
-            }
-            
-            if (document.getElementById('use_dnn').checked) {
-                formData.append('use_dnn', '1');
-            }
-            
-            // Show processing UI
-            document.getElementById('step-upload').style.display = 'none';
-            document.getElementById('step-processing').style.display = 'block';
-            document.getElementById('loading-spinner').style.display = 'block';
-            
-            // Update initial status
-            updateStepStatus('step-upload-status', 'active');
-            
-            // Submit the form
-            fetch('/upload', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.error) {
-                    showError(data.error);
-                    return;
-                }
-                
-                jobId = data.job_id;
-                console.log('Processing started with job ID:', jobId);
-                
-                // Opsæt Socket.IO lyttere
-                setupJobListeners();
-                
-                // Handle job cancellation
-                document.getElementById('cancel-btn').addEventListener('click', function() {
-                    if (!jobId) return;
-                    
-                    if (confirm('{{ _("Are you sure you want to cancel processing? This cannot be undone.") }}')) {
-                        fetch('/cancel/' + jobId, { method: 'POST' })
-                            .then(response => response.json())
-                            .then(data => {
-                                if (data.success) {
-                                    document.getElementById('step-processing').style.display = 'none';
-                                    document.getElementById('step-upload').style.display = 'block';
-                                    document.getElementById('upload-form').reset();
-                                    document.getElementById('video-preview').style.display = 'none';
-                                    document.getElementById('video-info').style.display = 'none';
-                                } else {
-                                    showError(data.error || '{{ _("Failed to cancel processing") }}');
-                                }
-                            })
-                            .catch(error => {
-                                showError('{{ _("Error cancelling process") }}: ' + error.message);
-                            });
-                    }
-                });
-            })
-            .catch(error => {
-                showError("{{ _('An error occurred during upload') }}: " + error.message);
-            });
-        });
-        
-        // Restart button
-        document.getElementById('restart-btn').addEventListener('click', function() {
-            document.getElementById('step-download').style.display = 'none';
-            document.getElementById('step-upload').style.display = 'block';
-            document.getElementById('upload-form').reset();
-            document.getElementById('video-preview').style.display = 'none';
-            document.getElementById('video-info').style.display = 'none';
-            
-            // Reset progress and steps
-            updateProgress(0, "{{ _('Starting processing') }}...");
-            document.querySelectorAll('.status-step').forEach(el => {
-                el.classList.remove('active', 'completed');
-            });
-        });
-        
-        // Utility functions
-        function updateProgress(percent, message) {
-            document.getElementById('progress-bar').style.width = percent + '%';
-            document.getElementById('progress-bar').setAttribute('aria-valuenow', percent);
-            document.getElementById('progress-text').textContent = message;
-            
-            // Gemmer job ID i en skjult input, så vi kan bruge det til permalink
-            if (jobId && !document.getElementById('job-id-input')) {
-                const jobIdInput = document.createElement('input');
-                jobIdInput.type = 'hidden';
-                jobIdInput.id = 'job-id-input';
-                jobIdInput.value = jobId;
-                document.body.appendChild(jobIdInput);
-                
-                // Opdater URL med job_id for at lave et permalink
-                const url = new URL(window.location.href);
-                url.searchParams.set('job_id', jobId);
-                window.history.replaceState({}, '', url.toString());
-                
-                // Vis permalink section hvis den eksisterer
-                if (!document.getElementById('permalink-section')) {
-                    // Opret permalink section
-                    const permalinkSection = document.createElement('div');
-                    permalinkSection.id = 'permalink-section';
-                    permalinkSection.className = 'alert alert-info mt-3';
-                    permalinkSection.innerHTML = `
-                        <strong>{{ _('Permanent link to this job') }}:</strong>
-                        <div class="input-group mt-2">
-                            <input type="text" class="form-control" id="permalink-input" value="${url.toString()}" readonly>
-                            <button class="btn btn-outline-secondary" type="button" onclick="copyPermalink()">
-                                <i class="bi bi-clipboard"></i> {{ _('Copy') }}
-                            </button>
-                        </div>
-                        <small class="text-muted">{{ _('Save this link to check job status later') }}</small>
-                    `;
-                    
-                    // Tilføj til DOM efter progress bar
-                    const progressContainer = document.querySelector('.progress').parentNode;
-                    progressContainer.appendChild(permalinkSection);
-                    
-                    // Tilføj copy funktion
-                    window.copyPermalink = function() {
-                        const permalinkInput = document.getElementById('permalink-input');
-                        permalinkInput.select();
-                        document.execCommand('copy');
-                        alert('{{ _("Link copied to clipboard!") }}');
-                    };
-                }
-            }
-            
-            // Vis detaljevisningen når vi får den første progress update
-            document.getElementById('processing-details-container').style.display = 'block';
-            
-            // Vis også detaljernes indhold automatisk for første progress update
-            if (!window.detailsShown) {
-                window.detailsShown = true;
-                const detailsContent = document.getElementById('processing-details-content');
-                const detailsIcon = document.getElementById('details-toggle-icon');
-                if (detailsContent && detailsContent.style.display === 'none') {
-                    detailsContent.style.display = 'block';
-                    if (detailsIcon) {
-                        detailsIcon.classList.remove('bi-arrows-expand');
-                        detailsIcon.classList.add('bi-arrows-collapse');
-                    }
-                }
-            }
-            
-            // Add the message to the processing log
-            addProcessingLogEntry(message);
-            
-            // Check if message contains time information and extract it
-            const timeRegex = /(\\d+) min (\\d+) sec remaining|(\\d+) sec remaining/;
-            const timeMatch = message.match(timeRegex);
-            
-            // For debugging
-            console.log("Message:", message);
-            console.log("Time match:", timeMatch);
-            
-            // We now use structured FPS data directly so we don't
-            // need to extract it from messages anymore
-            
-            // Extract batch information if available
-            const batchRegex = /Processing frames (\\d+)-(\\d+) of (\\d+)/;
-            const batchMatch = message.match(batchRegex);
-            if (batchMatch) {
-                const batchInfo = document.getElementById('batch-info');
-                if (batchInfo) {
-                    const startFrame = batchMatch[1];
-                    const endFrame = batchMatch[2];
-                    const totalFrames = batchMatch[3];
-                    const batchSize = parseInt(endFrame) - parseInt(startFrame) + 1;
-                    batchInfo.textContent = `Frames ${startFrame}-${endFrame} (${batchSize} frames)`;
-                }
-            }
-            
-            if (timeMatch) {
-                // Update the estimated time element if it exists
-                const estimatedTimeElement = document.getElementById('estimated-time-remaining');
-                if (estimatedTimeElement) {
-                    if (timeMatch[1] && timeMatch[2]) {
-                        estimatedTimeElement.textContent = `${timeMatch[1]} min ${timeMatch[2]} sec`;
-                    } else if (timeMatch[3]) {
-                        estimatedTimeElement.textContent = `${timeMatch[3]} sec`;
-                    }
-                    
-                    // Make sure the container is visible
-                    const estimatedTimeContainer = document.getElementById('estimated-time-container');
-                    if (estimatedTimeContainer) {
-                        estimatedTimeContainer.style.display = 'block';
-                    }
-                }
-            } else {
-                // Fall back to manually checking for "remaining" text anywhere in the message
-                if (message.includes("remaining")) {
-                    const parts = message.split("remaining")[0].trim().split(" ");
-                    let timeText = "";
-                    
-                    // Try to extract time based on pattern
-                    for (let i = parts.length-1; i >= 0; i--) {
-                        if (parts[i] === "min" && i > 0 && !isNaN(parts[i-1])) {
-                            timeText = parts[i-1] + " min";
-                            if (i+1 < parts.length && !isNaN(parts[i+1]) && parts[i+2] === "sec") {
-                                timeText += " " + parts[i+1] + " sec";
-                            }
-                            break;
-                        } else if (parts[i] === "sec" && i > 0 && !isNaN(parts[i-1])) {
-                            timeText = parts[i-1] + " sec";
-                            break;
-                        }
-                    }
-                    
-                    if (timeText) {
-                        const estimatedTimeElement = document.getElementById('estimated-time-remaining');
-                        if (estimatedTimeElement) {
-                            estimatedTimeElement.textContent = timeText;
-                            
-                            // Make sure the container is visible
-                            const estimatedTimeContainer = document.getElementById('estimated-time-container');
-                            if (estimatedTimeContainer) {
-                                estimatedTimeContainer.style.display = 'block';
-                            }
-                        }
-                    }
-                }
-            }
-        }
-        
-        function updateStepStatus(stepId, status) {
-            const el = document.getElementById(stepId);
-            if (!el) return;
-            
-            el.classList.remove('active', 'completed');
-            el.classList.add(status);
-        }
-        
-        function showError(message) {
-            document.getElementById('error-text').textContent = message;
-            document.getElementById('error-message').style.display = 'block';
-            document.getElementById('step-processing').style.display = 'none';
-            document.getElementById('step-upload').style.display = 'block';
-            document.getElementById('loading-spinner').style.display = 'none';
-        }
-        
-        function formatTime(seconds) {
-            const hrs = Math.floor(seconds / 3600);
-            const mins = Math.floor((seconds % 3600) / 60);
-            const secs = Math.floor(seconds % 60);
-            
-            let result = '';
-            if (hrs > 0) {
-                result += `${hrs}h `;
-            }
-            if (mins > 0 || hrs > 0) {
-                result += `${mins}m `;
-            }
-            result += `${secs}s`;
-            
-            return result;
-        }
-        
-        function formatSize(bytes) {
-            const sizes = ['Bytes', 'KB', 'MB', 'GB', 'TB'];
-            if (bytes === 0) return '0 Bytes';
-            const i = Math.floor(Math.log(bytes) / Math.log(1024));
-            return parseFloat((bytes / Math.pow(1024, i)).toFixed(2)) + ' ' + sizes[i];
-        }
-    </script>
-</body>
-</html>
-"""
+
+def start_trackers(frame: np.ndarray, boxes: np.ndarray, trackers: list, tracked_objects: list, label: str,
+                   type_id: int, reusable: list = None, reuse_iou: float = 0.5, scale: float = 1.0) -> None:
+    """
+    Sørger for en tracker pr. boks i `boxes` ((N,4) array med (x, y, w, h)).
+    Trackerne og deres startbokse (x, y, w, h, type_id) tilføjes `trackers` og `tracked_objects`.
+    `frame` er trackernes frame fra tracker_input med samme `scale` - boksene er i den
+    fulde frames koordinater og skaleres kun ved initialiseringen.
+
+    `reusable` er en liste af (tracker, boks) for trackere der stadig følger et objekt.
+    En detektion der overlapper en af dem med IoU over `reuse_iou` overtager den
+    tracker i stedet for at oprette og initialisere en ny. Brugte trackere fjernes
+    fra listen, så hver tracker højst genbruges én gang.
+    """
+    for x, y, w, h in boxes.tolist():
+        if reusable:
+            ious = box_iou_matrix([(x, y, w, h)], [box for _, box in reusable])[0]
+            best = int(np.argmax(ious))
+            if ious[best] > reuse_iou:
+                tracker, _ = reusable.pop(best)
+                trackers.append(tracker)
+                tracked_objects.append((x, y, w, h, type_id))
+                continue
+        try:
+            tracker = create_tracker()
+            if tracker is not None:
+                tracker.init(frame, (int(x * scale), int(y * scale), max(1, int(w * scale)), max(1, int(h * scale))))
+                trackers.append(tracker)
+                tracked_objects.append((x, y, w, h, type_id))
+            else:
+                logger.warning("Could not create tracker for %s at (%d,%d), size %dx%d", label, x, y, w, h)
+        except Exception as e:
+            logger.error("Error creating tracker for %s: %s", label, e)
+
+
+# Renderet forside (uden job) pr. (sprog, url_root). Template og oversættelser ændrer sig
+# ikke mens serveren kører, så siden genbruges indtil genstart - i debug mode kun i
+# PAGE_CACHE_TIMEOUT sekunder, så ændringer i templaten stadig slår igennem
+PAGE_CACHE_TIMEOUT = 60 if SETTINGS.debug else None
+_page_cache = {}
 
 @app.route('/')
 def index():
@@ -1359,51 +1013,52 @@ def index():
         # Tjek om jobbet findes i processing_jobs
         if job_id in processing_jobs:
             job_exists = True
-            job_status = processing_jobs[job_id].get('status', 'unknown')
+            job_status = processing_jobs[job_id].status
         else:
             # Tjek om der findes en status-fil for jobbet
-            status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
-            if os.path.exists(status_file):
-                try:
-                    with open(status_file, 'r') as f:
-                        status_data = json.load(f)
-                        job_exists = True
-                        job_status = status_data.get('status', 'unknown')
+            try:
+                status_data = load_status_file(job_id)
+                if status_data is not None:
+                    job_exists = True
+                    job_status = status_data.get('status', 'unknown')
+                    
+                    # Genopret job i processing_jobs dictionary hvis det er aktivt
+                    if job_status in ['processing', 'uploading']:
+                        # Tjek om outputfilen findes
+                        output_path = os.path.join(PROCESSED_FOLDER, f"{job_id}.mp4")
+                        input_path = os.path.join(UPLOAD_FOLDER, f"{job_id}.mp4")
                         
-                        # Genopret job i processing_jobs dictionary hvis det er aktivt
-                        if job_status in ['processing', 'uploading']:
-                            # Tjek om outputfilen findes
-                            output_path = os.path.join(PROCESSED_FOLDER, f"{job_id}.mp4")
-                            input_path = os.path.join(UPLOAD_FOLDER, f"{job_id}.mp4")
+                        if os.path.exists(input_path):
+                            # Genopret job info
+                            processing_jobs[job_id] = JobState(
+                                input_path=input_path,
+                                output_path=output_path,
+                                debug_mode=False,  # Default value
+                                use_dnn=True,      # Default value
+                                start_time=status_data.get('timestamp', time.time() - 60),  # Antag det har kørt i mindst et minut
+                                status=status_data.get('status', 'processing'),
+                                progress=status_data.get('progress', 0),
+                                message=status_data.get('message', ''),
+                                details={field: status_data[field] for field in STATUS_DETAIL_FIELDS if field in status_data}
+                            )
                             
-                            if os.path.exists(input_path):
-                                # Genopret job info
-                                processing_jobs[job_id] = {
-                                    'input_path': input_path,
-                                    'output_path': output_path,
-                                    'debug_mode': False,  # Default value
-                                    'use_dnn': True,      # Default value
-                                    'start_time': status_data.get('timestamp', time.time() - 60),  # Antag det har kørt i mindst et minut
-                                    'status': status_data.get('status', 'processing'),
-                                    'progress': status_data.get('progress', 0),
-                                    'message': status_data.get('message', '')
-                                }
-                                
-                                # Start en monitoreringsstråd
-                                monitoring_thread = threading.Thread(
-                                    target=monitor_worker_status,
-                                    args=(job_id,)
-                                )
-                                monitoring_thread.daemon = True
-                                monitoring_thread.start()
-                                
-                                logger.info(f"Resumed monitoring for job {job_id}")
-                except Exception as e:
-                    logger.error(f"Error reading status file for job {job_id}: {e}")
+                            # Start overvågning (status-filen læses ved ændringer)
+                            monitor_worker_status(job_id)
+                            
+                            logger.info(f"Resumed monitoring for job {job_id}")
+            except Exception as e:
+                logger.error(f"Error reading status file for job {job_id}: {e}")
+    
+    # Forsiden uden job er ens for alle med samme sprog - genbrug den renderede side
+    cache_key = (current_lang, request.url_root)
+    if not job_exists:
+        cached = _page_cache.get(cache_key)
+        if cached and (PAGE_CACHE_TIMEOUT is None or time.time() - cached[0] < PAGE_CACHE_TIMEOUT):
+            return cached[1]
     
     # Render template med sprog-variabler og job info
-    return render_template_string(
-        BASE_TEMPLATE,
+    page = render_template(
+        'base.html',
         lang=current_lang,
         current_language_name=current_language_name,
         supported_languages=app.config['SUPPORTED_LANGUAGES'],
@@ -1411,6 +1066,10 @@ def index():
         job_status=job_status,
         current_url=request.url_root
     )
+    
+    if not job_exists:
+        _page_cache[cache_key] = (time.time(), page)
+    return page
 
 @app.route('/upload', methods=['POST'])
 def upload_video():
@@ -1431,7 +1090,7 @@ def upload_video():
         # Save file
         filename = f"{job_id}.mp4"
         filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        save_upload(file, filepath)
         
         # Get processing options
         debug_mode = 'debug_mode' in request.form
@@ -1441,14 +1100,13 @@ def upload_video():
         output_path = os.path.join(PROCESSED_FOLDER, filename)
         
         # Store job information
-        processing_jobs[job_id] = {
-            'input_path': filepath,
-            'output_path': output_path,
-            'debug_mode': debug_mode,
-            'use_dnn': use_dnn,
-            'start_time': time.time(),
-            'status': 'uploading'
-        }
+        job = JobState(
+            input_path=filepath,
+            output_path=output_path,
+            debug_mode=debug_mode,
+            use_dnn=use_dnn
+        )
+        processing_jobs[job_id] = job
         
         # Start background worker process
         try:
@@ -1475,90 +1133,20 @@ def upload_video():
             worker_process = subprocess.Popen(
                 cmd, 
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            # Start en tråd til at overvåge worker-processens stdout/stderr
-            def monitor_worker_output(process):
-                """Læser output fra worker-processen og logger det til webappens log"""
-                for line in iter(process.stdout.readline, ''):
-                    if line:
-                        line = line.strip()
-                        if "CPU UTILIZATION" in line or "Running with" in line:
-                            # Fremhæv CPU-information
-                            logger.info(f"WORKER CPU INFO: {line}")
-                            print(f"\n\033[1;32m>>> {line} <<<\033[0m\n")  # Grøn fed tekst i terminal
-                            
-                            # Find CPU-informationen og send til klienten via Socket.IO
-                            if "Running with" in line:
-                                # Udtræk CPU-info
-                                cpu_match = re.search(r"Running with (\d+) parallel processes \(of (\d+) available cores\)", line)
-                                if cpu_match:
-                                    used_cores = cpu_match.group(1)
-                                    total_cores = cpu_match.group(2)
-                                    
-                                    # Send til klienten
-                                    socketio.emit('worker_cpu_info', {
-                                        'job_id': job_id,
-                                        'used_cores': used_cores,
-                                        'total_cores': total_cores,
-                                        'percentage': f"{int(int(used_cores) / int(total_cores) * 100)}%"
-                                    })
-                        elif "Processing rate:" in line:
-                            # Fremhæv FPS-information
-                            logger.info(f"WORKER SPEED INFO: {line}")
-                            
-                            # Udtræk FPS-info
-                            fps_match = re.search(r"Processing rate: ([0-9.]+) FPS \(batch\), ([0-9.]+) FPS \(avg\), ([0-9.]+) FPS \(weighted\)", line)
-                            if fps_match:
-                                batch_fps = fps_match.group(1)
-                                avg_fps = fps_match.group(2)
-                                weighted_fps = fps_match.group(3)
-                                
-                                # Send til klienten via en standard progress_update event så vi sikrer konsistent håndtering
-                                socketio.emit('progress_update', {
-                                    'job_id': job_id,
-                                    'fps': {
-                                        'batch': batch_fps,
-                                        'avg': avg_fps,
-                                        'weighted': weighted_fps
-                                    },
-                                    'fps_update': True
-                                })
-                        elif "ERROR" in line.upper():
-                            # Log fejl
-                            logger.error(f"WORKER: {line}")
-                        else:
-                            # Log almindelige beskeder
-                            logger.info(f"WORKER: {line}")
-                
-                # Tjek også stderr
-                for line in iter(process.stderr.readline, ''):
-                    if line:
-                        logger.error(f"WORKER ERROR: {line.strip()}")
-            
-            # Start tråden
-            worker_output_thread = threading.Thread(
-                target=monitor_worker_output,
-                args=(worker_process,)
+                stderr=subprocess.STDOUT
             )
-            worker_output_thread.daemon = True
-            worker_output_thread.start()
             
-            # Start a thread to monitor the status file
-            monitoring_thread = threading.Thread(
-                target=monitor_worker_status,
-                args=(job_id,)
-            )
-            monitoring_thread.daemon = True
-            monitoring_thread.start()
+            # Status fra worker kommer direkte via stdout - registrér før læsningen starter
+            _register_monitor(job_id, channel=True)
+            
+            # Sættes før overvågningen starter, så en hurtig slutstatus ikke overskrives
+            job.update(worker_pid=worker_process.pid, status='processing')
+            
+            # Output og status læses af den fælles pipe-læser
+            watch_worker_pipes(job_id, worker_process)
+            monitor_worker_status(job_id)
             
             logger.info(f"Started worker process for job {job_id}")
-            processing_jobs[job_id]['worker_pid'] = worker_process.pid
-            processing_jobs[job_id]['status'] = 'processing'
             
             return jsonify({
                 'success': True,
@@ -1581,70 +1169,85 @@ def download_video(job_id):
     
     job = processing_jobs[job_id]
     
-    # Tjek status-filen fra worker processen for at være sikker på, at jobbet er færdigt
-    status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                status_data = json.load(f)
-                
-                # Hvis status-filen siger, jobbet ikke er fuldført endnu
-                if status_data.get('status') != 'completed':
-                    return jsonify({'error': _('Processing not yet complete (according to worker status)')}), 400
-        except Exception as e:
-            logger.error(f"Error reading status file for job {job_id}: {e}")
-    
-    # Tjek også job status i memory
-    if job['status'] != 'completed':
+    # Jobbets status i memory opdateres med hver status fra worker
+    if job.status != 'completed':
         return jsonify({'error': _('Processing not yet complete')}), 400
     
-    # Tjek at output-filen faktisk findes
-    if not os.path.exists(job['output_path']):
-        return jsonify({'error': _('Output file not found - processing may have failed')}), 404
+    filename = os.path.basename(job.output_path)
+    download_name = f"blurred_{os.path.basename(job.input_path)}"
     
-    return send_file(
-        job['output_path'],
-        as_attachment=True,
-        download_name=f"blurred_{os.path.basename(job['input_path'])}"
-    )
+    # Bag nginx: nginx sender selv filen fra en internal location (X-Accel-Redirect)
+    if SETTINGS.x_accel_redirect:
+        if not os.path.isfile(job.output_path):
+            return jsonify({'error': _('Output file not found - processing may have failed')}), 404
+        response = Response(mimetype='video/mp4')
+        response.headers['X-Accel-Redirect'] = f"{SETTINGS.x_accel_redirect.rstrip('/')}/{quote(filename)}"
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        return response
+    
+    # conditional/etag giver Range-requests (genoptagne downloads) og 304-svar; filen
+    # sendes via serverens wsgi.file_wrapper (sendfile) eller X-Sendfile når det er slået til.
+    # send_from_directory stat'er selv filen - mangler den, er behandlingen fejlet
+    try:
+        return send_from_directory(
+            os.path.abspath(PROCESSED_FOLDER),
+            filename,
+            as_attachment=True,
+            download_name=download_name,
+            conditional=True,
+            etag=True
+        )
+    except NotFound:
+        return jsonify({'error': _('Output file not found - processing may have failed')}), 404
 
 @app.route('/status/<job_id>')
 def get_job_status(job_id):
     if job_id not in processing_jobs:
         return jsonify({'error': _('Invalid job ID')}), 404
     
-    job = processing_jobs[job_id]
-    
-    # Tjek først om der findes en status-fil fra worker processen
-    status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                status_data = json.load(f)
-                
-                # Returner status fra worker processen - inkluder alle detaljer hvis de findes
-                response_data = {
-                    'status': status_data.get('status', job['status']),
-                    'progress': status_data.get('progress', job.get('progress', 0)),
-                    'message': status_data.get('message', job.get('message', ''))
-                }
-                
-                # Tilføj yderligere detaljer hvis de findes
-                for field in ['fps', 'batch', 'frames', 'time']:
-                    if field in status_data:
-                        response_data[field] = status_data[field]
-                
-                return jsonify(response_data)
-        except Exception as e:
-            logger.error(f"Error reading status file for job {job_id}: {e}")
+    # Jobbets tilstand i memory holdes opdateret af overvågningen (se _handle_status_update)
+    response_data = processing_jobs[job_id].snapshot()
     
-    # Returner status fra job dictionary hvis status-filen ikke findes
-    return jsonify({
-        'status': job['status'],
-        'progress': job.get('progress', 0),
-        'message': job.get('message', '')
+    # ETag over indholdet - en klient der spørger igen uden ændringer får et tomt 304-svar
+    response = jsonify(response_data)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@socketio.on('join')
+def join_job(data):
+    """
+    Tilmelder klienten rummet for et job - job-events sendes kun til det jobs rum.
+    Klienten får straks jobbets aktuelle tilstand, så events fra før tilmeldingen
+    (eller under en afbrudt forbindelse) ikke går tabt.
+    """
+    job_id = data.get('job_id') if isinstance(data, dict) else None
+    job = processing_jobs.get(job_id)
+    if job is None:
+        return
+    join_room(job_id)
+
+    state = job.snapshot()
+    current_step, prev_step = PROGRESS_STEPS[bisect.bisect_right(PROGRESS_STEP_THRESHOLDS, state['progress'])]
+    emit('progress_update', {
+        'job_id': job_id,
+        'progress': state['progress'],
+        'message': state['message'],
+        'step': current_step,
+        'prev_step': prev_step
     })
 
+    if state['status'] == 'completed':
+        with job.lock:
+            processing_time = job.end_time - job.start_time
+        emit('job_complete', {
+            'job_id': job_id,
+            'download_url': f'/download/{job_id}',
+            'processing_time': processing_time
+        })
+    elif state['status'] == 'error':
+        emit('job_error', {'job_id': job_id, 'error': state['message']})
+
 @app.route('/cancel/<job_id>', methods=['POST'])
 def cancel_processing(job_id):
     if job_id not in processing_jobs:
@@ -1652,15 +1255,19 @@ def cancel_processing(job_id):
     
     job = processing_jobs[job_id]
     
+    # Afslut overvågningen først - worker sender ikke selv en slutstatus når den dræbes
+    publish_status(job_id, {
+        'progress': 0,
+        'message': _('Job cancelled by user'),
+        'status': 'cancelled'
+    })
+    
     # Dræb worker-processen hvis den kører
-    if 'worker_pid' in job:
+    if job.worker_pid is not None:
         try:
-            worker_pid = job['worker_pid']
+            worker_pid = job.worker_pid
             logger.info(f"Attempting to terminate worker process {worker_pid} for job {job_id}")
             
-            # Forsøg at afslutte processen
-            import signal
-            
             # Prøv først med direkte OS-signaler
             try:
                 os.kill(worker_pid, signal.SIGTERM)
@@ -1671,45 +1278,32 @@ def cancel_processing(job_id):
                 logger.error(f"Error sending signal to process {worker_pid}: {e}")
                 
             # Prøv også med psutil hvis tilgængeligt
-            try:
-                import psutil
-                process = psutil.Process(worker_pid)
-                process.terminate()  # Send SIGTERM signal
-                
-                # Vent på at processen afslutter (max 5 sekunder)
-                process.wait(timeout=5)
-                logger.info(f"Worker process {worker_pid} terminated successfully")
-            except ImportError:
+            if not PSUTIL_AVAILABLE:
                 logger.warning("psutil ikke installeret - kan ikke verificere process termination")
-            except psutil.NoSuchProcess:
-                logger.info(f"Worker process {worker_pid} no longer exists")
-            except psutil.TimeoutExpired:
+            else:
                 try:
-                    logger.warning(f"Worker process {worker_pid} did not terminate within timeout, forcing kill")
-                    process.kill()  # Send SIGKILL signal
+                    process = psutil.Process(worker_pid)
+                    process.terminate()  # Send SIGTERM signal
+                
+                    # Vent på at processen afslutter (max 5 sekunder)
+                    process.wait(timeout=5)
+                    logger.info(f"Worker process {worker_pid} terminated successfully")
+                except psutil.NoSuchProcess:
+                    logger.info(f"Worker process {worker_pid} no longer exists")
+                except psutil.TimeoutExpired:
+                    try:
+                        logger.warning(f"Worker process {worker_pid} did not terminate within timeout, forcing kill")
+                        process.kill()  # Send SIGKILL signal
+                    except Exception as e:
+                        logger.error(f"Failed to kill process: {e}")
                 except Exception as e:
-                    logger.error(f"Failed to kill process: {e}")
-            except Exception as e:
-                logger.error(f"Error terminating worker process {worker_pid}: {e}")
+                    logger.error(f"Error terminating worker process {worker_pid}: {e}")
         except Exception as e:
             logger.error(f"Error cancelling job {job_id}: {e}")
     
-    # Markér job som annulleret
-    job['status'] = 'cancelled'
-    
-    # Skriv annulleringsstatus til status-fil så worker-processen kan læse det
-    status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
-    try:
-        with open(status_file, 'w') as f:
-            json.dump({
-                'job_id': job_id,
-                'progress': 0,
-                'message': _('Job cancelled by user'),
-                'status': 'cancelled',
-                'timestamp': time.time()
-            }, f)
-    except Exception as e:
-        logger.error(f"Error writing cancel status to file: {e}")
+    # Markér job som annulleret. Status-filen er allerede ryddet op af publish_status
+    # (se _finish_monitor) - worker læser den ikke, og /status svarer fra jobbet i memory
+    job.update(status='cancelled')
     
     # Returner success
     return jsonify({
@@ -1717,6 +1311,19 @@ def cancel_processing(job_id):
         'message': _('Processing cancelled')
     })
 
+# Detektionsmodeller til behandling i webappens egen proces (se get_dnn_models)
+_dnn_models = None
+_dnn_models_lock = threading.Lock()
+
+def get_dnn_models():
+    """Returnerer detektionsmodellerne og indlæser dem kun første gang, også ved samtidige jobs."""
+    global _dnn_models
+    with _dnn_models_lock:
+        if _dnn_models is None:
+            _dnn_models = load_dnn_models()
+        return _dnn_models
+
+
 def load_dnn_models():
     """Load DNN-based detector models if available"""
     models_dir = Path("models")
@@ -1739,7 +1346,7 @@ def load_dnn_models():
     if ULTRALYTICS_AVAILABLE and yolov8_face_path.exists():
         try:
             # Load YOLOv8 face model
-            yolo_face_model = YOLO(str(yolov8_face_path))
+            yolo_face_model = load_yolo_model(yolov8_face_path)
             models["yolov8_face_detector"] = yolo_face_model
             models["detector_types"]["face"] = "YOLOv8"
             print("Loaded YOLOv8 face detector (Ultralytics)")
@@ -1769,7 +1376,7 @@ def load_dnn_models():
     if ULTRALYTICS_AVAILABLE and yolov8_model_path.exists():
         try:
             # Load YOLOv8 license plate model
-            yolo_model = YOLO(str(yolov8_model_path))
+            yolo_model = load_yolo_model(yolov8_model_path)
             models["yolov8_plate_detector"] = yolo_model
             models["detector_types"]["plate"] = "YOLOv8"
             print("Loaded YOLOv8 license plate detector (Ultralytics)")
@@ -1790,33 +1397,38 @@ def load_dnn_models():
         
     return models
 
-def update_job_progress(job_id, progress, message, step=None, prev_step=None):
-    """Helper function to update job progress and emit Socket.IO event"""
+def update_job_progress(job_id, progress, message, step=None, prev_step=None, details=None):
+    """
+    Helper function to update job progress and emit Socket.IO event
+
+    Args:
+        details: Valgfrit dict med nøgletal (fx time) der sendes med, som fra worker
+    """
     if job_id in processing_jobs:
         job = processing_jobs[job_id]
-        job['progress'] = progress
-        job['message'] = message
         if step:
-            job['status'] = step
+            job.update(progress=progress, message=message, status=step)
+        else:
+            job.update(progress=progress, message=message)
         
         # Log progress to console
         print(f"Job {job_id}: {progress}% - {message}")
         
-        # Emit socket event with progress update
-        try:
-            socketio.emit('progress_update', {
-                'job_id': job_id,
-                'progress': progress,
-                'message': message,
-                'step': step,
-                'prev_step': prev_step
-            })
-            print(f"Emitted progress update: {progress}% - {message}")
-        except Exception as e:
-            print(f"Error emitting progress: {e}")
+        # Progress update sendes samlet med andre opdateringer i samme interval
+        payload = {
+            'job_id': job_id,
+            'progress': progress,
+            'message': message,
+            'step': step,
+            'prev_step': prev_step
+        }
+        if details:
+            payload.update(details)
+        queue_progress_update(job_id, payload)
 
 # process_video_with_progress er nu erstattet af worker-processen via blur360_worker.py
 
+
 def get_video_info(input_path):
     """Get information about a video file"""
     cap = cv2.VideoCapture(input_path)
@@ -1835,8 +1447,178 @@ def get_video_info(input_path):
     cap.release()
     return info
 
+# Video-dekodning (cap.read) frigiver GIL'en og kan overlappe med detektionen, men kun i en
+# rigtig OS-tråd - under eventlet ville threading/queue blot give greenlets på samme hub
+if ASYNC_MODE == 'eventlet':
+    _os_threading = eventlet.patcher.original('threading')
+    _os_queue = eventlet.patcher.original('queue')
+else:
+    import queue as _os_queue
+    _os_threading = threading
+
+# Antal dekodede frames læsetråden må ligge foran
+FRAME_PREFETCH = 4
+
+def prefetch_frames(cap, maxsize: int = FRAME_PREFETCH):
+    """
+    Generator der læser frames fra `cap` i en baggrundstråd og giver dem videre i rækkefølge.
+
+    Dekodningen af de næste frames overlapper dermed med behandlingen af den aktuelle.
+    Køen er begrænset, så højst `maxsize` frames ligger klar i hukommelsen. Lukkes
+    generatoren (fx ved annullering), stoppes læsetråden før `cap` må frigives.
+    """
+    frames = _os_queue.Queue(maxsize=maxsize)
+    stop = _os_threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except _os_queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            while not stop.is_set():
+                success, frame = cap.read()
+                if not success or not put(frame):
+                    break
+        finally:
+            put(None)  # Slut på videoen
+
+    thread = _os_threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            frame = frames.get()
+            if frame is None:
+                return
+            yield frame
+    finally:
+        stop.set()
+        thread.join()
+
+def start_frame_writer(out, maxsize: int = FRAME_PREFETCH) -> tuple:
+    """
+    Starter en baggrundstråd der skriver frames til `out` i den rækkefølge de afleveres.
+
+    Enkodningen (out.write frigiver GIL'en) overlapper dermed med detektion og sløring af
+    de næste frames. Køen er begrænset, så højst `maxsize` frames venter på at blive skrevet.
+
+    Fejler en skrivning, skrives de følgende frames ikke, og fejlen kastes igen af finish(),
+    så en afbrudt outputvideo ikke meldes som færdig.
+
+    Returns:
+        (write, finish): write(frame) afleverer en frame; finish() venter til alle er
+        skrevet og stopper tråden - skal kaldes før `out` frigives
+    """
+    pending = _os_queue.Queue(maxsize=maxsize)
+    errors = []
+
+    def writer():
+        while True:
+            frame = pending.get()
+            if frame is None:
+                return
+            if errors:
+                continue  # Køen tømmes stadig, så write() ikke blokerer
+            try:
+                out.write(frame)
+            except Exception as e:
+                # Logges først i finish() - logging's låse er green under eventlet og må
+                # ikke tages fra en OS-tråd
+                errors.append(e)
+
+    thread = _os_threading.Thread(target=writer, daemon=True)
+    thread.start()
+
+    def finish():
+        pending.put(None)  # Slut på videoen
+        thread.join()
+        if errors:
+            logger.error("Error writing frame: %s", errors[0])
+            raise errors[0]
+
+    return pending.put, finish
+
+# Vedvarende OS-tråde til OpenCV-kald der frigiver GIL'en (tracker.update, sløring af ROI'er)
+FRAME_THREADS = min(4, os.cpu_count() or 1)
+# OpenCV paralleliserer selv GaussianBlur/resize internt. Med FRAME_THREADS tråde oveni deles
+# kernerne, så det samlede antal tråde ≈ antal kerner. Kald der kører alene (fx DNN forward
+# og hele frames) får dermed færre tråde, men undgår overbooking når ROI'erne sløres parallelt.
+# Sættes kun mens process_video kører, da indstillingen gælder hele processen
+OPENCV_THREADS = max(1, (os.cpu_count() or 1) // FRAME_THREADS)
+_frame_tasks = None
+_frame_tasks_lock = _os_threading.Lock()
+
+def _frame_worker(tasks):
+    """Kører opgaver fra køen; resultatet eller undtagelsen gemmes på opgavens plads."""
+    while True:
+        func, item, results, index, done = tasks.get()
+        try:
+            results[index] = func(item)
+        except Exception as e:
+            results[index] = e
+        done.put(index)
+
+def map_in_threads(func, items: list, threads: int = FRAME_THREADS) -> list:
+    """
+    Kalder func(item) for hvert element og returnerer resultaterne - eller undtagelsen -
+    i samme rækkefølge.
+
+    Med flere elementer og threads > 1 fordeles kaldene på de vedvarende OS-tråde, så fx mange
+    ansigter/nummerplader i samme frame ikke behandles én ad gangen. Hvert element
+    behandles kun af én tråd; delte data (framen) må kun læses.
+    """
+    global _frame_tasks
+    if len(items) < 2 or threads < 2:
+        results = []
+        for item in items:
+            try:
+                results.append(func(item))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    with _frame_tasks_lock:
+        if _frame_tasks is None:
+            _frame_tasks = _os_queue.Queue()
+            for _thread in range(FRAME_THREADS):
+                _os_threading.Thread(target=_frame_worker, args=(_frame_tasks,), daemon=True).start()
+
+    results = [None] * len(items)
+    done = _os_queue.Queue()
+    for index, item in enumerate(items):
+        _frame_tasks.put((func, item, results, index, done))
+    for _item in items:
+        done.get()
+    return results
+
+def update_trackers(trackers: list, frame: np.ndarray) -> list:
+    """
+    Opdaterer alle trackere med frame (parallelt, se map_in_threads) og returnerer
+    (success, bbox) - eller undtagelsen - pr. tracker.
+    """
+    return map_in_threads(lambda tracker: tracker.update(frame), trackers)
+
+# Mindste antal sekunder mellem fremskridtsopdateringer og log-linjer pr. frame i process_video
+PROGRESS_MIN_INTERVAL = 0.5
+
 def process_video(input_path, output_path, debug_mode=False, use_dnn=True, models=None, job_id=None, skip_tracking=False, disable_legacy_tracking=True):
     """Main video processing function with optional progress reporting"""
+    # OpenCV's trådantal deles kun med FRAME_THREADS under behandlingen (se OPENCV_THREADS)
+    previous_threads = cv2.getNumThreads()
+    cv2.setNumThreads(OPENCV_THREADS)
+    try:
+        return _process_video(input_path, output_path, debug_mode, use_dnn, models, job_id,
+                              skip_tracking, disable_legacy_tracking)
+    finally:
+        cv2.setNumThreads(previous_threads)
+
+def _process_video(input_path, output_path, debug_mode, use_dnn, models, job_id, skip_tracking, disable_legacy_tracking):
+    """process_video uden opsætningen af OpenCV's trådantal."""
     # Import gettext function for translations
     from flask_babel import gettext as _
     
@@ -1847,8 +1629,8 @@ def process_video(input_path, output_path, debug_mode=False, use_dnn=True, model
     print(f"Debug mode: {debug_mode}")
     print(f"Use DNN: {use_dnn}")
     
-    # Open video
-    cap = cv2.VideoCapture(input_path)
+    # Open video (hardware-dekodning hvis muligt - se open_video_capture)
+    cap = open_video_capture(input_path)
     if not cap.isOpened():
         raise IOError(f"Cannot open video: {input_path}")
         
@@ -1860,740 +1642,509 @@ def process_video(input_path, output_path, debug_mode=False, use_dnn=True, model
     
     print(f"Video properties: {width}x{height} pixels, {fps} FPS, {frame_count} frames")
     
-    # Use H.264 codec if available, fallback to mp4v
-    try:
-        fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264 codec
-    except:
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Fallback codec
-        
-    # Create video writer
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    # Create video writer (H.264 if available, fallback to mp4v - see open_video_writer)
+    out = open_video_writer(output_path, fps, (width, height))
 
-    # We no longer use Haar cascade classifiers
-    # Instead, we exclusively use modern deep learning models for detection
+    # Læse- og skrivetråden, input og output lukkes også når behandlingen fejler undervejs
+    frames = None
+    finish_writing = None
+    try:
+        # We no longer use Haar cascade classifiers
+        # Instead, we exclusively use modern deep learning models for detection
     
-    # Load or use provided DNN models for better detection
-    if models is None and use_dnn:
-        models = load_dnn_models()
+        # Load or use provided DNN models for better detection
+        if models is None and use_dnn:
+            models = get_dnn_models()
         
-    dnn_face_detector = models["face_detector"] if models and use_dnn else None
-    dnn_plate_detector = models["plate_detector"] if models and use_dnn else None
+        dnn_face_detector = models["face_detector"] if models and use_dnn else None
     
-    # Check for YOLOv8 model (will be preferred for license plates if available)
-    yolov8_plate_detector = models["yolov8_plate_detector"] if models and use_dnn else None
+        # YOLO-detektorerne får nedskalerede kopier af framen (se yolo_input)
+        use_yolo = bool(models) and (models.get("yolov8_face_detector") is not None
+                                     or models.get("yolov8_plate_detector") is not None)
     
-    # Log model availability and types
-    print(f"=== MODELS IN USE ===")
-    print(f"Face detector: {models['detector_types']['face'] if models and 'detector_types' in models else 'Not available'}")
-    print(f"License plate detector: {models['detector_types']['plate'] if models and 'detector_types' in models else 'Not available'}")
-    print(f"====================\n")
-
-    # Initialize frame counter and processing frequency
-    frame_count = 0
+        # Log model availability and types
+        print(f"=== MODELS IN USE ===")
+        print(f"Face detector: {models['detector_types']['face'] if models and 'detector_types' in models else 'Not available'}")
+        print(f"License plate detector: {models['detector_types']['plate'] if models and 'detector_types' in models else 'Not available'}")
+        print(f"====================\n")
+
+        # Initialize frame counter and processing frequency
+        frame_count = 0
     
-    # Determine if tracking is supported/enabled
-    has_tracking_support = False
-    if skip_tracking:
-        print("Tracking explicitly disabled via parameter")
-    elif disable_legacy_tracking:
-        print("Legacy tracking disabled for compatibility")
-    else:
-        # Only try to use tracking if not explicitly disabled
-        try:
-            # Try to create a tracker to see if it's supported
-            tracker = create_tracker()
-            has_tracking_support = tracker is not None
-            if has_tracking_support:
-                print(f"Successfully created tracker of type: {type(tracker).__name__}")
-                print(f"Tracking is ENABLED and working correctly!")
-            else:
-                print("WARNING: Could not create a valid tracker. Tracking will be disabled.")
-        except Exception as e:
-            print(f"WARNING: Your OpenCV version does not support tracking. Error: {e}")
-            print("Using detection-only mode.")
-            has_tracking_support = False
+        # Determine if tracking is supported/enabled
+        has_tracking_support = False
+        if skip_tracking:
+            print("Tracking explicitly disabled via parameter")
+        elif disable_legacy_tracking:
+            print("Legacy tracking disabled for compatibility")
+        else:
+            # Only try to use tracking if not explicitly disabled
+            try:
+                # Try to create a tracker to see if it's supported
+                tracker = create_tracker()
+                has_tracking_support = tracker is not None
+                if has_tracking_support:
+                    print(f"Successfully created tracker of type: {type(tracker).__name__}")
+                    print(f"Tracking is ENABLED and working correctly!")
+                else:
+                    print("WARNING: Could not create a valid tracker. Tracking will be disabled.")
+            except Exception as e:
+                print(f"WARNING: Your OpenCV version does not support tracking. Error: {e}")
+                print("Using detection-only mode.")
+                has_tracking_support = False
         
-    # Set processing frequency based on tracking support
-    if has_tracking_support:
-        process_every = 5  # Process detection every 5 frames, use tracking for in-between frames
-        print("Using tracking-enhanced detection (processing every 5th frame)")
-    else:
-        process_every = 1  # Process every frame if no tracking support
-        print("Using detection-only mode (processing every frame)")
+        # Set processing frequency based on tracking support
+        if has_tracking_support:
+            process_every = 5  # Process detection every 5 frames, use tracking for in-between frames
+            print("Using tracking-enhanced detection (adaptive, at least every 10th frame)")
+        else:
+            process_every = 1  # Process every frame if no tracking support
+            print("Using detection-only mode (processing every frame)")
         
-    detection_interval = process_every  # How often to run full detection
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     
-    # Initialize tracker structures if tracking is supported
-    trackers = []  # List of active trackers
-    tracked_objects = []  # List of objects being tracked (with their bounding boxes)
-    tracker_max_age = 20  # Maximum number of frames to keep a tracker without re-detection
+        # Initialize tracker structures if tracking is supported
+        trackers = []  # List of active trackers
+        tracked_objects = []  # List of objects being tracked (with their bounding boxes)
     
-    # Report detection model loading completion
-    if job_id:
-        update_job_progress(job_id, 15, "Detection models loaded", 'step-detect', 'step-analyze')
+        # Adaptiv detektion: trackerne bruges så længe de holder, og fuld detektion tvinges når
+        # mange trackers fejler, objekterne er flyttet langt siden sidste detektion, eller der er
+        # gået max_detection_interval frames (så nye objekter i billedet stadig fanges)
+        max_detection_interval = process_every * 2
+        tracker_fail_threshold = 0.2  # Andel fejlede tracker-opdateringer der udløser detektion
+        motion_threshold = width * 0.01  # Gennemsnitlig forskydning i pixels der udløser detektion
+        tracker_scale = TRACKER_SCALE if width >= TRACKER_MIN_WIDTH else 1.0
+        frames_since_detection = 0
     
-    # Process frames
-    start_processing_time = time.time()
-    last_time_check = start_processing_time
+        # Report detection model loading completion
+        if job_id:
+            update_job_progress(job_id, 15, "Detection models loaded", 'step-detect', 'step-analyze')
     
-    while True:
-        # Check if job has been cancelled
-        if job_id and job_id in processing_jobs and processing_jobs[job_id].get('status') == 'cancelled':
-            print(f"Job {job_id} was cancelled by user")
-            break
-            
-        success, frame = cap.read()
-        if not success:
-            break
-            
-        frame_count += 1
-        
-        # Update progress every 30 frames or at 5% intervals
-        progress_interval = max(1, total_frames // 20)  # 5% intervals
-        
-        # For the initial info message
-        if job_id and frame_count == 1:
-            update_job_progress(
-                job_id, 
-                15, 
-                f"Starting processing. Total frames to process: {total_frames}",
-                'step-detect',
-                None
-            )
-            
-        # For subsequent progress updates
-        current_time = time.time()
-        if job_id and (frame_count % progress_interval == 0 or frame_count % 30 == 0 or current_time - last_time_check > 30):
-            last_time_check = current_time
-            progress = min(95, 15 + int(80 * frame_count / total_frames))
-            
-            # Calculate time estimate
-            elapsed_time = current_time - start_processing_time
-            frames_per_second = frame_count / elapsed_time if elapsed_time > 0 else 0
-            
-            # Create a basic message without translations for now
-            pct_complete = 100 * frame_count / total_frames
-            time_message = f"Processing frame {frame_count} of {total_frames} ({pct_complete:.1f}%). "
+        # Process frames
+        start_processing_time = time.time()
+        last_time_check = start_processing_time
+    
+        # Fremskridt sendes når den hele procent ændrer sig (eller efter 30 sek. uden ændring),
+        # dog højst hvert PROGRESS_MIN_INTERVAL sekund - korte videoer skifter procent hver frame
+        total_frames_inv = 1.0 / max(1, total_frames)
+        last_pct = 0
+        last_frame_log = 0.0
+    
+        # Frames dekodes og enkodes i hver sin baggrundstråd mens den aktuelle frame behandles
+        frames = prefetch_frames(cap)
+        write_frame, finish_writing = start_frame_writer(out)
+        while True:
+            # Check if job has been cancelled
+            if job_id and job_id in processing_jobs and processing_jobs[job_id].status == 'cancelled':
+                print(f"Job {job_id} was cancelled by user")
+                break
+            
+            frame = next(frames, None)
+            if frame is None:
+                break
+            
+            frame_count += 1
+        
+            # For the initial info message
+            if job_id and frame_count == 1:
+                update_job_progress(
+                    job_id, 
+                    15, 
+                    f"Starting processing. Total frames to process: {total_frames}",
+                    'step-detect',
+                    None
+                )
             
-            if frames_per_second > 0:
-                estimated_total_time = total_frames / frames_per_second
-                remaining_time = max(0, estimated_total_time - elapsed_time)
+            # For subsequent progress updates
+            current_time = time.time()
+            pct = int(100 * frame_count * total_frames_inv)
+            since_progress = current_time - last_time_check
+            if job_id and ((pct != last_pct and since_progress >= PROGRESS_MIN_INTERVAL) or since_progress > 30):
+                last_time_check = current_time
+                last_pct = pct
+                progress = min(95, 15 + int(80 * frame_count * total_frames_inv))
+            
+                # Calculate time estimate
+                elapsed_time = current_time - start_processing_time
+                frames_per_second = frame_count / elapsed_time if elapsed_time > 0 else 0
+            
+                # Create a basic message without translations for now
+                pct_complete = 100 * frame_count * total_frames_inv
+                time_message = f"Processing frame {frame_count} of {total_frames} ({pct_complete:.1f}%). "
+                time_details = None
+            
+                if frames_per_second > 0:
+                    estimated_total_time = total_frames / frames_per_second
+                    remaining_time = max(0, estimated_total_time - elapsed_time)
+                    # Færdigformateret tidsestimat til browseren
+                    time_details = {'time': {
+                        'remaining': remaining_time,
+                        'eta_min': int(remaining_time // 60),
+                        'eta_sec': int(remaining_time % 60)
+                    }}
                 
-                # Format the time estimate in minutes and seconds
-                if remaining_time > 60:
-                    minutes = int(remaining_time // 60)
-                    seconds = int(remaining_time % 60)
-                    time_message += f"Estimated time remaining: {minutes} min {seconds} sec. ({frames_per_second:.1f} FPS)"
+                    # Format the time estimate in minutes and seconds
+                    if remaining_time > 60:
+                        minutes = int(remaining_time // 60)
+                        seconds = int(remaining_time % 60)
+                        time_message += f"Estimated time remaining: {minutes} min {seconds} sec. ({frames_per_second:.1f} FPS)"
+                    else:
+                        seconds = int(remaining_time)
+                        time_message += f"Estimated time remaining: {seconds} sec. ({frames_per_second:.1f} FPS)"
                 else:
-                    seconds = int(remaining_time)
-                    time_message += f"Estimated time remaining: {seconds} sec. ({frames_per_second:.1f} FPS)"
-            else:
-                time_message += "Calculating time estimate..."
+                    time_message += "Calculating time estimate..."
             
-            # Change step when we're halfway through processing
-            current_step = 'step-detect'
-            prev_step = None
+                # Change step when we're halfway through processing
+                current_step = 'step-detect'
+                prev_step = None
             
-            if frame_count > total_frames // 2:
-                current_step = 'step-blur'
-                prev_step = 'step-detect'
+                if frame_count > total_frames // 2:
+                    current_step = 'step-blur'
+                    prev_step = 'step-detect'
                 
-            update_job_progress(
-                job_id, 
-                progress, 
-                time_message,
-                current_step,
-                prev_step
-            )
-        
-        # Anvend wrap-around padding for at forbedre detektion ved 360° kant
-        original_width = frame.shape[1]
-        
-        # Tilføj wrap-around padding til billedet
-        wrapped_frame, pad_w = wrap_frame_for_detection(frame)
-        
-        # Initialize list to hold all detections (faces and plates)
-        all_detections = []
-        
-        # Note: We no longer need to convert to grayscale since we're using only deep learning-based detection
-        
-        # Decide whether to run detection or use tracking for this frame
-        if has_tracking_support:
-            run_detection = (frame_count % detection_interval == 1) or (frame_count == 1) or (len(trackers) == 0)
-        else:
-            # If no tracking support, always run detection
-            run_detection = True
+                update_job_progress(
+                    job_id, 
+                    progress, 
+                    time_message,
+                    current_step,
+                    prev_step,
+                    details=time_details
+                )
         
-        # Update existing trackers first (tracking is less computationally expensive than detection)
-        temp_tracked_objects = []
-        if has_tracking_support and len(trackers) > 0:
-            print(f"Updating {len(trackers)} object trackers...")
-            
-            # Ensure tracked_objects has the same length as trackers
-            if len(tracked_objects) != len(trackers):
-                print(f"WARNING: Mismatch between trackers ({len(trackers)}) and tracked_objects ({len(tracked_objects)})")
-                # If needed, fill in missing tracked_objects
-                while len(tracked_objects) < len(trackers):
-                    tracked_objects.append((0, 0, 10, 10))  # Default box, will be replaced by tracker update
-            
-            # For each existing tracker, update with current frame
-            for i, (tracker, bbox) in enumerate(zip(trackers, tracked_objects)):
-                # Determine object type
-                object_type = 'face' if i < (len(tracked_objects) - num_plates) else 'plate'
+            original_width = frame.shape[1]
+        
+            # Initialize list to hold all detections (faces and plates) - ét (N,5)-array pr. kilde
+            all_detections = []
+        
+            # Note: We no longer need to convert to grayscale since we're using only deep learning-based detection
+        
+            # Update existing trackers first (tracking is less computationally expensive than detection)
+            temp_tracked_objects = []
+            live_trackers = []  # (tracker, boks) for trackere der stadig følger deres objekt
+            failed_updates = 0
+            center_shifts = []
+            tracker_frame = None
+            if has_tracking_support and len(trackers) > 0:
+                tracker_frame = tracker_input(frame, tracker_scale)
+                logger.debug("Updating %d object trackers...", len(trackers))
+            
+                # Ensure tracked_objects has the same length as trackers
+                if len(tracked_objects) != len(trackers):
+                    logger.warning("Mismatch between trackers (%d) and tracked_objects (%d)", len(trackers), len(tracked_objects))
+                    # If needed, fill in missing tracked_objects
+                    while len(tracked_objects) < len(trackers):
+                        tracked_objects.append((0, 0, 10, 10, DETECTION_FACE))  # Default box, will be replaced by tracker update
+            
+                # Update all existing trackers with the current frame (in parallel, see update_trackers)
+                updates = update_trackers(trackers, tracker_frame)
+                tracked_detections = []
+                for i, (tracker, bbox, update) in enumerate(zip(trackers, tracked_objects, updates)):
+                    # Boksen fra sidste detektion og dens type
+                    bx, by, bw, bh, type_id = bbox
+                    object_type = 'face' if type_id == DETECTION_FACE else 'plate'
                 
-                # Update tracker with current frame
-                try:
-                    success, new_bbox = tracker.update(frame)
-                    if success:
-                        # Extract updated coordinates
-                        x, y, w, h = [int(v) for v in new_bbox]
+                    try:
+                        if isinstance(update, Exception):
+                            raise update
+                        success, new_bbox = update
+                        if success:
+                            # Extract updated coordinates (tilbage i den fulde frames skala)
+                            x, y, w, h = [int(v / tracker_scale) for v in new_bbox]
                         
-                        # Only keep valid boxes
-                        if x >= 0 and y >= 0 and w > 0 and h > 0 and x + w <= frame.shape[1] and y + h <= frame.shape[0]:
-                            # Add to temporary tracking list
-                            temp_tracked_objects.append((x, y, w, h))
-                            all_detections.append((x, y, w, h))
-                            print(f"  - Tracking {object_type} at ({x},{y}), size {w}x{h}")
-                except Exception as e:
-                    print(f"  Error updating tracker {i} ({object_type}): {e}")
+                            # Only keep valid boxes
+                            if x >= 0 and y >= 0 and w > 0 and h > 0 and x + w <= frame.shape[1] and y + h <= frame.shape[0]:
+                                # Add to temporary tracking list
+                                temp_tracked_objects.append((x, y, w, h))
+                                live_trackers.append((tracker, (x, y, w, h)))
+                                tracked_detections.append((x, y, w, h, type_id))
+                                logger.debug("  - Tracking %s at (%d,%d), size %dx%d", object_type, x, y, w, h)
+                                # Forskydning af centrum i forhold til boksen fra sidste detektion
+                                center_shifts.append(abs((x + w / 2) - (bx + bw / 2)) + abs((y + h / 2) - (by + bh / 2)))
+                            else:
+                                failed_updates += 1
+                        else:
+                            failed_updates += 1
+                    except Exception as e:
+                        logger.debug("  Error updating tracker %d (%s): %s", i, object_type, e)
+                        failed_updates += 1
+                if tracked_detections:
+                    all_detections.append(np.array(tracked_detections, dtype=np.int64))
         
-        # Run detection if scheduled or if tracking is not supported
-        if run_detection:
-            print(f"Frame {frame_count}: Running full detection...")
-            
-            # We'll initialize new trackers for all detected objects
-            # Clear existing trackers and objects before setting up new ones
-            trackers = []
-            tracked_objects = []
-            print("DEBUG: Cleared tracking lists before detection")
-            
-            # Using YOLO-based face detection for optimal accuracy
-            print("Using YOLO face detection for optimal accuracy...")
-            yolov8_face_detector = models["yolov8_face_detector"] if models and "yolov8_face_detector" in models else None
-            
-            # First try to use YOLO face detector (more accurate)
-            if yolov8_face_detector is not None:
-                try:
-                    # Process the frame with YOLOv8 face detector - using a lower confidence threshold for better recall
-                    # Process original frame
-                    print("Running YOLO face detection on original frame")
-                    results = yolov8_face_detector(frame, conf=0.35, verbose=False)  # Lower confidence for more detections
-                    yolo_face_detections = []
-                    
-                    # Process results from original frame
-                    for result in results:
-                        for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):  # Get boxes in xyxy format
-                            x1, y1, x2, y2 = box[:4]
-                            conf = float(result.boxes.conf.cpu().numpy()[i])  # Get confidence score
-                            # Convert to xywh format
-                            x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                            yolo_face_detections.append((x, y, w, h, conf))
-                    
-                    # Process wrapped frame to detect faces at the 360° boundary
-                    print("Running YOLO face detection on wrapped frame")
-                    wrapped_results = yolov8_face_detector(wrapped_frame, conf=0.35, verbose=False)  # Lower confidence
-                    wrapped_yolo_face_detections = []
+            # Decide whether to run detection or keep using the trackers for this frame
+            if has_tracking_support:
+                frames_since_detection += 1
+                failed_ratio = failed_updates / len(trackers) if trackers else 1.0
+                mean_shift = sum(center_shifts) / len(center_shifts) if center_shifts else 0.0
+                run_detection = (
+                    len(trackers) == 0
+                    or failed_ratio > tracker_fail_threshold
+                    or mean_shift > motion_threshold
+                    or frames_since_detection >= max_detection_interval
+                )
+            else:
+                # If no tracking support, always run detection
+                run_detection = True
+        
+            # Anvend wrap-around padding for at forbedre detektion ved 360° kant - kun på
+            # detektionsframes, da trackerne ikke bruger den wrap'ede frame
+            wrapped_frame, pad_w = None, 0
+            if run_detection:
+                frames_since_detection = 0
+                wrapped_frame, pad_w = wrap_frame_for_detection(frame)
+                if has_tracking_support and tracker_frame is None:
+                    tracker_frame = tracker_input(frame, tracker_scale)
+                if use_yolo:
+                    # Kun de små billeder kopieres til GPU'en; blur sker stadig på den fulde frame
+                    (small_frame, frame_scale), (small_wrapped, wrapped_scale) = (
+                        yolo_input(frame), yolo_input(wrapped_frame))
+        
+            # Run detection if scheduled or if tracking is not supported
+            if run_detection:
+                logger.debug("Frame %d: Running full detection...", frame_count)
+            
+                # Trackerne bygges op igen ud fra detektionerne - trackere der stadig følger et
+                # detekteret objekt genbruges (se start_trackers), resten droppes
+                trackers = []
+                tracked_objects = []
+                logger.debug("Cleared tracking lists before detection")
+            
+                # Using YOLO-based face detection for optimal accuracy
+                logger.debug("Using YOLO face detection for optimal accuracy...")
+                yolov8_face_detector = models["yolov8_face_detector"] if models and "yolov8_face_detector" in models else None
+            
+                # First try to use YOLO face detector (more accurate)
+                if yolov8_face_detector is not None:
+                    try:
+                        # Process the frame with YOLOv8 face detector - using a lower confidence threshold for better recall
+                        # Original og wrapped frame (fanger ansigter ved 360°-kanten) køres som ét batch,
+                        # så detektoren kun laver ét forward pass pr. detektionsframe
+                        logger.debug("Running YOLO face detection on original and wrapped frame")
+                        result, wrapped_result = yolov8_face_detector(
+                            yolo_source(yolov8_face_detector, [small_frame, small_wrapped]), imgsz=YOLO_IMGSZ, conf=0.35, verbose=False  # Lower confidence for more detections
+                        )
+                        # Boksene hentes som (N,4) int32-arrays + (N,) confidence, uden konvertering pr. boks
+                        yolo_face_detections, yolo_face_confs = yolo_boxes_xywh(result, frame_scale)
                     
-                    # Process results from wrapped frame
-                    for result in wrapped_results:
-                        for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):
-                            x1, y1, x2, y2 = box[:4]
-                            conf = float(result.boxes.conf.cpu().numpy()[i])
-                            # Convert to xywh format
-                            x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                            wrapped_yolo_face_detections.append((x, y, w, h, conf))
+                        # Process wrapped frame to detect faces at the 360° boundary
+                        wrapped_yolo_face_detections, wrapped_face_confs = yolo_boxes_xywh(wrapped_result, wrapped_scale)
                     
-                    # Adjust coordinates for wrapped detections
-                    adjusted_wrapped_detections = []
-                    for (x, y, w, h, conf) in wrapped_yolo_face_detections:
-                        # Convert to format needed for the helper function
-                        adjusted = adjust_coords_for_wrapped_detections([(x, y, w, h)], pad_w, original_width)
-                        
-                        # If detection isn't entirely outside the original frame, add it with its confidence
-                        if adjusted:
-                            adjusted_x, adjusted_y, adjusted_w, adjusted_h = adjusted[0]
-                            adjusted_wrapped_detections.append((adjusted_x, adjusted_y, adjusted_w, adjusted_h, conf))
+                        # Adjust coordinates for wrapped detections (confidence følger med som 5. kolonne)
+                        adjusted = adjust_coords_for_wrapped_detections(
+                            np.column_stack([wrapped_yolo_face_detections, wrapped_face_confs]), pad_w, original_width)
+                        adjusted_wrapped_detections = adjusted[:, :4].astype(np.int32)
+                        adjusted_wrapped_confs = adjusted[:, 4]
                     
-                    # Report detections
-                    if yolo_face_detections:
-                        print(f"YOLO face detector found {len(yolo_face_detections)} faces in original frame:")
-                        for i, (x, y, w, h, conf) in enumerate(yolo_face_detections):
-                            print(f"  - YOLO Face {i+1}: Position ({x},{y}), Size {w}x{h}, Confidence: {conf:.2f}")
+                        # Report detections
+                        if len(yolo_face_detections):
+                            logger.debug("YOLO face detector found %d faces in original frame:", len(yolo_face_detections))
+                            for i, ((x, y, w, h), conf) in enumerate(zip(yolo_face_detections.tolist(), yolo_face_confs.tolist())):
+                                logger.debug("  - YOLO Face %d: Position (%d,%d), Size %dx%d, Confidence: %.2f", i+1, x, y, w, h, conf)
                         
-                        # Add to overall detections list
-                        for x, y, w, h, _ in yolo_face_detections:
-                            # Create a tracker for each detection
-                            try:
-                                tracker = create_tracker()
-                                if tracker is not None:
-                                    # Initialize the tracker with the current frame and bounding box
-                                    tracker.init(frame, (x, y, w, h))
-                                    # Add the tracker and bounding box to our lists
-                                    trackers.append(tracker)
-                                    tracked_objects.append((x, y, w, h))
-                                else:
-                                    print(f"WARNING: Could not create tracker for face at ({x},{y}), size {w}x{h}")
-                            except Exception as e:
-                                print(f"Error creating tracker for face: {e}")
-                            
-                            # Add to current detections list regardless of tracker
-                            all_detections.append((x, y, w, h))
-                    else:
-                        print("YOLO face detector found NO faces in original frame")
+                            # Add to overall detections list and trackers
+                            if has_tracking_support:
+                                start_trackers(tracker_frame, yolo_face_detections, trackers, tracked_objects, "face", DETECTION_FACE, live_trackers, scale=tracker_scale)
+                            all_detections.append(label_detections(yolo_face_detections, DETECTION_FACE))
+                        else:
+                            logger.debug("YOLO face detector found NO faces in original frame")
                     
-                    if adjusted_wrapped_detections:
-                        print(f"YOLO face detector found {len(adjusted_wrapped_detections)} additional faces in wrapped frame:")
-                        for i, (x, y, w, h, conf) in enumerate(adjusted_wrapped_detections):
-                            print(f"  - YOLO Wrapped Face {i+1}: Position ({x},{y}), Size {w}x{h}, Confidence: {conf:.2f}")
+                        if len(adjusted_wrapped_detections):
+                            logger.debug("YOLO face detector found %d additional faces in wrapped frame:", len(adjusted_wrapped_detections))
+                            for i, ((x, y, w, h), conf) in enumerate(zip(adjusted_wrapped_detections.tolist(), adjusted_wrapped_confs.tolist())):
+                                logger.debug("  - YOLO Wrapped Face %d: Position (%d,%d), Size %dx%d, Confidence: %.2f", i+1, x, y, w, h, conf)
                         
-                        # Add to overall detections list and trackers
-                        for x, y, w, h, _ in adjusted_wrapped_detections:
-                            # Create a tracker for each detection
-                            try:
-                                tracker = create_tracker()
-                                if tracker is not None:
-                                    # Initialize the tracker with the current frame and bounding box
-                                    tracker.init(frame, (x, y, w, h))
-                                    # Add the tracker and bounding box to our lists
-                                    trackers.append(tracker)
-                                    tracked_objects.append((x, y, w, h))
-                                else:
-                                    print(f"WARNING: Could not create tracker for wrapped face at ({x},{y}), size {w}x{h}")
-                            except Exception as e:
-                                print(f"Error creating tracker for wrapped face: {e}")
-                            
-                            # Add to current detections list regardless of tracker
-                            all_detections.append((x, y, w, h))
-                    else:
-                        print("YOLO face detector found NO additional faces in wrapped frame")
+                            # Add to overall detections list and trackers
+                            if has_tracking_support:
+                                start_trackers(tracker_frame, adjusted_wrapped_detections, trackers, tracked_objects, "wrapped face", DETECTION_FACE, live_trackers, scale=tracker_scale)
+                            all_detections.append(label_detections(adjusted_wrapped_detections, DETECTION_FACE))
+                        else:
+                            logger.debug("YOLO face detector found NO additional faces in wrapped frame")
                     
-                except Exception as e:
-                    print(f"Error during YOLO face detection: {e}")
-                    print("Falling back to OpenCV DNN face detector if available")
-                    # Fall back to OpenCV DNN if YOLO fails
-                    yolov8_face_detector = None
+                    except Exception as e:
+                        logger.error("Error during YOLO face detection: %s", e)
+                        logger.warning("Falling back to OpenCV DNN face detector if available")
+                        # Fall back to OpenCV DNN if YOLO fails
+                        yolov8_face_detector = None
         
-        # Fallback to OpenCV DNN if YOLO is not available and we're in detection phase
-        if run_detection and yolov8_face_detector is None and dnn_face_detector is not None:
-            print("Using OpenCV DNN face detection as fallback...")
+            # Fallback to OpenCV DNN if YOLO is not available and we're in detection phase
+            if run_detection and yolov8_face_detector is None and dnn_face_detector is not None:
+                logger.debug("Using OpenCV DNN face detection as fallback...")
             
-            # Process original frame
-            print("Running DNN face detection on original frame")
+                # Process original frame
+                logger.debug("Running DNN face detection on original frame")
             
-            # Process at multiple scales to better detect faces at different sizes
-            scales = [1.0, 0.75, 1.25]  # Process at normal size, smaller and larger scales
+                # Netværkets input er altid 300x300, så én blob direkte fra framen er nok -
+                # ekstra skalaer gav næsten identiske blobs. Bufferen genbruges mellem frames
+                blob = dnn_blob([frame])  # BGR som OpenCV læser den, uden kanalbyt
             
-            for scale in scales:
-                # Calculate dimensions for the current scale
-                current_height = int(height * scale)
-                current_width = int(width * scale)
-                
-                # Skip invalid scales
-                if current_height <= 0 or current_width <= 0:
-                    continue
-                
-                # Resize frame for current scale
-                resized_frame = cv2.resize(frame, (current_width, current_height))
-                
-                # Prepare image for DNN processing
-                blob = cv2.dnn.blobFromImage(
-                    cv2.resize(resized_frame, (300, 300)), 
-                    1.0, (300, 300), 
-                    (104.0, 177.0, 123.0),
-                    swapRB=False  # Don't swap channels for OpenCV BGR format
-                )
-                
                 dnn_face_detector.setInput(blob)
                 detections = dnn_face_detector.forward()
-                
-                # Process DNN detections with confidence threshold
-                dnn_face_detections = []
-                for i in range(0, detections.shape[2]):
-                    confidence = detections[0, 0, i, 2]
-                    # Using slightly lower threshold (0.4) to catch more faces
-                    if confidence > 0.4:
-                        box = detections[0, 0, i, 3:7] * np.array([current_width, current_height, current_width, current_height])
-                        (startX, startY, endX, endY) = box.astype("int")
-                        
-                        # Scale back to original image dimensions
-                        startX = int(startX / scale)
-                        startY = int(startY / scale)
-                        endX = int(endX / scale)
-                        endY = int(endY / scale)
-                        
-                        # Ensure coordinates are within image boundaries
-                        startX = max(0, startX)
-                        startY = max(0, startY)
-                        endX = min(width, endX)
-                        endY = min(height, endY)
-                        
-                        # Skip invalid detections
-                        if startX >= endX or startY >= endY:
-                            continue
-                            
-                        # Convert to x, y, w, h format
-                        x, y, w, h = startX, startY, endX - startX, endY - startY
-                        
-                        # Add to DNN detection list with confidence
-                        dnn_face_detections.append((x, y, w, h, confidence))
-                
+            
+                # Process DNN detections with confidence threshold - using slightly lower threshold (0.4)
+                # to catch more faces. Scaled to original image dimensions and clipped to the image
+                dnn_face_detections, dnn_face_confs = parse_dnn_detections(detections, width, height, 0.4, 1.0, (width, height))
+            
                 # Report DNN face detections
-                if dnn_face_detections:
-                    print(f"DNN face detector found {len(dnn_face_detections)} faces at scale {scale}:")
-                    for i, (x, y, w, h, conf) in enumerate(dnn_face_detections):
-                        print(f"  - DNN Face {i+1}: Position ({x},{y}), Size {w}x{h}, Confidence: {conf:.2f}")
-                    
+                if len(dnn_face_detections):
+                    logger.debug("DNN face detector found %d faces:", len(dnn_face_detections))
+                    for i, ((x, y, w, h), conf) in enumerate(zip(dnn_face_detections.tolist(), dnn_face_confs.tolist())):
+                        logger.debug("  - DNN Face %d: Position (%d,%d), Size %dx%d, Confidence: %.2f", i+1, x, y, w, h, conf)
+                
                     # Add to overall detections list and create trackers
-                    for x, y, w, h, _ in dnn_face_detections:
-                        # Create a tracker for each detection
-                        try:
-                            tracker = create_tracker()
-                            if tracker is not None:
-                                # Initialize the tracker
-                                tracker.init(frame, (x, y, w, h))
-                                # Add to tracker lists
-                                trackers.append(tracker)
-                                tracked_objects.append((x, y, w, h))
-                            else:
-                                print(f"WARNING: Could not create tracker for DNN face at ({x},{y}), size {w}x{h}")
-                        except Exception as e:
-                            print(f"Error creating tracker for DNN face: {e}")
-                        
-                        # Also add to current detections regardless of tracker
-                        all_detections.append((x, y, w, h))
+                    if has_tracking_support:
+                        start_trackers(tracker_frame, dnn_face_detections, trackers, tracked_objects, "DNN face", DETECTION_FACE, live_trackers, scale=tracker_scale)
+                    all_detections.append(label_detections(dnn_face_detections, DETECTION_FACE))
                 else:
-                    print(f"DNN face detector found NO faces at scale {scale}")
-            
-            # Process wrapped frame to catch faces at the 360° boundary
-            print("Running DNN face detection on wrapped frame")
+                    logger.debug("DNN face detector found NO faces")
             
-            # Prepare wrapped frame for DNN processing
-            wrapped_blob = cv2.dnn.blobFromImage(
-                cv2.resize(wrapped_frame, (300, 300)), 
-                1.0, (300, 300), 
-                (104.0, 177.0, 123.0),
-                swapRB=False
-            )
+                # Process wrapped frame to catch faces at the 360° boundary
+                logger.debug("Running DNN face detection on wrapped frame")
             
-            dnn_face_detector.setInput(wrapped_blob)
-            wrapped_detections = dnn_face_detector.forward()
+                # Prepare wrapped frame for DNN processing (samme buffer - forrige blob er brugt)
+                wrapped_blob = dnn_blob([wrapped_frame])
             
-            # Process wrapped frame DNN detections
-            wrapped_dnn_face_detections = []
-            for i in range(0, wrapped_detections.shape[2]):
-                confidence = wrapped_detections[0, 0, i, 2]
-                if confidence > 0.4:
-                    # Get bounding box coordinates in full 300x300 image space
-                    box = wrapped_detections[0, 0, i, 3:7] * np.array([300, 300, 300, 300])
-                    
-                    # Scale to wrapped frame dimensions
-                    box = box * np.array([wrapped_frame.shape[1]/300, wrapped_frame.shape[0]/300, 
-                                         wrapped_frame.shape[1]/300, wrapped_frame.shape[0]/300])
-                    
-                    (startX, startY, endX, endY) = box.astype("int")
-                    
-                    # Convert to x, y, w, h format
-                    x, y, w, h = startX, startY, endX - startX, endY - startY
-                    
-                    # Add to wrapped detections list
-                    wrapped_dnn_face_detections.append((x, y, w, h, confidence))
+                dnn_face_detector.setInput(wrapped_blob)
+                wrapped_detections = dnn_face_detector.forward()
             
-            # Adjust coordinates for wrapped detections
-            adjusted_wrapped_detections = []
-            for (x, y, w, h, conf) in wrapped_dnn_face_detections:
-                # Convert to format needed for the helper function
-                adjusted = adjust_coords_for_wrapped_detections([(x, y, w, h)], pad_w, original_width)
-                
-                # If detection isn't entirely outside the original frame, add it with its confidence
-                if adjusted:
-                    adjusted_x, adjusted_y, adjusted_w, adjusted_h = adjusted[0]
-                    adjusted_wrapped_detections.append((adjusted_x, adjusted_y, adjusted_w, adjusted_h, conf))
+                # Process wrapped frame DNN detections, scaled to wrapped frame dimensions
+                wrapped_dnn_face_detections, wrapped_dnn_face_confs = parse_dnn_detections(
+                    wrapped_detections, wrapped_frame.shape[1], wrapped_frame.shape[0], 0.4
+                )
             
-            # Report wrapped frame detections
-            if adjusted_wrapped_detections:
-                print(f"DNN face detector found {len(adjusted_wrapped_detections)} additional faces in wrapped frame:")
-                for i, (x, y, w, h, conf) in enumerate(adjusted_wrapped_detections):
-                    print(f"  - DNN Wrapped Face {i+1}: Position ({x},{y}), Size {w}x{h}, Confidence: {conf:.2f}")
+                # Adjust coordinates for wrapped detections (confidence følger med som 5. kolonne)
+                adjusted = adjust_coords_for_wrapped_detections(
+                    np.column_stack([wrapped_dnn_face_detections, wrapped_dnn_face_confs]), pad_w, original_width)
+                adjusted_wrapped_detections = adjusted[:, :4].astype(np.int32)
+                adjusted_wrapped_confs = adjusted[:, 4]
+            
+                # Report wrapped frame detections
+                if len(adjusted_wrapped_detections):
+                    logger.debug("DNN face detector found %d additional faces in wrapped frame:", len(adjusted_wrapped_detections))
+                    for i, ((x, y, w, h), conf) in enumerate(zip(adjusted_wrapped_detections.tolist(), adjusted_wrapped_confs.tolist())):
+                        logger.debug("  - DNN Wrapped Face %d: Position (%d,%d), Size %dx%d, Confidence: %.2f", i+1, x, y, w, h, conf)
                 
-                # Add to overall detections list and create trackers
-                for x, y, w, h, _ in adjusted_wrapped_detections:
-                    # Create a tracker for each detection 
-                    try:
-                        tracker = create_tracker()
-                        if tracker is not None:
-                            # Initialize the tracker
-                            tracker.init(frame, (x, y, w, h))
-                            # Add to tracker lists
-                            trackers.append(tracker)
-                            tracked_objects.append((x, y, w, h))
-                        else:
-                            print(f"WARNING: Could not create tracker for DNN wrapped face at ({x},{y}), size {w}x{h}")
-                    except Exception as e:
-                        print(f"Error creating tracker for DNN wrapped face: {e}")
-                    
-                    # Also add to current detections regardless of tracker
-                    all_detections.append((x, y, w, h))
-            else:
-                print("DNN face detector found NO additional faces in wrapped frame")
+                    # Add to overall detections list and create trackers
+                    if has_tracking_support:
+                        start_trackers(tracker_frame, adjusted_wrapped_detections, trackers, tracked_objects, "DNN wrapped face", DETECTION_FACE, live_trackers, scale=tracker_scale)
+                    all_detections.append(label_detections(adjusted_wrapped_detections, DETECTION_FACE))
+                else:
+                    logger.debug("DNN face detector found NO additional faces in wrapped frame")
         
-        # Show warning if no face detectors are available during detection phase
-        if run_detection and yolov8_face_detector is None and dnn_face_detector is None:
-            print("WARNING: No face detectors available! Please run download_models.py to get the required models.")
+            # Show warning if no face detectors are available during detection phase
+            if run_detection and yolov8_face_detector is None and dnn_face_detector is None:
+                logger.warning("No face detectors available! Please run download_models.py to get the required models.")
         
-        # 3. License plate detection using deep learning only (if we're in detection phase)
-        num_plates = 0
-        if run_detection:  # Only run license plate detection during detection frames
-            # Using YOLOv8-based license plate detection (Modern approach)
-            if models["yolov8_plate_detector"] is not None:
-                try:
-                    # Run YOLOv8 detection on both original and wrapped frames for best results
-                    # Øget confidence threshold til 0.55 for at reducere falske positiver yderligere
-                    yolo_results = models["yolov8_plate_detector"](frame, conf=0.55)  # Even higher confidence for fewer false positives
-                    yolo_plates = []
-                    yolo_confidences = []
-                    
-                    # Process results from original frame
-                    for result in yolo_results:
-                        for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):  # Get boxes in xyxy format
-                            x1, y1, x2, y2 = box[:4]
-                            conf = float(result.boxes.conf.cpu().numpy()[i])  # Get confidence score
-                            # Convert to xywh format from xyxy
-                            x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                            yolo_plates.append((x, y, w, h))
-                            yolo_confidences.append(conf)
+            # 3. License plate detection using deep learning only (if we're in detection phase)
+            if run_detection:  # Only run license plate detection during detection frames
+                # Using YOLOv8-based license plate detection (Modern approach)
+                yolov8_plate_detector = models["yolov8_plate_detector"] if models and "yolov8_plate_detector" in models else None
+                if yolov8_plate_detector is not None:
+                    try:
+                        # Run YOLOv8 detection on both original and wrapped frames for best results
+                        # Øget confidence threshold til 0.55 for at reducere falske positiver yderligere
+                        # Begge frames køres som ét batch (ét forward pass)
+                        yolo_result, wrapped_yolo_result = yolov8_plate_detector(
+                            yolo_source(yolov8_plate_detector, [small_frame, small_wrapped]), imgsz=YOLO_IMGSZ, conf=0.55  # Even higher confidence for fewer false positives
+                        )
                     
-                    # Also process wrapped frame to catch detections at the edges
-                    wrapped_yolo_results = models["yolov8_plate_detector"](wrapped_frame, conf=0.55)
-                    wrapped_yolo_plates = []
-                    wrapped_yolo_confidences = []
+                        # Process results from original frame
+                        yolo_plates, yolo_confidences = yolo_boxes_xywh(yolo_result, frame_scale)
                     
-                    for result in wrapped_yolo_results:
-                        for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):
-                            x1, y1, x2, y2 = box[:4]
-                            conf = float(result.boxes.conf.cpu().numpy()[i])  # Get confidence score
-                            # Convert to xywh format
-                            x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                            wrapped_yolo_plates.append((x, y, w, h))
-                            wrapped_yolo_confidences.append(conf)
+                        # Also process wrapped frame to catch detections at the edges
+                        wrapped_yolo_plates, wrapped_plate_confs = yolo_boxes_xywh(wrapped_yolo_result, wrapped_scale)
                     
-                    # Adjust coordinates for wrapped detections
-                    adjusted_wrapped_plates = adjust_coords_for_wrapped_detections(wrapped_yolo_plates, pad_w, original_width)
+                        # Adjust coordinates for wrapped detections - confidence følger med som 5. kolonne,
+                        # så den stadig passer til sin detektion efter frasortering
+                        adjusted = adjust_coords_for_wrapped_detections(
+                            np.column_stack([wrapped_yolo_plates, wrapped_plate_confs]), pad_w, original_width)
+                        adjusted_wrapped_plates = adjusted[:, :4].astype(np.int32)
+                        wrapped_yolo_confidences = adjusted[:, 4]
                     
-                    # Detailed logging for license plates with confidence scores
-                    if len(yolo_plates) > 0:
-                        print(f"YOLOv8 detected {len(yolo_plates)} license plates in original frame:")
-                        for i, (x, y, w, h) in enumerate(yolo_plates):
-                            print(f"  - Plate {i+1}: Position ({x},{y}), Size {w}x{h}, Confidence: {yolo_confidences[i]:.2f}")
+                        # Detailed logging for license plates with confidence scores
+                        if len(yolo_plates) > 0:
+                            logger.debug("YOLOv8 detected %d license plates in original frame:", len(yolo_plates))
+                            for i, ((x, y, w, h), conf) in enumerate(zip(yolo_plates.tolist(), yolo_confidences.tolist())):
+                                logger.debug("  - Plate %d: Position (%d,%d), Size %dx%d, Confidence: %.2f", i+1, x, y, w, h, conf)
                         
-                        # Add to detections and create trackers
-                        for x, y, w, h in yolo_plates:
-                            # Create a tracker for each detection
-                            try:
-                                tracker = create_tracker()
-                                if tracker is not None:
-                                    # Initialize the tracker
-                                    tracker.init(frame, (x, y, w, h))
-                                    # Add to tracker lists - at the end (after face trackers)
-                                    trackers.append(tracker)
-                                    tracked_objects.append((x, y, w, h))
-                                else:
-                                    print(f"WARNING: Could not create tracker for license plate at ({x},{y}), size {w}x{h}")
-                            except Exception as e:
-                                print(f"Error creating tracker for license plate: {e}")
-                            
-                            # Also add to current detections regardless of tracker
-                            all_detections.append((x, y, w, h))
-                            # Increment license plate count
-                            num_plates += 1
-                    else:
-                        print("YOLOv8 detected NO license plates in original frame")
+                            # Add to detections and create trackers - at the end (after face trackers)
+                            if has_tracking_support:
+                                start_trackers(tracker_frame, yolo_plates, trackers, tracked_objects, "license plate", DETECTION_PLATE, live_trackers, scale=tracker_scale)
+                            all_detections.append(label_detections(yolo_plates, DETECTION_PLATE))
+                        else:
+                            logger.debug("YOLOv8 detected NO license plates in original frame")
                     
-                    if len(adjusted_wrapped_plates) > 0:
-                        print(f"YOLOv8 detected {len(adjusted_wrapped_plates)} additional license plates in wrapped frame:")
-                        for i, (x, y, w, h) in enumerate(adjusted_wrapped_plates):
-                            if i < len(wrapped_yolo_confidences):  # Make sure we have a matching confidence
-                                print(f"  - Plate {i+1}: Position ({x},{y}), Size {w}x{h}, Confidence: {wrapped_yolo_confidences[i]:.2f}")
+                        if len(adjusted_wrapped_plates) > 0:
+                            logger.debug("YOLOv8 detected %d additional license plates in wrapped frame:", len(adjusted_wrapped_plates))
+                            for i, ((x, y, w, h), conf) in enumerate(zip(adjusted_wrapped_plates.tolist(), wrapped_yolo_confidences.tolist())):
+                                logger.debug("  - Plate %d: Position (%d,%d), Size %dx%d, Confidence: %.2f", i+1, x, y, w, h, conf)
                         
-                        # Add to detections and create trackers
-                        for x, y, w, h in adjusted_wrapped_plates:
-                            # Create a tracker for each detection
-                            try:
-                                tracker = create_tracker()
-                                if tracker is not None:
-                                    # Initialize the tracker
-                                    tracker.init(frame, (x, y, w, h))
-                                    # Add to tracker lists - at the end (after face trackers)
-                                    trackers.append(tracker)
-                                    tracked_objects.append((x, y, w, h))
-                                else:
-                                    print(f"WARNING: Could not create tracker for wrapped plate at ({x},{y}), size {w}x{h}")
-                            except Exception as e:
-                                print(f"Error creating tracker for wrapped plate: {e}")
-                            
-                            # Also add to current detections regardless of tracker
-                            all_detections.append((x, y, w, h))
-                            # Increment license plate count
-                            num_plates += 1
-                    else:
-                        print("YOLOv8 detected NO additional license plates in wrapped frame")
+                            # Add to detections and create trackers - at the end (after face trackers)
+                            if has_tracking_support:
+                                start_trackers(tracker_frame, adjusted_wrapped_plates, trackers, tracked_objects, "wrapped plate", DETECTION_PLATE, live_trackers, scale=tracker_scale)
+                            all_detections.append(label_detections(adjusted_wrapped_plates, DETECTION_PLATE))
+                        else:
+                            logger.debug("YOLOv8 detected NO additional license plates in wrapped frame")
                     
-                except Exception as e:
-                    print(f"Error during YOLOv8 license plate detection: {e}")
-            else:
-                print("YOLOv8 license plate detector not available. Using only face detection.")
-        
-        # YOLOv3 er fjernet - vi bruger kun YOLOv8
-        
-        # Apply Non-Maximum Suppression to merge overlapping detections
-        def compute_iou(box1, box2):
-            """Compute Intersection over Union between two boxes"""
-            x1, y1, w1, h1 = box1
-            x2, y2, w2, h2 = box2
-            
-            # Calculate intersection coordinates
-            xx1 = max(x1, x2)
-            yy1 = max(y1, y2)
-            xx2 = min(x1 + w1, x2 + w2)
-            yy2 = min(y1 + h1, y2 + h2)
-            
-            # Check if there is an intersection
-            if xx2 < xx1 or yy2 < yy1:
-                return 0.0
-                
-            # Calculate areas
-            intersection_area = (xx2 - xx1) * (yy2 - yy1)
-            box1_area = w1 * h1
-            box2_area = w2 * h2
-            union_area = box1_area + box2_area - intersection_area
-            
-            # Return IoU
-            return intersection_area / union_area if union_area > 0 else 0.0
+                    except Exception as e:
+                        logger.error("Error during YOLOv8 license plate detection: %s", e)
+                else:
+                    logger.debug("YOLOv8 license plate detector not available. Using only face detection.")
         
-        # Group overlapping detections using Non-Maximum Suppression
-        merged_detections = []
-        used_indices = set()
+            # YOLOv3 er fjernet - vi bruger kun YOLOv8
         
-        for i, detection1 in enumerate(all_detections):
-            if i in used_indices:
-                continue
-                
-            x1, y1, w1, h1 = detection1
-            merged_box = [x1, y1, w1, h1]
-            used_indices.add(i)
-            
-            for j, detection2 in enumerate(all_detections):
-                if j in used_indices or i == j:
-                    continue
-                    
-                x2, y2, w2, h2 = detection2
-                
-                # If IoU is high enough, merge the boxes
-                iou = compute_iou(detection1, detection2)
-                if iou > 0.3:  # Adjust threshold as needed
-                    # Create a bounding box that includes both detections
-                    merged_x = min(x1, x2)
-                    merged_y = min(y1, y2)
-                    merged_w = max(x1 + w1, x2 + w2) - merged_x
-                    merged_h = max(y1 + h1, y2 + h2) - merged_y
-                    
-                    merged_box = [merged_x, merged_y, merged_w, merged_h]
-                    used_indices.add(j)
-            
-            merged_detections.append(tuple(merged_box))
+            # Slå overlappende detektioner sammen (fx samme objekt fra tracker og detektor)
+            merged_detections = merge_overlapping_detections(all_detections, 0.3)
             
-        # Replace original detections with merged ones
-        final_detections_count = len(all_detections)
-        all_detections = merged_detections
+            # Replace original detections with merged ones
+            all_detections = merged_detections
         
-        # Print progress and detection count
-        if frame_count % 30 == 0 or len(all_detections) > 0:
-            print(f"Processing frame {frame_count}/{total_frames} - Found {len(all_detections)} regions to blur")
+            # Print progress and detection count (højst hvert PROGRESS_MIN_INTERVAL sekund)
+            if (frame_count % 30 == 0 or len(all_detections) > 0) and current_time - last_frame_log >= PROGRESS_MIN_INTERVAL:
+                last_frame_log = current_time
+                logger.debug("Processing frame %d/%d - Found %d regions to blur", frame_count, total_frames, len(all_detections))
             
-        # Set face detection counts for debug coloring
-        # Count YOLO face detections first (primary detector)
-        num_faces = 0
-        if 'yolo_face_detections' in locals():
-            num_faces += len(yolo_face_detections)
-        if 'adjusted_wrapped_detections' in locals() and yolov8_face_detector is not None:
-            num_faces += len(adjusted_wrapped_detections)
-            
-        # Add OpenCV DNN detections if YOLO wasn't used
-        if yolov8_face_detector is None and 'dnn_face_detections' in locals():
-            num_faces += len(dnn_face_detections)
-            if 'adjusted_wrapped_detections' in locals():
-                num_faces += len(adjusted_wrapped_detections)
-        
-        # Get number of detected license plates (from YOLO only)
-        num_plates = 0
-        if 'yolo_plates' in locals():
-            num_plates += len(yolo_plates)
-        if 'wrapped_yolo_plates' in locals():
-            num_plates += len(wrapped_yolo_plates)
+            # 4. Apply blur to all detected regions (padding og klipning for alle på én gang) -
+            # frames uden detektioner skrives direkte
+            regions = pad_detections(all_detections[:, :4], width, height).tolist() if len(all_detections) else []
+            region_boxes = [region[1:] for region in regions]
         
-        # 4. Apply blur to all detected regions
-        for i, (x, y, w, h) in enumerate(all_detections):
-            # Validate detection coordinates
-            if x < 0 or y < 0 or w <= 0 or h <= 0:
-                continue
-                
-            # Add padding around detection for better coverage
-            padding = int(w * 0.1)  # 10% padding
-            x_padded = max(0, x - padding)
-            y_padded = max(0, y - padding)
-            w_padded = min(width - x_padded, w + 2*padding)
-            h_padded = min(height - y_padded, h + 2*padding)
-            
-            # Check if coordinates are valid after padding
-            if w_padded <= 0 or h_padded <= 0:
-                continue
-                
-            # Extract region of interest
-            try:
-                roi = frame[y_padded:y_padded+h_padded, x_padded:x_padded+w_padded]
-                if roi.size == 0:  # Skip if ROI is empty
-                    continue
-                
-                # Adjust blur kernel size based on detection size
-                kernel_size = max(51, int(min(w_padded, h_padded) * 0.8))
-                # Make kernel size odd
-                kernel_size = kernel_size if kernel_size % 2 == 1 else kernel_size + 1
-                
-                # Apply heavy blur with improved algorithm
+            if use_composite_blur(frame.shape, region_boxes):
+                # Regionerne dækker det meste af framen: én sløring af hele framen og én maskeret skrivning (see composite_blur)
                 try:
-                    # Apply a stronger blur for better anonymization
-                    # Use a combination of Gaussian and median blur for better results
-                    if max(w_padded, h_padded) > 100:  # For larger areas
-                        # For larger areas, use a stronger blur
-                        blur1 = cv2.GaussianBlur(roi, (kernel_size, kernel_size), 30)
-                        blur2 = cv2.medianBlur(blur1, min(kernel_size, 99))  # MedianBlur kernel must be <= 99
-                        blur = cv2.GaussianBlur(blur2, (kernel_size, kernel_size), 30)
-                    else:
-                        # For smaller areas, use a simpler blur to avoid artifacts
-                        blur = cv2.GaussianBlur(roi, (kernel_size, kernel_size), 30)
-                    
+                    composite_blur(frame, region_boxes)
+                except Exception as e:
+                    logger.error("Error applying blur to %d regions: %s", len(regions), e)
+            else:
+                # ROI'erne er uafhængige og sløres parallelt (downscale, blur, upscale - see blur_roi).
+                # Trådene læser kun framen; resultaterne skrives tilbage her bagefter. CUDA-udgaven
+                # deler GpuMat og stream og køres derfor i denne tråd
+                blurred = map_in_threads(blur_roi, [frame[y:y+h, x:x+w] for _i, x, y, w, h in regions],
+                                         1 if OPENCV_CUDA_AVAILABLE else FRAME_THREADS)
+                for (i, x_padded, y_padded, w_padded, h_padded), blur in zip(regions, blurred):
+                    if isinstance(blur, Exception):
+                        logger.error("Error applying blur: %s, roi shape: %s", blur, (h_padded, w_padded))
+                        continue
+                
                     # Apply blur to the frame
                     frame[y_padded:y_padded+h_padded, x_padded:x_padded+w_padded] = blur
-                    
-                    # In debug mode, draw a colored box around the detected region
-                    if debug_mode:
-                        # Use different colors for different detection types
-                        if i < num_faces:  # Face detection (YOLO or DNN)
-                            color = (0, 0, 255)  # Red for face detections
-                        else:  # License plate detections
-                            color = (255, 0, 0)  # Blue for license plate detections
-                            
-                        cv2.rectangle(frame, (x_padded, y_padded), 
-                                    (x_padded+w_padded, y_padded+h_padded), color, 2)
-                except Exception as e:
-                    print(f"Error applying blur: {e}, roi shape: {roi.shape}, kernel: {kernel_size}")
-            except Exception as e:
-                print(f"Error extracting ROI for detection at ({x},{y}): {e}")
-
-        out.write(frame)
+        
+            # In debug mode, draw a colored box around the detected regions
+            if debug_mode:
+                for i, x_padded, y_padded, w_padded, h_padded in regions:
+                    # Farven følger detektionstypen, som sammenlægningen har bevaret (se DETECTION_COLORS)
+                    cv2.rectangle(frame, (x_padded, y_padded), 
+                                (x_padded+w_padded, y_padded+h_padded), DETECTION_COLORS[all_detections[i, 4]], 2)
 
-    cap.release()
-    out.release()
+            write_frame(frame)
+    finally:
+        # Stopper læse- og skrivetråden inden videoerne lukkes
+        try:
+            if frames is not None:
+                frames.close()
+            if finish_writing is not None:
+                finish_writing()
+        finally:
+            cap.release()
+            out.release()
     
     # Report finalization
     if job_id:
@@ -2648,13 +2199,13 @@ if __name__ == '__main__':
             print("2. Download YOLOv3 models and place them in 'models' as 'yolov3_lp.cfg' and 'yolov3_lp.weights'")
         
         # Get server configuration
-        host = app.config['HOST']
-        port = app.config['PORT']
-        debug = app.config['DEBUG']
+        host = SETTINGS.host
+        port = SETTINGS.port
+        debug = SETTINGS.debug
         
         # Check for CloudFlare configuration
-        cloudflare_enabled = config.getboolean('cloudflare', 'enabled', fallback=False)
-        cloudflare_hostname = config.get('cloudflare', 'hostname', fallback=None)
+        cloudflare_enabled = SETTINGS.cloudflare_enabled
+        cloudflare_hostname = SETTINGS.cloudflare_hostname
         
         if cloudflare_enabled and cloudflare_hostname:
             print(f"\nStarting server with CloudFlare Tunnel enabled")
@@ -8,25 +8,19 @@ Bruger multiprocessing til parallel behandling af videoframes.
 import os
 import sys
 import cv2
-import json
+import orjson
 import time
 import numpy as np
 import logging
 import argparse
+import shutil
+import subprocess
 import multiprocessing as mp
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count, shared_memory
 from pathlib import Path
+from fractions import Fraction
 import traceback
 
-# Forsøg at importere Ultralytics YOLO
-try:
-    from ultralytics import YOLO
-    ULTRALYTICS_AVAILABLE = True
-    print("Ultralytics YOLO detected and available.")
-except ImportError:
-    ULTRALYTICS_AVAILABLE = False
-    print("Ultralytics YOLO not available. Will use OpenCV DNN if possible.")
-
 # Konfiguration af logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,64 +29,117 @@ logging.basicConfig(
 )
 logger = logging.getLogger('blur360_worker')
 
+# Detektion, sløring og video-I/O deles med webappen
+from blur360_core import (
+    ULTRALYTICS_AVAILABLE, YOLO_IMGSZ,
+    DETECTION_FACE, DETECTION_PLATE, DETECTION_COLORS,
+    wrap_frames_for_detection, dnn_blob, adjust_coords_for_wrapped_detections,
+    blur_roi, pad_detections, use_composite_blur, composite_blur,
+    parse_dnn_detections, yolo_input, yolo_source, yolo_boxes_xywh,
+    label_detections, merge_overlapping_detections, load_yolo_model,
+    open_video_writer, open_video_capture,
+)
+
 # Standard stier
 UPLOAD_FOLDER = "uploads"
 PROCESSED_FOLDER = "processed"
 MODEL_FOLDER = "models"
 STATUS_FOLDER = "status"
 
+# Præfiks for statuslinjer på stdout - webappen læser dem direkte fra pipen
+STATUS_LINE_PREFIX = "@@STATUS "
+
 # Sikrer at alle nødvendige mapper findes
 for folder in [UPLOAD_FOLDER, PROCESSED_FOLDER, MODEL_FOLDER, STATUS_FOLDER]:
     os.makedirs(folder, exist_ok=True)
 
+# Mindste antal sekunder mellem to "processing"-opdateringer med samme fremskridt
+STATUS_MIN_INTERVAL = 0.5
+# Seneste (tidspunkt, fremskridt) der er sendt pr. job (se update_job_status)
+_last_status_update = {}
+
+# Mindste antal sekunder mellem to skrivninger af statusfilen for et job under behandling
+STATUS_FILE_INTERVAL = 2.0
+# Tidspunkt for seneste skrivning af statusfilen pr. job (se update_job_status)
+_last_status_file_write = {}
+
 # Funktion til at opdatere job status
-def update_job_status(job_id, progress, message, status="processing"):
-    """Opdaterer status for et job ved at skrive til en JSON-fil"""
+def update_job_status(job_id, progress, message, status="processing", details=None):
+    """
+    Opdaterer status for et job.
+
+    Statussen sendes som en linje på stdout, som webappen læser direkte, og
+    gemmes desuden i en JSON-fil så jobbet kan genoptages efter en genstart.
+    Begge dele serialiseres med orjson, da det sker ved hver batch.
+    Filen skrives til en midlertidig fil og omdøbes (os.replace), så læsere aldrig
+    ser en halvt skrevet fil. "processing"-opdateringer uden nyt fremskridt inden for
+    STATUS_MIN_INTERVAL springes over - nyt fremskridt og slutstatus sendes altid.
+    Webappen følger jobbet via stdout, så under behandling skrives filen højst hvert
+    STATUS_FILE_INTERVAL sekund; slutstatus skrives altid.
+
+    Args:
+        details: Valgfrit dict med nøgletal (fps, batch, frames, time) der sendes med
+    """
+    now = time.time()
+    last = _last_status_update.get(job_id)
+    if status == "processing" and last is not None and last[1] == progress and now - last[0] < STATUS_MIN_INTERVAL:
+        return
+    _last_status_update[job_id] = (now, progress)
+
     status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
     status_data = {
         "job_id": job_id,
         "progress": progress,
         "message": message,
         "status": status,
-        "timestamp": time.time()
+        "timestamp": now
     }
+    if details:
+        status_data.update(details)
     
+    # OPT_SERIALIZE_NUMPY: nøgletal kan være numpy-skalarer
+    status_json = orjson.dumps(status_data, option=orjson.OPT_SERIALIZE_NUMPY)
+    logger.info(f"Job {job_id}: {progress}% - {message}")
+    if status != "processing" or now - _last_status_file_write.get(job_id, 0) >= STATUS_FILE_INTERVAL:
+        _last_status_file_write[job_id] = now
+        try:
+            tmp_file = status_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(status_json)
+            os.replace(tmp_file, status_file)
+        except Exception as e:
+            logger.error(f"Error updating job status: {e}")
+
+    # Udsendes efter filen er skrevet, så webappen kan rydde filen op ved slutstatus
     try:
-        with open(status_file, 'w') as f:
-            json.dump(status_data, f)
-        logger.info(f"Job {job_id}: {progress}% - {message}")
+        print(STATUS_LINE_PREFIX + status_json.decode(), flush=True)
     except Exception as e:
-        logger.error(f"Error updating job status: {e}")
+        logger.error(f"Error publishing job status: {e}")
 
-# Funktion til at håndtere wrap-around detektion for 360° billeder
-def wrap_frame_for_detection(frame):
-    """
-    Tilføjer wrap-around-padding i siderne af et equirectangular 360°-billede.
-    Dette forbedrer detektion nær venstre og højre kant.
-    """
-    height, width = frame.shape[:2]
-    pad_w = width // 4  # 25% padding
-
-    left = frame[:, -pad_w:]   # Sidste 25%
-    right = frame[:, :pad_w]   # Første 25%
-    wrapped = np.hstack([left, frame, right])
 
-    return wrapped, pad_w
+# YOLO-modeller indlæst i denne proces, pr. vægtfil (se get_yolo_model)
+_yolo_models = {}
 
-def adjust_coords_for_wrapped_detections(detections, pad_w, original_width):
+def get_yolo_model(weights_path):
     """
-    Justerer koordinater fra wrap'et billede tilbage til originalt koordinatsystem.
-    Filtrerer samtidig dem der falder helt uden for det oprindelige billede.
+    Returnerer YOLO-modellen for weights_path og indlæser den kun første gang
+    (se load_yolo_model for valg af TensorRT-engine/FP16 og opvarmning).
     """
-    adjusted = []
-    for (x, y, w, h) in detections:
-        x -= pad_w  # Justér X-koordinat
-        if x + w < 0 or x > original_width:
-            continue  # Uden for billedet
-        x = max(0, x)
-        w = min(original_width - x, w)
-        adjusted.append((x, y, w, h))
-    return adjusted
+    weights_path = Path(weights_path)
+    model = _yolo_models.get(weights_path)
+    if model is None:
+        model = _yolo_models[weights_path] = load_yolo_model(weights_path)
+    return model
+
+# Detektionsmodeller indlæst i denne proces (se get_dnn_models)
+_dnn_models = None
+
+def get_dnn_models():
+    """Returnerer detektionsmodellerne for denne proces og indlæser dem kun første gang."""
+    global _dnn_models
+    if _dnn_models is None:
+        _dnn_models = load_dnn_models()
+    return _dnn_models
 
 def load_dnn_models():
     """Load DNN-based detector models if available"""
@@ -116,7 +163,7 @@ def load_dnn_models():
     if ULTRALYTICS_AVAILABLE and yolov8_face_path.exists():
         try:
             # Load YOLOv8 face model
-            yolo_face_model = YOLO(str(yolov8_face_path))
+            yolo_face_model = get_yolo_model(yolov8_face_path)
             models["yolov8_face_detector"] = yolo_face_model
             models["detector_types"]["face"] = "YOLOv8"
             logger.info("Loaded YOLOv8 face detector (Ultralytics)")
@@ -146,7 +193,7 @@ def load_dnn_models():
     if ULTRALYTICS_AVAILABLE and yolov8_model_path.exists():
         try:
             # Load YOLOv8 license plate model
-            yolo_model = YOLO(str(yolov8_model_path))
+            yolo_model = get_yolo_model(yolov8_model_path)
             models["yolov8_plate_detector"] = yolo_model
             models["detector_types"]["plate"] = "YOLOv8"
             logger.info("Loaded YOLOv8 license plate detector (Ultralytics)")
@@ -167,48 +214,51 @@ def load_dnn_models():
         
     return models
 
-def compute_iou(box1, box2):
-    """Compute Intersection over Union between two boxes"""
-    x1, y1, w1, h1 = box1
-    x2, y2, w2, h2 = box2
-    
-    # Calculate intersection coordinates
-    xx1 = max(x1, x2)
-    yy1 = max(y1, y2)
-    xx2 = min(x1 + w1, x2 + w2)
-    yy2 = min(y1 + h1, y2 + h2)
-    
-    # Check if there is an intersection
-    if xx2 < xx1 or yy2 < yy1:
-        return 0.0
-        
-    # Calculate areas
-    intersection_area = (xx2 - xx1) * (yy2 - yy1)
-    box1_area = w1 * h1
-    box2_area = w2 * h2
-    union_area = box1_area + box2_area - intersection_area
-    
-    # Return IoU
-    return intersection_area / union_area if union_area > 0 else 0.0
 
-def detect_objects(frame, frame_info, models, debug_mode=False):
+def detect_objects(frames, frame_infos, models, debug_mode=False):
     """
-    Detecterer ansigter og nummerplader i en frame
+    Detecterer ansigter og nummerplader i en række frames
+    
+    Alle frames og deres wrapped udgaver sendes til hver detektor i ét batch, så
+    GPU'en får ét stort forward pass i stedet for to pr. frame.
     
     Args:
-        frame: Billedet der skal analyseres
-        frame_info: Dict med info om framen (index, width, height)
+        frames: Liste af billeder der skal analyseres
+        frame_infos: Dict med info om hver frame (index, width, height)
         models: Loaded detection models
         debug_mode: Om debug-visning skal aktiveres
         
     Returns:
-        List af detektioner i format (x, y, w, h)
+        Liste med ét (M,5)-array af detektioner (x, y, w, h, type_id) pr. frame
     """
-    all_detections = []
+    count = len(frames)
+    all_detections = [[] for _ in range(count)]
     
-    # Tilføj wrap-around padding til billedet for bedre kantdetektion
-    wrapped_frame, pad_w = wrap_frame_for_detection(frame)
-    original_width = frame.shape[1]
+    # Tilføj wrap-around padding til billederne for bedre kantdetektion (genbrugte buffere)
+    wrapped_frames, pad_w = wrap_frames_for_detection(frames)
+    original_width = frames[0].shape[1]
+    
+    # YOLO får nedskalerede kopier (længste side YOLO_IMGSZ), så kun de små billeder
+    # kopieres til GPU'en - alle frames har samme størrelse og dermed samme skala
+    yolo_frames = []
+    yolo_scales = []
+    if models["yolov8_face_detector"] is not None or models["yolov8_plate_detector"] is not None:
+        for image in frames + wrapped_frames:
+            small, scale = yolo_input(image)
+            yolo_frames.append(small)
+            yolo_scales.append(scale)
+    
+    def add_yolo_results(results, type_id):
+        # Første halvdel er de originale frames, anden halvdel de wrapped
+        for k in range(count):
+            boxes, _ = yolo_boxes_xywh(results[k], yolo_scales[k])
+            all_detections[k].append(label_detections(boxes, type_id))
+            
+            wrapped_boxes, _ = yolo_boxes_xywh(results[count + k], yolo_scales[count + k])
+            # Juster koordinater for wrapped frame detektioner
+            all_detections[k].append(label_detections(adjust_coords_for_wrapped_detections(
+                wrapped_boxes, pad_w, original_width
+            ), type_id))
     
     # ANSIGTSDETEKTERING
     
@@ -217,128 +267,46 @@ def detect_objects(frame, frame_info, models, debug_mode=False):
     
     if yolov8_face_detector is not None:
         try:
-            # Kør YOLOv8 på original frame
-            results = yolov8_face_detector(frame, conf=0.35, verbose=False)  # Lavere confidence for flere detektioner
-            
-            for result in results:
-                for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):
-                    x1, y1, x2, y2 = box[:4]
-                    # Konverter til x, y, w, h format
-                    x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                    all_detections.append((x, y, w, h))
-                    
-            # Kør også YOLOv8 på wrapped frame for at fange ansigter ved kanterne
-            wrapped_results = yolov8_face_detector(wrapped_frame, conf=0.35, verbose=False)
-            wrapped_detections = []
-            
-            for result in wrapped_results:
-                for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):
-                    x1, y1, x2, y2 = box[:4]
-                    # Konverter til x, y, w, h format
-                    x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                    wrapped_detections.append((x, y, w, h))
-                    
-            # Juster koordinater for wrapped frame detektioner
-            adjusted_wrapped_detections = adjust_coords_for_wrapped_detections(
-                wrapped_detections, pad_w, original_width
-            )
-            
-            # Tilføj de justerede wrapped detektioner
-            all_detections.extend(adjusted_wrapped_detections)
+            # Kør YOLOv8 på originale og wrapped frames (fanger ansigter ved kanterne) i ét
+            # batch - Ultralytics letterboxer alle til samme størrelse, så det er ét forward pass
+            add_yolo_results(yolov8_face_detector(
+                yolo_source(yolov8_face_detector, yolo_frames), imgsz=YOLO_IMGSZ, conf=0.35, verbose=False  # Lavere confidence for flere detektioner
+            ), DETECTION_FACE)
             
         except Exception as e:
             logger.error(f"Error in YOLOv8 face detection: {e}")
             # Fall back to OpenCV DNN face detector if available
             yolov8_face_detector = None
+            all_detections = [[] for _ in range(count)]
     
     # Fall back to OpenCV DNN if YOLO is not available
     dnn_face_detector = models["face_detector"]
     if yolov8_face_detector is None and dnn_face_detector is not None:
         try:
-            # Process at multiple scales for better detection
-            scales = [1.0, 0.75, 1.25]
-            height, width = frame.shape[:2]
-            
-            for scale in scales:
-                current_height = int(height * scale)
-                current_width = int(width * scale)
-                
-                # Skip invalid scales
-                if current_height <= 0 or current_width <= 0:
-                    continue
-                
-                # Resize frame for current scale
-                resized_frame = cv2.resize(frame, (current_width, current_height))
-                
-                # Prepare image for DNN
-                blob = cv2.dnn.blobFromImage(
-                    cv2.resize(resized_frame, (300, 300)), 
-                    1.0, (300, 300), 
-                    (104.0, 177.0, 123.0),
-                    swapRB=False
-                )
+            # Netværkets input er altid 300x300 - alle frames (og bagefter alle wrapped
+            # frames) samles i ét batch i en genbrugt blob-buffer
+            height, width = frames[0].shape[:2]
+            for images, size, wrapped in ((frames, (width, height), False),
+                                          (wrapped_frames, wrapped_frames[0].shape[1::-1], True)):
+                blob = dnn_blob(images)
                 
                 dnn_face_detector.setInput(blob)
                 detections = dnn_face_detector.forward()
+                # Første kolonne er billedets plads i batchet
+                candidates = detections[0, 0]
                 
-                # Process DNN detections
-                for i in range(0, detections.shape[2]):
-                    confidence = detections[0, 0, i, 2]
-                    if confidence > 0.4:  # Confidence threshold
-                        box = detections[0, 0, i, 3:7] * np.array([current_width, current_height, current_width, current_height])
-                        (startX, startY, endX, endY) = box.astype("int")
-                        
-                        # Scale back to original dimensions
-                        startX = int(startX / scale)
-                        startY = int(startY / scale)
-                        endX = int(endX / scale)
-                        endY = int(endY / scale)
-                        
-                        # Ensure coordinates are within bounds
-                        startX = max(0, startX)
-                        startY = max(0, startY)
-                        endX = min(width, endX)
-                        endY = min(height, endY)
-                        
-                        # Skip invalid detections
-                        if startX >= endX or startY >= endY:
-                            continue
-                            
-                        # Convert to x, y, w, h format
-                        x, y, w, h = startX, startY, endX - startX, endY - startY
-                        all_detections.append((x, y, w, h))
-                
-            # Also process wrapped frame
-            wrapped_blob = cv2.dnn.blobFromImage(
-                cv2.resize(wrapped_frame, (300, 300)), 
-                1.0, (300, 300), 
-                (104.0, 177.0, 123.0),
-                swapRB=False
-            )
-            
-            dnn_face_detector.setInput(wrapped_blob)
-            wrapped_detections = dnn_face_detector.forward()
-            
-            # Process wrapped frame detections
-            dnn_wrapped_detections = []
-            for i in range(0, wrapped_detections.shape[2]):
-                confidence = wrapped_detections[0, 0, i, 2]
-                if confidence > 0.4:
-                    box = wrapped_detections[0, 0, i, 3:7] * np.array([300, 300, 300, 300])
-                    box = box * np.array([wrapped_frame.shape[1]/300, wrapped_frame.shape[0]/300, 
-                                         wrapped_frame.shape[1]/300, wrapped_frame.shape[0]/300])
-                    
-                    (startX, startY, endX, endY) = box.astype("int")
-                    x, y, w, h = startX, startY, endX - startX, endY - startY
-                    dnn_wrapped_detections.append((x, y, w, h))
-            
-            # Adjust coordinates for wrapped detections
-            adjusted_wrapped_detections = adjust_coords_for_wrapped_detections(
-                dnn_wrapped_detections, pad_w, original_width
-            )
-            
-            # Add to all detections
-            all_detections.extend(adjusted_wrapped_detections)
+                for k in range(count):
+                    own = candidates[candidates[:, 0] == k][None, None]
+                    if wrapped:
+                        boxes, _ = parse_dnn_detections(own, size[0], size[1], 0.4)
+                        # Adjust coordinates for wrapped detections
+                        all_detections[k].append(label_detections(adjust_coords_for_wrapped_detections(
+                            boxes, pad_w, original_width
+                        ), DETECTION_FACE))
+                    else:
+                        # Process DNN detections - klippet til billedet
+                        boxes, _ = parse_dnn_detections(own, width, height, 0.4, 1.0, (width, height))
+                        all_detections[k].append(label_detections(boxes, DETECTION_FACE))
             
         except Exception as e:
             logger.error(f"Error in OpenCV DNN face detection: {e}")
@@ -349,184 +317,301 @@ def detect_objects(frame, frame_info, models, debug_mode=False):
     yolov8_plate_detector = models["yolov8_plate_detector"]
     if yolov8_plate_detector is not None:
         try:
-            # Run YOLOv8 detection on both original and wrapped frames
-            yolo_results = yolov8_plate_detector(frame, conf=0.55)  # High confidence for fewer false positives
-            
-            # Process results from original frame
-            for result in yolo_results:
-                for box in result.boxes.xyxy.cpu().numpy():
-                    x1, y1, x2, y2 = box[:4]
-                    # Convert to xywh format
-                    x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                    all_detections.append((x, y, w, h))
-            
-            # Process wrapped frame
-            wrapped_yolo_results = yolov8_plate_detector(wrapped_frame, conf=0.55)
-            wrapped_yolo_plates = []
-            
-            for result in wrapped_yolo_results:
-                for box in result.boxes.xyxy.cpu().numpy():
-                    x1, y1, x2, y2 = box[:4]
-                    # Convert to xywh format
-                    x, y, w, h = int(x1), int(y1), int(x2-x1), int(y2-y1)
-                    wrapped_yolo_plates.append((x, y, w, h))
-            
-            # Adjust coordinates for wrapped detections
-            adjusted_wrapped_plates = adjust_coords_for_wrapped_detections(
-                wrapped_yolo_plates, pad_w, original_width
-            )
-            
-            # Add to detections
-            all_detections.extend(adjusted_wrapped_plates)
+            # Run YOLOv8 detection on all original and wrapped frames in one batched call
+            add_yolo_results(yolov8_plate_detector(
+                yolo_source(yolov8_plate_detector, yolo_frames), imgsz=YOLO_IMGSZ, conf=0.55  # High confidence for fewer false positives
+            ), DETECTION_PLATE)
             
         except Exception as e:
             logger.error(f"Error in YOLOv8 license plate detection: {e}")
     
-    # Apply Non-Maximum Suppression to merge overlapping detections
-    merged_detections = []
-    used_indices = set()
-    
-    for i, detection1 in enumerate(all_detections):
-        if i in used_indices:
-            continue
-            
-        x1, y1, w1, h1 = detection1
-        merged_box = [x1, y1, w1, h1]
-        used_indices.add(i)
-        
-        for j, detection2 in enumerate(all_detections):
-            if j in used_indices or i == j:
-                continue
-                
-            x2, y2, w2, h2 = detection2
-            
-            # If IoU is high enough, merge the boxes
-            iou = compute_iou(detection1, detection2)
-            if iou > 0.3:  # Overlap threshold
-                # Create a bounding box that includes both detections
-                merged_x = min(x1, x2)
-                merged_y = min(y1, y2)
-                merged_w = max(x1 + w1, x2 + w2) - merged_x
-                merged_h = max(y1 + h1, y2 + h2) - merged_y
-                
-                merged_box = [merged_x, merged_y, merged_w, merged_h]
-                used_indices.add(j)
-        
-        merged_detections.append(tuple(merged_box))
+    # Slå overlappende detektioner sammen (fx samme ansigt fundet i original og wrapped frame)
+    merged_detections = [merge_overlapping_detections(dets, 0.3) for dets in all_detections]
     
     # Debug info
-    if len(merged_detections) > 0:
-        logger.debug(f"Frame {frame_info['index']}: Found {len(merged_detections)} objects to blur")
+    for frame_info, merged in zip(frame_infos, merged_detections):
+        if len(merged) > 0:
+            logger.debug("Frame %d: Found %d objects to blur", frame_info['index'], len(merged))
     
     return merged_detections
 
-def process_frame(args):
+def blur_detections(frame, detections, debug_mode=False):
+    """Slør detektionerne ((M,5)-array med (x, y, w, h, type_id)) direkte i frame."""
+    if len(detections) == 0:
+        return
+    
+    # Padding og klipning for alle detektioner på én gang
+    padded = pad_detections(detections[:, :4], frame.shape[1], frame.shape[0])
+    regions = padded[:, 1:].tolist()
+    
+    if use_composite_blur(frame.shape, regions):
+        # Regionerne dækker det meste af framen: én sløring af hele framen og én maskeret skrivning (see composite_blur)
+        try:
+            composite_blur(frame, regions)
+        except Exception as e:
+            logger.error(f"Error applying blur to {len(regions)} regions: {e}")
+    else:
+        for x_padded, y_padded, w_padded, h_padded in regions:
+            roi = frame[y_padded:y_padded+h_padded, x_padded:x_padded+w_padded]
+            # Apply heavy blur (downscale, blur, upscale - see blur_roi)
+            try:
+                frame[y_padded:y_padded+h_padded, x_padded:x_padded+w_padded] = blur_roi(roi)
+            except Exception as e:
+                logger.error(f"Error applying blur: {e}, roi shape: {roi.shape}")
+    
+    # In debug mode, draw a colored box around the detected regions
+    if debug_mode:
+        for i, x_padded, y_padded, w_padded, h_padded in padded.tolist():
+            # Farven følger detektionstypen, som sammenlægningen har bevaret (se DETECTION_COLORS)
+            cv2.rectangle(frame, (x_padded, y_padded), 
+                        (x_padded+w_padded, y_padded+h_padded), DETECTION_COLORS[detections[i, 4]], 2)
+
+# Antal på hinanden følgende frames der detekteres i ét batch pr. opgave
+DETECTION_BATCH_SIZE = 8
+
+# Antal batches der er sendt til Pool'en ad gangen - mens én batch skrives til videoen,
+# arbejder processerne allerede på den næste (se process_video)
+PIPELINED_BATCHES = 2
+
+def init_pool_worker(use_dnn=True):
+    """
+    Initialiserer en worker-process: OpenCV må kun bruge én tråd, da Pool'en allerede
+    kører én process pr. kerne - ellers konkurrerer OpenCV's egne tråde om de samme kerner.
+    Detektionsmodellerne indlæses her én gang pr. process (se get_dnn_models), og Pool'en
+    lever hele videoen, så vægte og CUDA-kontekst ikke indlæses igen for hver batch.
+    """
+    cv2.setNumThreads(1)
+    if use_dnn:
+        get_dnn_models()
+
+# Frames sendes fra worker-processerne til hovedprocessen gennem delt hukommelse (se
+# FrameSlots). Blokkene oprettes kun hvis /dev/shm har god plads til dem - en for lille
+# /dev/shm (fx Dockers standard på 64 MB) giver ellers SIGBUS når der skrives i blokken
+SHM_FOLDER = "/dev/shm"
+
+class FrameSlots:
+    """
+    Blokke delt hukommelse med plads til én opgaves frames hver (shape er
+    (DETECTION_BATCH_SIZE, højde, bredde, 3)). Worker-processerne dekoder og slører
+    framesne direkte i blokken, og hovedprocessen skriver dem til videoen derfra, så
+    framesne hverken pickles eller kopieres mellem processerne.
+
+    Er der ikke plads (eller ingen /dev/shm, fx på Windows), oprettes ingen blokke, og
+    slot() returnerer None - så sendes framesne tilbage som før.
+    """
+
+    def __init__(self, count, shape):
+        self.shape = shape
+        self.blocks = []
+        self.views = []
+        nbytes = int(np.prod(shape))
+        try:
+            if shutil.disk_usage(SHM_FOLDER).free < 2 * count * nbytes:
+                logger.info("Not enough shared memory for frame transfer - returning frames via pickling")
+                return
+            for _ in range(count):
+                shm = shared_memory.SharedMemory(create=True, size=nbytes)
+                self.blocks.append(shm)
+                self.views.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+        except OSError as e:
+            logger.info(f"Shared memory not available for frame transfer ({e}) - returning frames via pickling")
+            self.close()
+
+    def slot(self, i):
+        """(navn, shape) for blok nummer i (rundt), eller None uden delt hukommelse."""
+        if not self.blocks:
+            return None
+        return self.blocks[i % len(self.blocks)].name, self.shape
+
+    def view(self, i):
+        return self.views[i % len(self.views)]
+
+    def close(self):
+        self.views = []
+        for shm in self.blocks:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # Et view lever stadig (fx i en traceback) - unlink frigiver blokken alligevel
+            shm.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Blokke delt hukommelse som denne worker-process har åbnet, pr. navn (se frame_slot_view)
+_attached_frame_slots = {}
+
+def frame_slot_view(name, shape):
+    """Returnerer blokken `name` fra FrameSlots som et array og åbner den kun første gang."""
+    slot = _attached_frame_slots.get(name)
+    if slot is None:
+        shm = shared_memory.SharedMemory(name=name)
+        slot = _attached_frame_slots[name] = (shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+    return slot[1]
+
+# Højst så mange frames springes frem med grab() i stedet for en søgning - en søgning
+# dekoder alligevel fra nærmeste keyframe, så korte spring er billigere sekventielt
+MAX_GRAB_AHEAD = 64
+
+# Denne worker-process' åbne inputvideo som (sti, capture, index på næste frame) - se capture_at
+_open_capture = None
+
+def capture_at(input_path, index):
+    """
+    Returnerer en capture for input_path hvis næste frame er index. Videoen holdes åben
+    mellem opgaverne i processen, og ligger index kort foran den nuværende position,
+    springes der frem med grab() (uden at hente framesne ud) i stedet for at søge med
+    CAP_PROP_POS_FRAMES.
+    """
+    global _open_capture
+    if _open_capture is not None and _open_capture[0] != input_path:
+        release_capture()
+    if _open_capture is None:
+        # Hardware-dekodning hvis muligt - se open_video_capture
+        cap = open_video_capture(input_path)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video: {input_path}")
+        _open_capture = (input_path, cap, 0)
+    _, cap, position = _open_capture
+    if 0 <= index - position <= MAX_GRAB_AHEAD:
+        for _ in range(index - position):
+            if not cap.grab():
+                raise IOError(f"Failed to skip to frame {index} in video")
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    _open_capture = (input_path, cap, index)
+    return cap
+
+def advance_capture(count):
+    """Registrerer at count frames er læst fra capturen fra capture_at."""
+    global _open_capture
+    path, cap, position = _open_capture
+    _open_capture = (path, cap, position + count)
+
+def release_capture():
+    """Lukker capturen fra capture_at, fx efter en læsefejl hvor positionen er ukendt."""
+    global _open_capture
+    if _open_capture is not None:
+        _open_capture[1].release()
+        _open_capture = None
+
+def process_frames(args):
     """
-    Processer en enkelt frame med detektion og sløring.
+    Processer en række på hinanden følgende frames med detektion og sløring.
     Designet til at køres i parallelle processer.
     
+    Videoen holdes åben i processen og spoles kun frem én gang pr. opgave (se capture_at),
+    hvorefter framesne læses sekventielt og detekteres samlet (se detect_objects).
+    
     Args:
-        args: Tuple med (frame_info, input_path, output_path, job_id, models, debug_mode)
+        args: Tuple med (frame_infos, input_path, job_id, use_dnn, debug_mode, slot), hvor
+              slot er (navn, shape) for en blok fra FrameSlots eller None
         
     Returns:
-        Dict med frame index og status
+        Liste med et dict med frame index og status pr. frame. Framesne ligger i blokken
+        i samme rækkefølge - uden blok (eller hvis en frame ikke passede i den) sendes den
+        slørede frame med under "frame"
     """
-    frame_info, input_path, output_path, job_id, models_data, debug_mode = args
+    frame_infos, input_path, job_id, use_dnn, debug_mode, slot = args
     
     try:
-        # Læs model data fra disk (deles ikke direkte mellem processer)
-        if isinstance(models_data, str):
-            with open(models_data, 'r') as f:
-                model_paths = json.load(f)
-                
-            # Genindlæs modeller i hver proces
-            models = load_dnn_models()
-        else:
-            models = models_data
+        # Modellerne er indlæst af init_pool_worker i denne proces
+        models = get_dnn_models() if use_dnn else None
         
-        # Åbn video
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
-            raise IOError(f"Cannot open video: {input_path}")
-            
-        # Gå til den rette frame
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_info['index'])
-        success, frame = cap.read()
-        
-        if not success:
-            raise IOError(f"Failed to read frame {frame_info['index']} from video")
-            
-        # Detecter objekter
-        detections = detect_objects(frame, frame_info, models, debug_mode)
-        
-        # Slør detektioner
-        for i, (x, y, w, h) in enumerate(detections):
-            # Validate detection coordinates
-            if x < 0 or y < 0 or w <= 0 or h <= 0:
-                continue
-                
-            # Add padding around detection for better coverage
-            padding = int(w * 0.1)  # 10% padding
-            x_padded = max(0, x - padding)
-            y_padded = max(0, y - padding)
-            w_padded = min(frame.shape[1] - x_padded, w + 2*padding)
-            h_padded = min(frame.shape[0] - y_padded, h + 2*padding)
-            
-            # Check if coordinates are valid after padding
-            if w_padded <= 0 or h_padded <= 0:
-                continue
-                
-            # Extract region of interest
-            try:
-                roi = frame[y_padded:y_padded+h_padded, x_padded:x_padded+w_padded]
-                if roi.size == 0:  # Skip if ROI is empty
-                    continue
-                
-                # Adjust blur kernel size based on detection size
-                kernel_size = max(51, int(min(w_padded, h_padded) * 0.8))
-                # Make kernel size odd
-                kernel_size = kernel_size if kernel_size % 2 == 1 else kernel_size + 1
-                
-                # Apply heavy blur with improved algorithm
-                try:
-                    # Use a combination of Gaussian and median blur for better results
-                    if max(w_padded, h_padded) > 100:  # For larger areas
-                        # For larger areas, use a stronger blur
-                        blur1 = cv2.GaussianBlur(roi, (kernel_size, kernel_size), 30)
-                        blur2 = cv2.medianBlur(blur1, min(kernel_size, 99))  # MedianBlur kernel must be <= 99
-                        blur = cv2.GaussianBlur(blur2, (kernel_size, kernel_size), 30)
-                    else:
-                        # For smaller areas, use a simpler blur to avoid artifacts
-                        blur = cv2.GaussianBlur(roi, (kernel_size, kernel_size), 30)
-                    
-                    # Apply blur to the frame
-                    frame[y_padded:y_padded+h_padded, x_padded:x_padded+w_padded] = blur
-                    
-                    # In debug mode, draw a colored box around the detected region
-                    if debug_mode:
-                        cv2.rectangle(frame, (x_padded, y_padded), 
-                                    (x_padded+w_padded, y_padded+h_padded), (0, 0, 255), 2)
-                except Exception as e:
-                    logger.error(f"Error applying blur: {e}, roi shape: {roi.shape}, kernel: {kernel_size}")
-            except Exception as e:
-                logger.error(f"Error extracting ROI for detection at ({x},{y}): {e}")
-        
-        # Gem den behandlede frame
-        frame_output_path = os.path.join(output_path, f"frame_{frame_info['index']:06d}.jpg")
-        cv2.imwrite(frame_output_path, frame)
-        
-        # Ryd op
-        cap.release()
-        
-        return {"index": frame_info['index'], "status": "success"}
+        # Gå til den første frame - resten læses i rækkefølge
+        try:
+            cap = capture_at(input_path, frame_infos[0]['index'])
+            buffer = frame_slot_view(*slot) if slot is not None else None
+            frames = []
+            for k, frame_info in enumerate(frame_infos):
+                # Med en blok dekodes framen direkte ind i den delte hukommelse
+                success, frame = cap.read(buffer[k]) if buffer is not None else cap.read()
+                if not success:
+                    raise IOError(f"Failed to read frame {frame_info['index']} from video")
+                frames.append(frame)
+        except Exception:
+            release_capture()
+            raise
+        advance_capture(len(frames))
+            
+        # Detecter objekter i alle frames på én gang - hver frame detekteres selv, så et
+        # lille objekt i bevægelse aldrig får en tidligere frames bokse
+        all_detections = detect_objects(frames, frame_infos, models, debug_mode)
+        
+        for frame, detections in zip(frames, all_detections):
+            # Slør detektioner
+            blur_detections(frame, detections, debug_mode)
+        
+        # Framesne går til hovedprocessen via blokken (eller pickles med tilbage) i stedet for
+        # via JPEG-filer på disken. VideoCapture kan have allokeret en ny frame, hvis
+        # størrelsen ikke passede til blokken - den sendes så med
+        results = []
+        for k, (frame_info, frame) in enumerate(zip(frame_infos, frames)):
+            result = {"index": frame_info['index'], "status": "success"}
+            if buffer is None or frame.ctypes.data != buffer[k].ctypes.data:
+                result["frame"] = frame
+            results.append(result)
+        return results
         
     except Exception as e:
-        logger.error(f"Error processing frame {frame_info['index']}: {e}")
+        logger.error(f"Error processing frames {frame_infos[0]['index']}-{frame_infos[-1]['index']}: {e}")
         logger.error(traceback.format_exc())
-        return {"index": frame_info['index'], "status": "error", "error": str(e)}
+        return [{"index": frame_info['index'], "status": "error", "error": str(e)} for frame_info in frame_infos]
+
+# ffprobe (fra ffmpeg) læser kun containerens metadata - bruges hvis det er installeret
+FFPROBE_PATH = shutil.which("ffprobe")
+
+
+def probe_video_info(input_path):
+    """
+    Læser bredde, højde, FPS, antal frames og codec med ét ffprobe-kald uden at åbne en decoder.
+
+    Returns:
+        Dict som extract_video_info, eller None hvis ffprobe mangler eller ikke kender antallet af frames
+    """
+    if FFPROBE_PATH is None:
+        return None
+    try:
+        result = subprocess.run(
+            [FFPROBE_PATH, "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height,avg_frame_rate,r_frame_rate,nb_frames,codec_tag_string",
+             "-of", "json", input_path],
+            capture_output=True, timeout=30, check=True
+        )
+        stream = orjson.loads(result.stdout)["streams"][0]
+        rate = stream.get("avg_frame_rate", "0/0")
+        if rate.endswith("/0"):
+            rate = stream.get("r_frame_rate", "0/0")
+        fps = float(Fraction(rate)) if not rate.endswith("/0") else 0.0
+        # Uden nb_frames (fx nogle MKV-filer) er antallet kun et skøn - så bruges OpenCV
+        frame_count = int(stream["nb_frames"])
+        width = int(stream["width"])
+        height = int(stream["height"])
+    except (OSError, subprocess.SubprocessError, orjson.JSONDecodeError, KeyError, IndexError, ValueError, ZeroDivisionError) as e:
+        logger.debug(f"ffprobe could not read {input_path}: {e}")
+        return None
+
+    duration_sec = frame_count / fps if fps > 0 else 0
+    return {
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "frame_count": frame_count,
+        "fourcc": stream.get("codec_tag_string", "")[:4],
+        "duration": duration_sec,
+        "duration_formatted": f"{int(duration_sec // 60)}:{int(duration_sec % 60):02d}"
+    }
 
 def extract_video_info(input_path):
     """Extract video information"""
+    info = probe_video_info(input_path)
+    if info is not None:
+        return info
+
     cap = cv2.VideoCapture(input_path)
     if not cap.isOpened():
         raise IOError(f"Cannot open video: {input_path}")
@@ -573,18 +658,14 @@ def process_video(job_id, input_path, output_path, debug_mode=False, use_dnn=Tru
     update_job_status(job_id, 5, "Analyzing video", "processing")
     
     try:
-        # Opret output mappe
-        frames_dir = os.path.join(PROCESSED_FOLDER, f"{job_id}_frames")
-        os.makedirs(frames_dir, exist_ok=True)
-        
         # Hent video information
         video_info = extract_video_info(input_path)
         logger.info(f"Video: {video_info['width']}x{video_info['height']} pixels, {video_info['fps']} FPS, {video_info['frame_count']} frames")
         update_job_status(job_id, 10, f"Video loaded: {video_info['width']}x{video_info['height']}, {video_info['duration_formatted']} duration")
         
         # Indlæs detektionsmodeller
+        # Modellerne indlæses i worker-processerne (se init_pool_worker)
         update_job_status(job_id, 15, "Loading detection models", "processing")
-        models = load_dnn_models() if use_dnn else None
         
         # Opret frameliste til parallel processering
         frames = []
@@ -631,146 +712,147 @@ def process_video(job_id, input_path, output_path, debug_mode=False, use_dnn=Tru
         frame_batches = [frames[i:i+batch_size] for i in range(0, len(frames), batch_size)]
         logger.info(f"Split processing into {len(frame_batches)} batches with ~{batch_size} frames each")
         
-        # Gennemløb hver batch
-        total_processed = 0
-        
-        for batch_idx, batch in enumerate(frame_batches):
-            batch_start = time.time()
-            logger.info(f"Processing batch {batch_idx+1}/{len(frame_batches)} ({len(batch)} frames)")
-            update_job_status(
-                job_id, 
-                15 + int(80 * total_processed / video_info['frame_count']),
-                f"Processing frames {total_processed+1}-{total_processed+len(batch)} of {video_info['frame_count']}", 
-                "processing"
-            )
-            
-            # Opret argumenter til hver process
-            process_args = []
-            for frame_info in batch:
-                process_args.append((frame_info, input_path, frames_dir, job_id, models, debug_mode))
-            
-            # Kør parallel processering med multiprocessing
-            with Pool(processes=num_processes) as pool:
-                results = pool.map(process_frame, process_args)
-            
-            # Tjek resultater
-            success_count = sum(1 for r in results if r['status'] == 'success')
-            error_count = sum(1 for r in results if r['status'] == 'error')
-            logger.info(f"Batch {batch_idx+1} complete: {success_count} successes, {error_count} errors")
-            
-            # Opdater total
-            total_processed += len(batch)
-            
-            # Beregn tid og fremskridt
-            batch_time = time.time() - batch_start
-            frames_per_second = len(batch) / batch_time if batch_time > 0 else 0
-            progress = int(15 + 80 * total_processed / video_info['frame_count'])
+        # Opret writer (ffmpeg, H.264 eller mp4v - se open_video_writer). Framesne skrives i
+        # rækkefølge efterhånden som opgaverne bliver færdige
+        out = open_video_writer(output_path, video_info['fps'], (video_info['width'], video_info['height']))
+        # Writeren lukkes også hvis poolen eller en detektion fejler, så ffmpeg-processen
+        # ikke efterlades med en halvt skrevet video (se FFmpegWriter)
+        try:
+            blank_frame = None
+        
+            # Gennemløb hver batch
+            total_processed = 0
+        
+            # Delt hukommelse til én opgave pr. plads for PIPELINED_BATCHES batches - en batch
+            # sendes først af sted når batchen der brugte de samme pladser er skrevet færdig
+            tasks_per_batch = -(-batch_size // DETECTION_BATCH_SIZE)
+            slot_shape = (DETECTION_BATCH_SIZE, video_info['height'], video_info['width'], 3)
+        
+            # Én pool for hele videoen - hver process indlæser modellerne én gang (se init_pool_worker).
+            # Processerne startes med spawn: torch/CUDA er allerede indlæst her, og en fork'et
+            # CUDA-kontekst kan ikke bruges i barnet. FrameSlots sendes som navne på blokkene
+            with FrameSlots(PIPELINED_BATCHES * tasks_per_batch, slot_shape) as slots, \
+                    mp.get_context("spawn").Pool(processes=num_processes, initializer=init_pool_worker,
+                                                 initargs=(use_dnn,)) as pool:
+            
+                def submit_batch(batch_idx):
+                    # Én opgave pr. DETECTION_BATCH_SIZE frames. imap sender opgaverne til processerne
+                    # med det samme og leverer resultaterne i rækkefølge
+                    first_slot = (batch_idx % PIPELINED_BATCHES) * tasks_per_batch
+                    batch = frame_batches[batch_idx]
+                    process_args = [(batch[i:i+DETECTION_BATCH_SIZE], input_path, job_id, use_dnn, debug_mode,
+                                     slots.slot(first_slot + task))
+                                    for task, i in enumerate(range(0, len(batch), DETECTION_BATCH_SIZE))]
+                    return first_slot, pool.imap(process_frames, process_args)
+            
+                pending = [submit_batch(b) for b in range(min(PIPELINED_BATCHES, len(frame_batches)))]
+                for batch_idx, batch in enumerate(frame_batches):
+                    batch_start = time.time()
+                    logger.info(f"Processing batch {batch_idx+1}/{len(frame_batches)} ({len(batch)} frames)")
+                    update_job_status(
+                        job_id, 
+                        15 + int(80 * total_processed / video_info['frame_count']),
+                        f"Processing frames {total_processed+1}-{total_processed+len(batch)} of {video_info['frame_count']}", 
+                        "processing"
+                    )
+            
+                    # Hver frame skrives så snart den og alle før den er færdige - imens arbejder
+                    # processerne videre på de næste batches
+                    first_slot, chunks = pending.pop(0)
+                    results = []
+                    for task, chunk in enumerate(chunks):
+                        for k, r in enumerate(chunk):
+                            frame = r.pop("frame", None)
+                            if frame is None and r['status'] == 'success':
+                                frame = slots.view(first_slot + task)[k]
+                            if frame is None:
+                                logger.warning(f"Missing frame {r['index']} - using a blank frame instead")
+                                if blank_frame is None:
+                                    blank_frame = np.zeros((video_info['height'], video_info['width'], 3), np.uint8)
+                                frame = blank_frame
+                            out.write(frame)
+                            results.append(r)
+                
+                    # Batchens pladser er skrevet færdig og kan bruges af næste batch i køen
+                    if batch_idx + PIPELINED_BATCHES < len(frame_batches):
+                        pending.append(submit_batch(batch_idx + PIPELINED_BATCHES))
             
-            # Estimer resterende tid med større præcision
-            elapsed_time = time.time() - start_time
-            overall_fps = total_processed / elapsed_time if elapsed_time > 0 else 0
+                    # Tjek resultater
+                    success_count = sum(1 for r in results if r['status'] == 'success')
+                    error_count = sum(1 for r in results if r['status'] == 'error')
+                    logger.info(f"Batch {batch_idx+1} complete: {success_count} successes, {error_count} errors")
             
-            # Brug et glidende gennemsnit af frames per second for mere stabil estimering
-            # Vægt nyere målinger højere (75% nuværende batch, 25% globalt gennemsnit)
-            weighted_fps = (0.75 * frames_per_second) + (0.25 * overall_fps) if overall_fps > 0 else frames_per_second
+                    # Opdater total
+                    total_processed += len(batch)
             
-            remaining_frames = video_info['frame_count'] - total_processed
-            estimated_remaining_time = remaining_frames / weighted_fps if weighted_fps > 0 else 0
+                    # Beregn tid og fremskridt
+                    batch_time = time.time() - batch_start
+                    frames_per_second = len(batch) / batch_time if batch_time > 0 else 0
+                    progress = int(15 + 80 * total_processed / video_info['frame_count'])
             
-            # Opdater status med tidsestimat
-            if estimated_remaining_time > 60:
-                time_msg = f"{int(estimated_remaining_time // 60)} min {int(estimated_remaining_time % 60)} sec remaining"
-            else:
-                time_msg = f"{int(estimated_remaining_time)} sec remaining"
-                
-            # Log tidsestimatet
-            logger.info(f"Processing rate: {frames_per_second:.1f} FPS (batch), {overall_fps:.1f} FPS (avg), {weighted_fps:.1f} FPS (weighted)")
-            logger.info(f"Estimated remaining time: {time_msg}")
+                    # Estimer resterende tid med større præcision
+                    elapsed_time = time.time() - start_time
+                    overall_fps = total_processed / elapsed_time if elapsed_time > 0 else 0
             
-            # Opdater med mere detaljeret status, der inkluderer FPS og ETA
-            status_message = f"Processed {total_processed}/{video_info['frame_count']} frames ({frames_per_second:.1f} FPS). {time_msg}"
+                    # Brug et glidende gennemsnit af frames per second for mere stabil estimering
+                    # Vægt nyere målinger højere (75% nuværende batch, 25% globalt gennemsnit)
+                    weighted_fps = (0.75 * frames_per_second) + (0.25 * overall_fps) if overall_fps > 0 else frames_per_second
             
-            # Yderligere nøgletal
-            status_data = {
-                "job_id": job_id,
-                "progress": progress,
-                "message": status_message,
-                "status": "processing",
-                "timestamp": time.time(),
-                "fps": {
-                    "batch": f"{frames_per_second:.1f}",
-                    "avg": f"{overall_fps:.1f}",
-                    "weighted": f"{weighted_fps:.1f}"
-                },
-                "batch": {
-                    "current": batch_idx + 1,
-                    "total": len(frame_batches),
-                    "size": len(batch)
-                },
-                "frames": {
-                    "processed": total_processed,
-                    "total": video_info['frame_count']
-                },
-                "time": {
-                    "elapsed": elapsed_time,
-                    "remaining": estimated_remaining_time,
-                    "message": time_msg
-                }
-            }
+                    remaining_frames = video_info['frame_count'] - total_processed
+                    estimated_remaining_time = remaining_frames / weighted_fps if weighted_fps > 0 else 0
             
-            # Gem status til fil
-            status_file = os.path.join(STATUS_FOLDER, f"{job_id}.json")
-            try:
-                with open(status_file, 'w') as f:
-                    json.dump(status_data, f)
-                logger.info(f"Job {job_id}: {progress}% - {status_message}")
-            except Exception as e:
-                logger.error(f"Error updating job status: {e}")
-                
-            # Send også til Socket.IO (som tidligere - med enklere format)
-            update_job_status(
-                job_id, 
-                progress,
-                status_message,
-                "processing"
-            )
-        
-        # Når alle frames er behandlet, samles de til en video
-        update_job_status(job_id, 95, "Assembling final video", "processing")
-        
-        # Definer output codec
-        try:
-            fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264 codec
-        except:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Fallback codec
-            
-        # Opret VideoWriter
-        out = cv2.VideoWriter(
-            output_path, 
-            fourcc, 
-            video_info['fps'], 
-            (video_info['width'], video_info['height'])
-        )
-        
-        # Tilføj hver frame til videoen i rigtig rækkefølge
-        for i in range(video_info['frame_count']):
-            frame_path = os.path.join(frames_dir, f"frame_{i:06d}.jpg")
-            if os.path.exists(frame_path):
-                frame = cv2.imread(frame_path)
-                if frame is not None:
-                    out.write(frame)
-            else:
-                logger.warning(f"Missing frame {i} - using a blank frame instead")
-                # Create a blank frame as placeholder
-                blank_frame = np.zeros((video_info['height'], video_info['width'], 3), np.uint8)
-                out.write(blank_frame)
+                    # Opdater status med tidsestimat
+                    if estimated_remaining_time > 60:
+                        time_msg = f"{int(estimated_remaining_time // 60)} min {int(estimated_remaining_time % 60)} sec remaining"
+                    else:
+                        time_msg = f"{int(estimated_remaining_time)} sec remaining"
                 
-        # Luk VideoWriter
-        out.release()
-        
-        # Ryd op i midlertidige filer
-        import shutil
-        shutil.rmtree(frames_dir, ignore_errors=True)
+                    # Log tidsestimatet
+                    logger.info(f"Processing rate: {frames_per_second:.1f} FPS (batch), {overall_fps:.1f} FPS (avg), {weighted_fps:.1f} FPS (weighted)")
+                    logger.info(f"Estimated remaining time: {time_msg}")
+            
+                    # Opdater med mere detaljeret status, der inkluderer FPS og ETA
+                    status_message = f"Processed {total_processed}/{video_info['frame_count']} frames ({frames_per_second:.1f} FPS). {time_msg}"
+            
+                    # Yderligere nøgletal
+                    details = {
+                        "fps": {
+                            "batch": f"{frames_per_second:.1f}",
+                            "avg": f"{overall_fps:.1f}",
+                            "weighted": f"{weighted_fps:.1f}"
+                        },
+                        "batch": {
+                            "current": batch_idx + 1,
+                            "total": len(frame_batches),
+                            "size": len(batch)
+                        },
+                        "frames": {
+                            "processed": total_processed,
+                            "total": video_info['frame_count']
+                        },
+                        "time": {
+                            "elapsed": elapsed_time,
+                            "remaining": estimated_remaining_time,
+                            # Færdigdelt tidsestimat, så browseren ikke skal parse beskeden
+                            "eta_min": int(estimated_remaining_time // 60),
+                            "eta_sec": int(estimated_remaining_time % 60),
+                            "message": time_msg
+                        }
+                    }
+            
+                    # Gem status med nøgletal - webappen sender dem videre til browseren
+                    update_job_status(
+                        job_id, 
+                        progress,
+                        status_message,
+                        "processing",
+                        details=details
+                    )
+        
+            # Når alle frames er skrevet, lukkes writeren (enkoderen tømmes)
+            update_job_status(job_id, 95, "Finalizing video", "processing")
+        finally:
+            out.release()
         
         # Beregn total tid
         total_time = time.time() - start_time
@@ -802,6 +884,10 @@ def main():
     parser.add_argument("--use_dnn", action="store_true", help="Use DNN models for detection (recommended)")
     
     args = parser.parse_args()
+
+    # Webappen fletter stderr ind i stdout - linjebuffering sikrer at print-linjer
+    # ikke deles midt over og blandes med log-linjer fra stderr
+    sys.stdout.reconfigure(line_buffering=True)
     
     # Process the video
     process_video(
@@ -813,4 +899,4 @@ def main():
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Download-script til frontend-biblioteker (Bootstrap, Bootstrap Icons og Socket.IO-klienten).
+Filerne gemmes under static/vendor, så webappen kan servere dem selv i stedet for fra CDN.
+"""
+
+import sys
+from pathlib import Path
+
+STATIC_FOLDER = Path(__file__).resolve().parent / "static"
+
+# Lokal sti (relativt til static/) -> CDN URL.
+# Versionen indgår i stien, så browseren kan cache filerne som uforanderlige.
+VENDOR_ASSETS = {
+    "vendor/bootstrap-5.3.0-alpha1/bootstrap.min.css":
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css",
+    "vendor/bootstrap-5.3.0-alpha1/bootstrap.bundle.min.js":
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js",
+    "vendor/bootstrap-icons-1.10.3/bootstrap-icons.css":
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/bootstrap-icons.css",
+    # Skrifttyperne refereres relativt fra bootstrap-icons.css
+    "vendor/bootstrap-icons-1.10.3/fonts/bootstrap-icons.woff2":
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/fonts/bootstrap-icons.woff2",
+    "vendor/bootstrap-icons-1.10.3/fonts/bootstrap-icons.woff":
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/fonts/bootstrap-icons.woff",
+    "vendor/socket.io-4.6.0/socket.io.min.js":
+        "https://cdn.socket.io/4.6.0/socket.io.min.js",
+}
+
+
+def main():
+    """Main function for downloading frontend assets"""
+    from download_models import download_file
+
+    print("\n=== Downloading frontend assets for 360blur ===\n")
+    print(f"Assets will be saved to: {STATIC_FOLDER / 'vendor'}\n")
+
+    failed = []
+    for path, url in VENDOR_ASSETS.items():
+        destination = STATIC_FOLDER / path
+        if destination.exists() and destination.stat().st_size > 0:
+            print(f"Already present: {path}")
+            continue
+        if not download_file(url, str(destination)):
+            failed.append(path)
+
+    if failed:
+        print("\n\033[93mSome assets could not be downloaded - the web interface will load them from CDN:\033[0m")
+        for path in failed:
+            print(f"  - {path}")
+        return 1
+
+    print("\n\033[92mAll frontend assets downloaded successfully!\033[0m")
+    print("Restart the 360blur application to serve them locally.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
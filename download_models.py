@@ -6,13 +6,62 @@ Dette script håndterer automatisk download af alle nødvendige modeller under i
 
 import os
 import sys
+import argparse
 import time
 import urllib.request
 import requests
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def download_file(url, destination, retries=3, retry_delay=2):
+# Antal modelfiler der hentes samtidig (downloads er netværksbundne og uafhængige)
+DOWNLOAD_WORKERS = 4
+
+# Én session pr. download-tråd, så forbindelser (og TLS-handshakes) genbruges mellem filer og
+# forsøg - requests.Session er ikke trådsikker og deles derfor ikke mellem DOWNLOAD_WORKERS
+_http_sessions = threading.local()
+
+def http_session():
+    """Returnerer den aktuelle tråds requests.Session og opretter den første gang."""
+    session = getattr(_http_sessions, 'session', None)
+    if session is None:
+        session = _http_sessions.session = requests.Session()
+    return session
+
+# Bytes pr. læsning fra svaret - store bidder giver få Python-iterationer for store modelfiler
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+class ProgressWriter:
+    """
+    Filobjekt der tæller de skrevne bytes og viser fremskridtslinjen, så
+    shutil.copyfileobj kan kopiere svaret direkte til filen. Linjen skrives kun når
+    procenten ændrer sig (eller for hver DOWNLOAD_CHUNK_SIZE uden kendt størrelse).
+    """
+
+    def __init__(self, f, total_size, show_progress=True):
+        self.f = f
+        self.total_size = total_size
+        self.show_progress = show_progress
+        self.downloaded = 0
+        self.shown = -1
+
+    def write(self, data):
+        written = self.f.write(data)
+        self.downloaded += len(data)
+        if self.show_progress:
+            if self.total_size > 0:
+                percent = min(int(self.downloaded * 100 / self.total_size), 100)
+                if percent != self.shown:
+                    self.shown = percent
+                    sys.stdout.write(f"\r{percent}% [{self.downloaded} / {self.total_size}] bytes")
+                    sys.stdout.flush()
+            else:
+                sys.stdout.write(f"\rDownloaded {self.downloaded} bytes")
+                sys.stdout.flush()
+        return written
+
+def download_file(url, destination, retries=3, retry_delay=2, show_progress=True):
     """
     Download a file from URL to destination with progress bar and robust retry logic
     
@@ -21,31 +70,36 @@ def download_file(url, destination, retries=3, retry_delay=2):
         destination: Destination filepath
         retries: Number of retries on failure
         retry_delay: Seconds to wait between retries
+        show_progress: Vis fremskridtslinjen - slås fra når flere filer hentes samtidig,
+                       så linjerne ikke blandes sammen
     """
     # Brug requests for mere robust filhåndtering
     def download_with_requests():
         print(f"Downloading {os.path.basename(destination)} from {url}")
         try:
             # Hent fil med progress
-            with requests.get(url, stream=True, timeout=30) as response:
+            with http_session().get(url, stream=True, timeout=30) as response:
                 response.raise_for_status()
                 total_size = int(response.headers.get('content-length', 0))
                 
                 if total_size == 0:
                     print("Warning: Unable to determine file size")
                 
-                downloaded = 0
+                # Kopien sker i shutil.copyfileobj i stedet for en Python-løkke pr. bid -
+                # decode_content pakker gzip/deflate ud som iter_content gjorde
+                response.raw.decode_content = True
                 with open(destination, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded += len(chunk)
-                            if total_size > 0:
-                                percent = min(int(downloaded * 100 / total_size), 100)
-                                sys.stdout.write(f"\r{percent}% [{downloaded} / {total_size}] bytes")
-                            else:
-                                sys.stdout.write(f"\rDownloaded {downloaded} bytes")
-                            sys.stdout.flush()
+                    writer = ProgressWriter(f, total_size, show_progress)
+                    shutil.copyfileobj(response.raw, writer, length=DOWNLOAD_CHUNK_SIZE)
+                
+                # Filen kontrolleres kun på størrelsen - modelværterne udgiver ingen
+                # checksums at sammenligne med. En afbrudt overførsel giver færre bytes end
+                # content-length (som for gzip/deflate er den pakkede størrelse og derfor
+                # ikke kan sammenlignes)
+                if total_size > 0 and 'content-encoding' not in response.headers and writer.downloaded != total_size:
+                    print(f"\nFejl: Download afbrudt efter {writer.downloaded} af {total_size} bytes.")
+                    os.remove(destination)
+                    return False
                 
                 print(f"\nFærdig med download af {os.path.basename(destination)}")
                 if os.path.exists(destination) and os.path.getsize(destination) > 0:
@@ -63,6 +117,8 @@ def download_file(url, destination, retries=3, retry_delay=2):
         print(f"Downloader (urllib fallback) {os.path.basename(destination)} fra {url}")
         
         def progress_bar(block_num, block_size, total_size):
+            if not show_progress:
+                return
             downloaded = block_num * block_size
             if total_size > 0:
                 percent = min(int(downloaded * 100 / total_size), 100)
@@ -121,7 +177,8 @@ def download_file(url, destination, retries=3, retry_delay=2):
                 }
                 if filename in alternative_urls and alternative_urls[filename] != url:
                     print(f"Prøver alternativ URL for {filename}...")
-                    return download_file(alternative_urls[filename], destination, retries=1)
+                    return download_file(alternative_urls[filename], destination, retries=1,
+                                         show_progress=show_progress)
                 return False
         except Exception as e:
             print(f"Uventet fejl: {e}")
@@ -134,8 +191,150 @@ def download_file(url, destination, retries=3, retry_delay=2):
     
     return False
 
+def extract_calibration_frames(video_path, output_dir, count=300):
+    """
+    Gemmer op til count jævnt fordelte frames fra video_path som JPEG i output_dir/images
+    og skriver en Ultralytics-datasætfil (calib.yaml) til INT8-kalibrering. Er calib.yaml
+    allerede lavet fra samme video og nyere end den, genbruges frames og fil uændret, så
+    INT8-enginen ikke bygges igen (se export_tensorrt_engines).
+
+    Returns:
+        Stien til calib.yaml, eller None hvis videoen ikke kunne læses
+    """
+    import cv2
+
+    yaml_path = Path(output_dir) / "calib.yaml"
+    source_line = f"# source: {Path(video_path).absolute()}\n"
+    if (yaml_path.exists() and os.path.exists(video_path)
+            and yaml_path.stat().st_mtime >= os.path.getmtime(video_path)
+            and yaml_path.read_text().startswith(source_line)):
+        print(f"Calibration frames already up to date: {yaml_path}")
+        return yaml_path
+
+    images_dir = Path(output_dir) / "images"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    cap = cv2.VideoCapture(str(video_path))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if not cap.isOpened() or total <= 0:
+        print(f"Fejl: Kunne ikke læse kalibreringsvideoen {video_path}")
+        return None
+
+    saved = 0
+    step = max(1, total // count)
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        success, frame = cap.read()
+        if not success:
+            break
+        cv2.imwrite(str(images_dir / f"calib_{index:06d}.jpg"), frame)
+        saved += 1
+        if saved >= count:
+            break
+    cap.release()
+    print(f"Saved {saved} calibration frames to {images_dir}")
+
+    # Kalibreringen bruger kun billederne - klassenavnene sættes pr. model i export_tensorrt_engines
+    yaml_path.write_text(f"{source_line}path: {Path(output_dir).absolute()}\ntrain: images\nval: images\nnames:\n  0: object\n")
+    return yaml_path
+
+def export_tensorrt_engines(models_dir, imgsz=640, batch=16, calibration_data=None):
+    """
+    Eksporterer YOLO-vægtene til TensorRT FP16-engines (samme navn med .engine) én gang.
+
+    360blur bruger en engine i stedet for vægtfilen når den findes og er nyere end
+    vægtfilen. Kræver en NVIDIA GPU med CUDA, TensorRT og Ultralytics - ellers springes
+    eksporten over. Engines bygges med dynamisk batch op til batch: arbejderprocessen sender
+    8 frames og deres wrapped udgaver til YOLO på én gang.
+
+    Med calibration_data (calib.yaml fra extract_calibration_frames) bygges desuden en
+    INT8-engine (<navn>_int8.engine), som foretrækkes frem for FP16-enginen. INT8 kræver
+    kalibrering på billeder der ligner de rigtige videoer og koster lidt præcision.
+
+    Returns:
+        Antal engines der er klar (eksporteret nu eller allerede opdaterede)
+    """
+    try:
+        import torch
+        import tensorrt  # noqa: F401 - kun for at tjekke at TensorRT er installeret
+        from ultralytics import YOLO
+    except ImportError:
+        print("TensorRT export skipped: requires ultralytics, torch with CUDA and tensorrt")
+        return 0
+    if not torch.cuda.is_available():
+        print("TensorRT export skipped: no CUDA GPU available")
+        return 0
+
+    ready = 0
+    for weights_path in sorted(Path(models_dir).glob("*.pt")):
+        engine_path = weights_path.with_suffix(".engine")
+        int8_path = weights_path.with_name(f"{weights_path.stem}_int8.engine")
+        if calibration_data is not None and int8_path.exists() and int8_path.stat().st_mtime >= max(
+                weights_path.stat().st_mtime, Path(calibration_data).stat().st_mtime):
+            print(f"TensorRT engine already up to date: {int8_path.name}")
+            ready += 1
+        elif calibration_data is not None:
+            # Eksporteres før FP16-enginen, da Ultralytics skriver til samme .engine-sti
+            print(f"Exporting {weights_path.name} to TensorRT INT8 with calibration (this can take several minutes)...")
+            try:
+                exported = YOLO(str(weights_path)).export(format="engine", imgsz=imgsz, int8=True,
+                                                          data=str(calibration_data), dynamic=True,
+                                                          batch=batch, workspace=4)
+                Path(exported).replace(int8_path)
+                ready += 1
+            except Exception as e:
+                print(f"Fejl ved INT8-eksport af {weights_path.name}: {e}")
+        if engine_path.exists() and engine_path.stat().st_mtime >= weights_path.stat().st_mtime:
+            print(f"TensorRT engine already up to date: {engine_path.name}")
+            ready += 1
+            continue
+        print(f"Exporting {weights_path.name} to TensorRT FP16 (this can take several minutes)...")
+        try:
+            # Ultralytics skriver enginen ved siden af vægtfilen med samme navn
+            YOLO(str(weights_path)).export(format="engine", imgsz=imgsz, half=True,
+                                           dynamic=True, batch=batch, workspace=4)
+            ready += 1
+        except Exception as e:
+            print(f"Fejl ved TensorRT-eksport af {weights_path.name}: {e}")
+    return ready
+
+def is_up_to_date(url, destination):
+    """
+    Om destination allerede findes med samme størrelse som filen på url (HEAD-forespørgsel,
+    der følger redirects). Kan serveren ikke nås, beholdes en eksisterende fil, så en
+    mislykket download ikke overskriver den.
+    """
+    if not os.path.exists(destination) or os.path.getsize(destination) == 0:
+        return False
+    try:
+        head = http_session().head(url, allow_redirects=True, timeout=10)
+        head.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Could not check {os.path.basename(destination)} ({e}) - keeping the existing file")
+        return True
+    remote_size = int(head.headers.get('content-length', 0))
+    return remote_size > 0 and os.path.getsize(destination) == remote_size
+
+def fetch_model(model, show_progress=True):
+    """
+    Henter én modelfil fra model_files - først hovedURL'en og ellers backup-URL'en.
+    Findes filen allerede i samme størrelse, springes den over (se is_up_to_date).
+    """
+    if is_up_to_date(model["url"], model["dest"]):
+        print(f"Already up to date: {os.path.basename(model['dest'])}")
+        return True
+    success = download_file(model["url"], model["dest"], show_progress=show_progress)
+    if not success and "backup_url" in model:
+        print(f"Trying backup URL for {os.path.basename(model['dest'])}...")
+        success = download_file(model["backup_url"], model["dest"], show_progress=show_progress)
+    return success
+
 def main():
     """Main function for downloading detection models"""
+    parser = argparse.ArgumentParser(description="Download detection models for 360blur")
+    parser.add_argument("--int8-calibration", metavar="VIDEO",
+                        help="Also build INT8 TensorRT engines, calibrated on frames from this video")
+    args = parser.parse_args()
+    
     # Opret models directory
     models_dir = Path("models")
     models_dir.mkdir(exist_ok=True)
@@ -192,22 +391,18 @@ def main():
     print("\n=== Downloading detection models for 360blur ===\n")
     print(f"Models will be saved to: {models_dir.absolute()}\n")
     
-    # Download each model
     for model in model_files:
+        print(f"--- Downloading {model['type']}: {os.path.basename(model['dest'])} ({model['size']}) ---")
+    
+    # Hent alle modeller samtidig - resultaterne gennemgås bagefter i listens rækkefølge
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        results = list(executor.map(lambda model: fetch_model(model, show_progress=False), model_files))
+    
+    for model, success in zip(model_files, results):
         model_type = model["type"]
         if model_type not in model_types:
             model_types[model_type] = {"success": True}
         
-        print(f"\n--- Downloading {model_type}: {os.path.basename(model['dest'])} ({model['size']}) ---")
-        
-        # Prøv først hovedURL
-        success = download_file(model["url"], model["dest"])
-        
-        # Hvis det fejler, prøv backup URL
-        if not success and "backup_url" in model:
-            print(f"Trying backup URL...")
-            success = download_file(model["backup_url"], model["dest"])
-        
         # Opdater status
         if success:
             success_count += 1
@@ -249,6 +444,15 @@ def main():
         print("1. Install Ultralytics: pip install ultralytics")
         print("2. Restart the 360blur application")
         
+        # Med NVIDIA GPU og TensorRT eksporteres modellerne én gang til FP16-engines
+        calibration_data = None
+        if args.int8_calibration:
+            calibration_data = extract_calibration_frames(args.int8_calibration, models_dir / "calibration")
+        if export_tensorrt_engines(models_dir, calibration_data=calibration_data) == 0:
+            print("Optional, with an NVIDIA GPU and TensorRT: export the models once for faster inference:")
+            print("   yolo export model=models/yolov8n_face.pt format=engine half=True")
+            print("   yolo export model=models/yolov8n_lp.pt format=engine half=True")
+        
         # Check if ultralytics is already installed
         try:
             import importlib.util
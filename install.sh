@@ -188,6 +188,14 @@ else
     echo "  You can try again later by running: python download_models.py"
 fi
 
+# Download frontend-biblioteker
+echo -e "\n${BLUE}${BOLD}Downloading frontend assets...${NC}"
+if python download_assets.py; then
+    echo -e "${GREEN}✓ Frontend assets downloaded${NC}"
+else
+    echo -e "${YELLOW}⚠ Failed to download frontend assets, the web interface will use CDN links${NC}"
+fi
+
 # Kompiler oversættelser
 echo -e "\n${BLUE}${BOLD}Compiling translations...${NC}"
 if pybabel compile -d translations; then
@@ -269,7 +277,7 @@ if [ -d "$INSTALL_DIR/venv" ]; then
 fi
 
 # Remove data directories
-for dir in "uploads" "processed" "status" "models" "cloudflare" "systemd"; do
+for dir in "uploads" "processed" "status" "models" "instance" "cloudflare" "systemd"; do
     if [ -d "$INSTALL_DIR/$dir" ]; then
         echo "Removing $dir directory..."
         rm -rf "$INSTALL_DIR/$dir"
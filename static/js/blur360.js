@@ -0,0 +1,689 @@
+/*
+ * Brugerflade for 360° video blur: upload, statusvisning og download.
+ * Dynamiske værdier (job og oversatte tekster) sættes af templaten i
+ * window.__JOB og window.__I18N før denne fil indlæses.
+ */
+
+// Fejlsøgnings-log kun når siden åbnes med ?debug=1
+const DEBUG = /[?&]debug=1\b/.test(window.location.search);
+const dlog = DEBUG ? console.log.bind(console) : function() {};
+
+// Socket.IO setup
+const socket = io({
+    transports: ['websocket', 'polling']
+});
+let jobId = window.__JOB.id;
+
+// Mønster til at udtrække batch fra statusbeskeder (indtil worker sender batch-tal)
+const BATCH_RE = /Processing frames (\d+)-(\d+) of (\d+)/;
+
+// Elementer der opdateres ved hver statusopdatering - slås op én gang (se cacheElements)
+const els = {};
+
+function cacheElements() {
+    els.progressBar = document.getElementById('progress-bar');
+    els.progressText = document.getElementById('progress-text');
+    els.speed = document.getElementById('processing-speed');
+    els.log = document.getElementById('processing-log');
+    els.batchInfo = document.getElementById('batch-info');
+    els.eta = document.getElementById('estimated-time-remaining');
+    els.etaContainer = document.getElementById('estimated-time-container');
+    els.cpuInfo = document.getElementById('cpu-info');
+    els.detailsContainer = document.getElementById('processing-details-container');
+    els.detailsContent = document.getElementById('processing-details-content');
+    els.detailsIcon = document.getElementById('details-toggle-icon');
+}
+
+// Viser permalink-sektionen under progress bar (kun én gang)
+function showPermalink(url) {
+    if (document.getElementById('permalink-section')) return;
+    const section = document.getElementById('permalink-tpl').content.cloneNode(true);
+    section.querySelector('#permalink-input').value = url;
+
+    // Tilføj til DOM efter progress bar
+    const progressContainer = document.querySelector('.progress').parentNode;
+    progressContainer.appendChild(section);
+}
+
+// Kopierer permalink uden at blokere siden - knappen viser kort et flueben bagefter
+async function copyPermalink(button) {
+    const permalinkInput = document.getElementById('permalink-input');
+    try {
+        if (navigator.clipboard && window.isSecureContext) {
+            await navigator.clipboard.writeText(permalinkInput.value);
+        } else {
+            // Clipboard API kræver https eller localhost
+            permalinkInput.select();
+            document.execCommand('copy');
+        }
+    } catch (error) {
+        console.error('Error copying permalink:', error);
+        return;
+    }
+    if (button) {
+        button.title = window.__I18N.linkCopied;
+        button.classList.add('copied');
+        setTimeout(function() {
+            button.classList.remove('copied');
+        }, 1200);
+    }
+}
+
+// Viser et element - sætter kun display hvis det ikke allerede er synligt,
+// da selv en uændret værdi invaliderer style
+function showElement(el) {
+    if (el && el.style.display !== 'block') {
+        el.style.display = 'block';
+    }
+}
+
+// Åbner detaljevisningen (indhold og ikon) hvis den er lukket
+function expandProcessingDetails() {
+    if (els.detailsContent && els.detailsContent.style.display === 'none') {
+        els.detailsContent.style.display = 'block';
+        if (els.detailsIcon) {
+            els.detailsIcon.classList.replace('bi-arrows-expand', 'bi-arrows-collapse');
+        }
+    }
+}
+
+// Funktion til at skifte mellem vising/skjul af detaljer
+function toggleProcessingDetails() {
+    const detailsContent = document.getElementById('processing-details-content');
+    const detailsIcon = document.getElementById('details-toggle-icon');
+
+    if (detailsContent.style.display === 'none') {
+        detailsContent.style.display = 'block';
+        detailsIcon.classList.replace('bi-arrows-expand', 'bi-arrows-collapse');
+    } else {
+        detailsContent.style.display = 'none';
+        detailsIcon.classList.replace('bi-arrows-collapse', 'bi-arrows-expand');
+    }
+}
+
+// Højst så mange linjer i processing-log - de ældste fjernes
+const MAX_LOG_LINES = 500;
+
+// Log-linjer der venter på at blive skrevet til processing-log ved næste frame
+let pendingLogs = [];
+let logRafId = 0;
+
+// Tidsstempel for log-linjer - formateres kun én gang pr. sekund
+let timestampSecond = 0;
+let timestampText = '';
+
+function logTimestamp() {
+    const second = Math.floor(Date.now() / 1000);
+    if (second !== timestampSecond) {
+        timestampSecond = second;
+        timestampText = new Date(second * 1000).toLocaleTimeString();
+    }
+    return timestampText;
+}
+
+// Funktion til at tilføje en log-linje til processing-log
+function addProcessingLogEntry(message) {
+    pendingLogs.push([logTimestamp(), message]);
+    if (!logRafId) {
+        logRafId = requestAnimationFrame(flushProcessingLog);
+    }
+}
+
+// Skriver alle ventende log-linjer på én gang, så der kun laves ét layout pr. frame
+function flushProcessingLog() {
+    logRafId = 0;
+    const logElement = els.log;
+    if (logElement) {
+        // Læs før der skrives: følg kun med i bunden hvis brugeren ikke har scrollet op
+        const wasAtBottom = logElement.scrollTop + logElement.clientHeight >= logElement.scrollHeight - 30;
+
+        const fragment = document.createDocumentFragment();
+        for (const [timestamp, message] of pendingLogs) {
+            const logLine = document.createElement('div');
+            logLine.textContent = `[${timestamp}] ${message}`;
+            fragment.appendChild(logLine);
+        }
+        logElement.appendChild(fragment);
+        while (logElement.childElementCount > MAX_LOG_LINES) {
+            logElement.firstElementChild.remove();
+        }
+
+        // Auto-scroll til bunden
+        if (wasAtBottom) {
+            logElement.scrollTop = logElement.scrollHeight;
+        }
+    }
+    pendingLogs.length = 0;
+}
+
+// Faste opbygninger af labels: tekst, <strong>-tekst og linjeskift
+const SPEED_LAYOUT = ['text', 'br', 'text'];
+const BATCH_LAYOUT = ['text', 'strong', 'text', 'br', 'text'];
+const CPU_LAYOUT = ['strong', 'text'];
+
+// Sætter et label uden at parse HTML: opbygningen laves én gang, derefter
+// skiftes kun værdien af tekstnoderne
+function setLabelParts(el, layout, values) {
+    if (!el) return;
+    if (el._layout !== layout || el.firstChild !== el._firstNode) {
+        el._texts = [];
+        const nodes = layout.map(function(part) {
+            if (part === 'br') return document.createElement('br');
+            const text = document.createTextNode('');
+            el._texts.push(text);
+            if (part !== 'strong') return text;
+            const strong = document.createElement('strong');
+            strong.appendChild(text);
+            return strong;
+        });
+        el.replaceChildren(...nodes);
+        el._layout = layout;
+        el._firstNode = el.firstChild;
+    }
+    values.forEach(function(value, i) {
+        const text = String(value);
+        if (el._texts[i].nodeValue !== text) {
+            el._texts[i].nodeValue = text;
+        }
+    });
+}
+
+// Detaljepanelets kort skrives kun mens panelet er synligt. Ellers gemmes den
+// seneste skrivning pr. element og udføres, når panelet kommer til syne igen
+let detailsVisible = true;
+const deferredDetails = new Map();
+
+function writeDetail(el, write) {
+    if (!el) return;
+    if (detailsVisible) {
+        deferredDetails.delete(el);
+        write();
+    } else {
+        deferredDetails.set(el, write);
+    }
+}
+
+function observeDetailsVisibility() {
+    if (!('IntersectionObserver' in window) || !els.detailsContent) return;
+    new IntersectionObserver(function(entries) {
+        detailsVisible = entries[entries.length - 1].isIntersecting;
+        if (detailsVisible) {
+            deferredDetails.forEach(function(write) { write(); });
+            deferredDetails.clear();
+        }
+    }).observe(els.detailsContent);
+}
+
+// Sidst viste CPU info, så gentagne events med samme værdier ignoreres
+let lastCpuKey = '';
+
+// Sat når worker har sendt strukturerede batch-tal - så bruges beskeden ikke til batch-info
+let hasBatchDetails = false;
+
+// Viser resterende tid. Kaldes fra applyProgressUpdate, der allerede kører i en
+// animation frame - her springes kun uændret tekst over
+function setEta(text) {
+    if (!els.eta) return;
+    if (els.eta.textContent !== text) {
+        els.eta.textContent = text;
+    }
+    showElement(els.etaContainer);
+}
+
+// Opdater FPS, batch og tidsestimat fra de nøgletal worker sender med status
+function updateStatusDetails(data) {
+    if (data.fps) {
+        // Validate FPS data has the expected structure
+        if (data.fps.batch && data.fps.avg) {
+            const speedParts = [`${data.fps.batch} FPS (current)`, `${data.fps.avg} FPS (average)`];
+            writeDetail(els.speed, function() { setLabelParts(els.speed, SPEED_LAYOUT, speedParts); });
+            addProcessingLogEntry(`Processing rate: ${data.fps.batch} FPS (current batch)`);
+        } else {
+            console.error("FPS data structure is invalid:", data.fps);
+        }
+    }
+
+    if (data.batch) {
+        hasBatchDetails = true;
+        const batchParts = ['Batch ', data.batch.current, ` of ${data.batch.total}`, `Size: ${data.batch.size} frames`];
+        writeDetail(els.batchInfo, function() { setLabelParts(els.batchInfo, BATCH_LAYOUT, batchParts); });
+    }
+
+    // Opdater også tid-estimat - serveren sender det færdigdelt i minutter og sekunder
+    if (data.time && data.time.eta_sec !== undefined) {
+        setEta(data.time.eta_min > 0 ? `${data.time.eta_min} min ${data.time.eta_sec} sec` : `${data.time.eta_sec} sec`);
+    }
+}
+
+// Hvis der er et aktivt job, vis processeringsskærmen
+document.addEventListener('DOMContentLoaded', function() {
+    cacheElements();
+    observeDetailsVisibility();
+
+    if (jobId) {
+        // Vis korrekt UI baseret på job status
+        const jobStatus = window.__JOB.status;
+
+        if (jobStatus === 'processing' || jobStatus === 'uploading') {
+            document.getElementById('step-upload').style.display = 'none';
+            document.getElementById('step-processing').style.display = 'block';
+            document.getElementById('loading-spinner').style.display = 'block';
+
+            // Gem job ID i skjult input
+            const jobIdInput = document.createElement('input');
+            jobIdInput.type = 'hidden';
+            jobIdInput.id = 'job-id-input';
+            jobIdInput.value = jobId;
+            document.body.appendChild(jobIdInput);
+
+            // Opret permalink sektion
+            showPermalink(window.location.href);
+
+            // Start at lytte efter opdateringer for dette job
+            setupJobListeners();
+
+            // Anmod om den aktuelle status
+            fetch('/status/' + jobId)
+                .then(response => response.json())
+                .then(data => {
+                    dlog("Initial status data:", data);
+                    updateProgress(data.progress, data.message);
+                    updateStatusDetails(data);
+
+                    if (!data.fps) {
+                        writeDetail(els.speed, function() { els.speed.textContent = "Calculating..."; });
+                    }
+
+                    // Vis CPU info hvis tilgængelig (kommer fra en anden kilde, men tjek alligevel)
+                    const cpuInfo = document.getElementById('cpu-info');
+                    if (cpuInfo && cpuInfo.textContent === '-') {
+                        // Hvis CPU info ikke er sat endnu, tilføj en placeholder
+                        cpuInfo.textContent = 'Detecting cores...';
+                    }
+
+                    // Vis processing details container og sørg for det er åbent
+                    showElement(els.detailsContainer);
+                    showElement(els.detailsContent);
+
+                    // Skift ikon til collapse
+                    if (els.detailsIcon) {
+                        els.detailsIcon.classList.replace('bi-arrows-expand', 'bi-arrows-collapse');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error fetching status:', error);
+                });
+        } else if (jobStatus === 'completed') {
+            document.getElementById('step-upload').style.display = 'none';
+            document.getElementById('step-processing').style.display = 'none';
+            document.getElementById('step-download').style.display = 'block';
+
+            const downloadLink = document.getElementById('download-link');
+            downloadLink.href = '/download/' + jobId;
+        } else if (jobStatus === 'error' || jobStatus === 'cancelled') {
+            document.getElementById('error-text').textContent = window.__I18N.jobCancelledOrFailed;
+            document.getElementById('error-message').style.display = 'block';
+        }
+    }
+});
+
+// Funktion til at opsætte lyttere til Socket.IO-events
+function setupJobListeners() {
+    // Job-events sendes kun til jobbets rum. Rummet skal tilmeldes igen efter hver
+    // genforbindelse - serveren svarer med jobbets aktuelle tilstand
+    const joinJobRoom = function() {
+        socket.emit('join', {job_id: jobId});
+    };
+    socket.on('connect', joinJobRoom);
+    if (socket.connected) {
+        joinJobRoom();
+    }
+
+    // Listen for progress updates - events i samme frame samles, og kun den
+    // seneste tilstand vises (beskederne kommer dog alle i loggen)
+    socket.on('progress_update', function(data) {
+        if (data.job_id !== jobId) return;
+
+        // Serveren sender kun felter der har ændret sig (se flush_progress_updates)
+        if (data.message !== undefined) {
+            logProgressMessage(data.message);
+        }
+        pendingUpdate = pendingUpdate ? Object.assign(pendingUpdate, data) : Object.assign({}, data);
+        if (!updateRafId) {
+            updateRafId = requestAnimationFrame(applyProgressUpdate);
+        }
+    });
+
+    // Lyt efter CPU info
+    socket.on('worker_cpu_info', function(data) {
+        if (data.job_id !== jobId) return;
+
+        const cpuKey = `${data.used_cores}/${data.total_cores}/${data.percentage}`;
+        if (cpuKey === lastCpuKey) return;
+        lastCpuKey = cpuKey;
+
+        try {
+            // Sikre os at DOM-elementet eksisterer
+            const cpuInfo = els.cpuInfo;
+
+            if (cpuInfo) {
+                const cpuParts = [data.used_cores, ` of ${data.total_cores} cores (${data.percentage})`];
+                writeDetail(cpuInfo, function() { setLabelParts(cpuInfo, CPU_LAYOUT, cpuParts); });
+                addProcessingLogEntry(`CPU utilization: ${data.used_cores} of ${data.total_cores} cores (${data.percentage})`);
+            } else {
+                // #cpu-info renderes altid af base.html - mangler det, er det en skabelonfejl
+                console.error("CPU info element not found in DOM!");
+            }
+        } catch (error) {
+            console.error("Error updating CPU info:", error);
+        }
+
+        // Sørg for at processing details container er synlig
+        showElement(els.detailsContainer);
+
+        // Vis også detaljernes indhold automatisk
+        expandProcessingDetails();
+    });
+
+    // Listen for job completion
+    socket.on('job_complete', function(data) {
+        if (data.job_id !== jobId) return;
+
+        document.getElementById('step-processing').style.display = 'none';
+        document.getElementById('step-download').style.display = 'block';
+
+        const downloadLink = document.getElementById('download-link');
+        downloadLink.href = data.download_url;
+
+        // Tilføj den endelige tid til loggen
+        if (data.processing_time) {
+            const totalSeconds = Math.round(data.processing_time);
+            const minutes = Math.floor(totalSeconds / 60);
+            const seconds = totalSeconds % 60;
+            const timeMessage = minutes > 0 ? 
+                `${minutes} min ${seconds} sec` : `${seconds} sec`;
+
+            addProcessingLogEntry(`Processing completed in ${timeMessage}`);
+        }
+    });
+
+    // Handle errors
+    socket.on('job_error', function(data) {
+        if (data.job_id !== jobId) return;
+        showError(data.error);
+    });
+}
+
+// File input change handler
+document.getElementById('video').addEventListener('change', function(e) {
+    const file = e.target.files[0];
+    if (!file) return;
+
+    // Show preview
+    const video = document.getElementById('video-preview');
+    video.src = URL.createObjectURL(file);
+    video.style.display = 'block';
+
+    // Load video metadata
+    video.onloadedmetadata = function() {
+        document.getElementById('video-info').style.display = 'block';
+
+        // Show video information
+        document.getElementById('video-duration').textContent = formatTime(video.duration);
+        document.getElementById('video-resolution').textContent = `${video.videoWidth} × ${video.videoHeight}`;
+        document.getElementById('video-size').textContent = formatSize(file.size);
+        document.getElementById('video-format').textContent = file.type;
+
+        // Calculate estimated processing time
+        const estimatedSeconds = Math.round(video.duration * 1.5); // Rough estimate: 1.5x real-time
+        document.getElementById('time-estimate').textContent = formatTime(estimatedSeconds);
+    };
+});
+
+// Form submission
+document.getElementById('upload-form').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const videoFile = document.getElementById('video').files[0];
+    if (!videoFile) {
+        showError(window.__I18N.selectVideo);
+        return;
+    }
+
+    // Create FormData
+    const formData = new FormData();
+    formData.append('video', videoFile);
+
+    // Add options
+    if (document.getElementById('debug_mode').checked) {
+        formData.append('debug_mode', '1');
+    }
+
+    if (document.getElementById('use_dnn').checked) {
+        formData.append('use_dnn', '1');
+    }
+
+    // Show processing UI
+    document.getElementById('step-upload').style.display = 'none';
+    document.getElementById('step-processing').style.display = 'block';
+    document.getElementById('loading-spinner').style.display = 'block';
+
+    // Update initial status
+    updateStepStatus('step-upload-status', 'active');
+
+    // Submit the form
+    fetch('/upload', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            showError(data.error);
+            return;
+        }
+
+        jobId = data.job_id;
+        dlog('Processing started with job ID:', jobId);
+
+        // Opsæt Socket.IO lyttere
+        setupJobListeners();
+
+        // Handle job cancellation
+        document.getElementById('cancel-btn').addEventListener('click', function() {
+            if (!jobId) return;
+
+            if (confirm(window.__I18N.confirmCancel)) {
+                fetch('/cancel/' + jobId, { method: 'POST' })
+                    .then(response => response.json())
+                    .then(data => {
+                        if (data.success) {
+                            document.getElementById('step-processing').style.display = 'none';
+                            document.getElementById('step-upload').style.display = 'block';
+                            document.getElementById('upload-form').reset();
+                            document.getElementById('video-preview').style.display = 'none';
+                            document.getElementById('video-info').style.display = 'none';
+                        } else {
+                            showError(data.error || window.__I18N.cancelFailed);
+                        }
+                    })
+                    .catch(error => {
+                        showError(window.__I18N.cancelError + ': ' + error.message);
+                    });
+            }
+        });
+    })
+    .catch(error => {
+        showError(window.__I18N.uploadError + ': ' + error.message);
+    });
+});
+
+// Restart button
+document.getElementById('restart-btn').addEventListener('click', function() {
+    document.getElementById('step-download').style.display = 'none';
+    document.getElementById('step-upload').style.display = 'block';
+    document.getElementById('upload-form').reset();
+    document.getElementById('video-preview').style.display = 'none';
+    document.getElementById('video-info').style.display = 'none';
+
+    // Reset progress and steps
+    updateProgress(0, window.__I18N.startingProcessing + '...');
+    document.querySelectorAll('.status-step').forEach(el => {
+        el.classList.remove('active', 'completed');
+    });
+});
+
+// Seneste progress der venter på at blive vist, og den sidst viste
+let nextProgress = null;
+let progressRafId = 0;
+let lastPercent = -1;
+let lastMessage = '';
+let lastLoggedMessage = '';
+
+// Samlet progress_update der venter på næste frame
+let pendingUpdate = null;
+let updateRafId = 0;
+
+function applyProgressUpdate() {
+    updateRafId = 0;
+    const data = pendingUpdate;
+    pendingUpdate = null;
+
+    // Uden message i opdateringen er beskeden uændret siden sidst
+    updateProgress(data.progress, data.message !== undefined ? data.message : lastLoggedMessage);
+    // Vi er allerede i en animation frame - tegn med det samme
+    cancelAnimationFrame(progressRafId);
+    renderProgress();
+
+    updateStepStatus(data.step, 'active');
+    if (data.prev_step) {
+        updateStepStatus(data.prev_step, 'completed');
+    }
+
+    // FPS, batch og tidsestimat kommer med i samme event - ingen polling nødvendig
+    updateStatusDetails(data);
+}
+
+// Tilføjer en statusbesked til loggen, medmindre den er den samme som sidst
+function logProgressMessage(message) {
+    if (message !== lastLoggedMessage) {
+        lastLoggedMessage = message;
+        addProcessingLogEntry(message);
+    }
+}
+
+// Utility functions
+function updateProgress(percent, message) {
+    // Gemmer job ID i en skjult input, så vi kan bruge det til permalink
+    if (jobId && !document.getElementById('job-id-input')) {
+        const jobIdInput = document.createElement('input');
+        jobIdInput.type = 'hidden';
+        jobIdInput.id = 'job-id-input';
+        jobIdInput.value = jobId;
+        document.body.appendChild(jobIdInput);
+
+        // Opdater URL med job_id for at lave et permalink
+        const url = new URL(window.location.href);
+        url.searchParams.set('job_id', jobId);
+        window.history.replaceState({}, '', url.toString());
+
+        // Vis permalink section
+        showPermalink(url.toString());
+    }
+
+    // Vis detaljevisningen og dens indhold automatisk for første progress update
+    if (!window.detailsShown) {
+        window.detailsShown = true;
+        showElement(els.detailsContainer);
+        expandProcessingDetails();
+    }
+
+    // Add the message to the processing log
+    logProgressMessage(message);
+
+    // Selve visningen opdateres højst én gang pr. frame med den seneste værdi
+    nextProgress = {percent, message};
+    if (!progressRafId) {
+        progressRafId = requestAnimationFrame(renderProgress);
+    }
+}
+
+function renderProgress() {
+    progressRafId = 0;
+    const {percent, message} = nextProgress;
+    if (percent === lastPercent && message === lastMessage) return;
+
+    if (percent !== lastPercent) {
+        // Bredden styres af en CSS-variabel på selve bjælken (se #progress-bar i base.html)
+        els.progressBar.style.setProperty('--job-progress', percent + '%');
+        els.progressBar.setAttribute('aria-valuenow', percent);
+        lastPercent = percent;
+    }
+    if (message === lastMessage) return;
+    lastMessage = message;
+    els.progressText.textContent = message;
+
+    // We now use structured FPS data directly so we don't
+    // need to extract it from messages anymore
+
+    // Extract batch information if available (kun indtil worker sender batch-tal)
+    const batchMatch = hasBatchDetails ? null : message.match(BATCH_RE);
+    if (batchMatch) {
+        const batchInfo = els.batchInfo;
+        if (batchInfo) {
+            const startFrame = batchMatch[1];
+            const endFrame = batchMatch[2];
+            const totalFrames = batchMatch[3];
+            const batchSize = parseInt(endFrame) - parseInt(startFrame) + 1;
+            writeDetail(batchInfo, function() { batchInfo.textContent = `Frames ${startFrame}-${endFrame} (${batchSize} frames)`; });
+        }
+    }
+}
+
+// Trin-elementerne slås op første gang de bruges
+const stepElements = {};
+
+function updateStepStatus(stepId, status) {
+    if (!stepId) return;
+    const el = stepElements[stepId] || (stepElements[stepId] = document.getElementById(stepId));
+    if (!el) return;
+
+    // Spring over hvis trinnet allerede har præcis denne status
+    const other = status === 'active' ? 'completed' : 'active';
+    if (el.classList.contains(status) && !el.classList.contains(other)) return;
+
+    el.classList.remove(other);
+    el.classList.add(status);
+}
+
+function showError(message) {
+    document.getElementById('error-text').textContent = message;
+    document.getElementById('error-message').style.display = 'block';
+    document.getElementById('step-processing').style.display = 'none';
+    document.getElementById('step-upload').style.display = 'block';
+    document.getElementById('loading-spinner').style.display = 'none';
+}
+
+function formatTime(seconds) {
+    const hrs = Math.floor(seconds / 3600);
+    const mins = Math.floor((seconds % 3600) / 60);
+    const secs = Math.floor(seconds % 60);
+
+    let result = '';
+    if (hrs > 0) {
+        result += `${hrs}h `;
+    }
+    if (mins > 0 || hrs > 0) {
+        result += `${mins}m `;
+    }
+    result += `${secs}s`;
+
+    return result;
+}
+
+function formatSize(bytes) {
+    const sizes = ['Bytes', 'KB', 'MB', 'GB', 'TB'];
+    if (bytes === 0) return '0 Bytes';
+    const i = Math.floor(Math.log(bytes) / Math.log(1024));
+    return parseFloat((bytes / Math.pow(1024, i)).toFixed(2)) + ' ' + sizes[i];
+}
@@ -9,8 +9,11 @@ from blur360_webapp import load_dnn_models, process_video
 # Test video file - use one from the uploads folder if available
 test_file = None
 upload_dir = "uploads"
-if os.path.exists(upload_dir) and os.listdir(upload_dir):
-    test_file = os.path.join(upload_dir, os.listdir(upload_dir)[0])
+if os.path.isdir(upload_dir):
+    # Første fil i mappen - scandir stopper uden at liste hele mappen
+    with os.scandir(upload_dir) as it:
+        entry = next((e for e in it if e.is_file()), None)
+    test_file = entry.path if entry else None
 
 if not test_file or not os.path.exists(test_file):
     print("No test file found in uploads directory")
@@ -168,6 +168,11 @@ if [[ $REMOVE_FILES =~ ^[Yy]$ ]]; then
         echo -e "- Removed configuration file"
     fi
     
+    if [ -d "$INSTALL_DIR/instance" ]; then
+        rm -rf "$INSTALL_DIR/instance"
+        echo -e "- Removed session secret key"
+    fi
+    
     # Slet CloudFlare konfiguration
     if [ -d "$INSTALL_DIR/cloudflare" ]; then
         rm -rf "$INSTALL_DIR/cloudflare"